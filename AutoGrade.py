@@ -1,15 +1,66 @@
 import os
-import csv
 import json
 import time
-import smtplib
 import logging
-from datetime import datetime, time as dt_time, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from core.neu_login import NEULogin, UnionAuthError, BackendError
-from core.neu_get_grade import NEUGradeService
-from core.config import Config
+from core.neu_get_grade import NEUGradeService, merge_semester_grades
+from core.neu_session import SessionStore
+from core.neu_limiter import HostLimiter
+from core.csv_records import CourseFile, read_course_file, write_course_csv, atomic_write_bytes, GRADE_FIELD_TYPES
+from core.grade_store import GradeStore
+from core.cohort_archive import CohortArchive
+from core.config import Config, get_config
+from core.scheduler import AccountScheduler
+from core.adaptive_polling import ReleaseHistory, AdaptiveSchedule
+from core.email_notifier import EmailNotifier
+from core.notify_sinks import NotificationDispatcher, build_change_event
+from core.gpa import GPAAggregator
+
+# 页面指纹快速路径命中统计
+FAST_PATH_STATS = {"checks": 0, "hits": 0}
+_fast_path_lock = threading.Lock()
+
+# 当前学期轮询：默认学期ID及各成绩文件上次完整刷新的时间
+DEFAULT_SEMESTER_ID = "110"
+_last_full_refresh = {}
+
+# 各成绩文件的增量GPA统计：文件路径 -> (文件状态, GPAAggregator)
+_gpa_aggregators = {}
+_gpa_aggregators_lock = threading.Lock()
+
+# SQLite成绩存储（按数据库路径共享，连接按线程区分）
+_grade_stores = {}
+_grade_stores_lock = threading.Lock()
+
+# 按目录共享的群体成绩归档
+_cohort_archives = {}
+
+# 成绩发布历史（按文件路径共享，用于自适应检查间隔）
+_release_histories = {}
+
+# 后台邮件通知器（邮件配置变化时重新创建）
+EMAIL_SETTING_KEYS = ('smtp_server', 'smtp_port', 'sender_email', 'sender_password', 'use_tls',
+                      'digest_window', 'idle_timeout', 'retry')
+_email_notifier = None
+_email_settings = None
+_email_notifier_lock = threading.Lock()
+
+# 成绩变化通知分发器（notify.sinks 或邮件配置变化时重新创建）
+_notification_dispatcher = None
+_notification_settings = None
+_notification_lock = threading.Lock()
+
+# 主循环检查配置文件是否变化的间隔（秒）
+CONFIG_RELOAD_INTERVAL = 60
+
+# 多账号并发时每台主机的默认并发上限
+DEFAULT_HOST_LIMITS = {
+    "219.216.96.4": 4,
+    "pass.neu.edu.cn": 2
+}
 
 def setup_logging():
     """设置日志"""
@@ -30,77 +81,26 @@ def ensure_output_directory(output_dir: str):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-def calculate_gpa(courses: list) -> float:
+def load_previous_grades(file_path: str, use_snapshot: bool = False) -> dict:
     """
-    计算总平均绩点
+    加载之前的成绩数据
     
     Args:
-        courses: 课程列表
-        
-    Returns:
-        总平均绩点
+        file_path: 成绩文件路径
+        use_snapshot: 是否整表载入并使用解析快照；默认逐行读取，比对和GPA统计各遍历一次文件
     """
-    total_credits = 0.0
-    total_grade_points = 0.0
-    
-    for course in courses:
-        try:
-            # 获取学分
-            credits = course.get('学分')
-            if credits is None or credits == '':
-                continue
-            
-            # 转换学分为浮点数
-            if isinstance(credits, str):
-                credits = float(credits)
-            elif not isinstance(credits, (int, float)):
-                continue
-            
-            # 获取绩点
-            gpa = course.get('绩点')
-            if gpa is None or gpa == '':
-                continue
-            
-            # 转换绩点为浮点数
-            if isinstance(gpa, str):
-                gpa = float(gpa)
-            elif not isinstance(gpa, (int, float)):
-                continue
-            
-            # 累加计算
-            total_credits += credits
-            total_grade_points += credits * gpa
-            
-        except (ValueError, TypeError):
-            # 跳过无法转换的数据
-            continue
-    
-    # 计算平均绩点
-    if total_credits > 0:
-        return round(total_grade_points / total_credits, 2)
-    else:
-        return 0.0
-
-def load_previous_grades(file_path: str) -> dict:
-    """加载之前的成绩数据"""
     if not os.path.exists(file_path):
         return {"courses": [], "gpa": 0.0}
     
     try:
-        courses = []
-        with open(file_path, 'r', encoding='utf-8-sig') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                # 转换数值字段
-                for field in ['学分', '绩点']:
-                    if field in row and row[field]:
-                        try:
-                            row[field] = float(row[field])
-                        except ValueError:
-                            pass
-                courses.append(row)
+        if use_snapshot:
+            # 源文件未变化时直接加载解析快照
+            courses = read_course_file(file_path, GRADE_FIELD_TYPES, use_snapshot=True)
+        else:
+            courses = CourseFile(file_path, GRADE_FIELD_TYPES)
         
-        gpa = calculate_gpa(courses)
+        # 文件未变化时复用上次检查后的GPA统计，无需重新扫描
+        gpa = round(get_gpa_aggregator(file_path, courses).gpa, 2)
         return {"courses": courses, "gpa": gpa}
     except Exception as e:
         print(f"加载之前成绩数据失败: {e}")
@@ -120,44 +120,141 @@ def save_grades_to_csv(grades_data: dict, output_path: str):
         headers = list(courses[0].keys())
     
     try:
-        with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(courses)
-        
-        print(f"成绩数据已保存到: {output_path}")
+        # 原子写入，内容未变化时跳过
+        if write_course_csv(output_path, courses, headers):
+            print(f"成绩数据已保存到: {output_path}")
+        else:
+            print(f"成绩数据未变化，跳过写入: {output_path}")
         
     except Exception as e:
         print(f"保存CSV文件失败: {e}")
         raise
 
-def find_grade_differences(old_courses: list, new_courses: list) -> list:
-    """查找成绩变化"""
+def load_fingerprint(file_path: str) -> str:
+    """读取上次保存的成绩页面指纹"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def save_fingerprint(file_path: str, fingerprint: str):
+    """保存成绩页面指纹"""
+    if not fingerprint:
+        return
+    try:
+        atomic_write_bytes(file_path, fingerprint.encode('utf-8'))
+    except OSError as e:
+        logging.warning(f"保存页面指纹失败: {e}")
+
+def record_fast_path(hit: bool) -> tuple:
+    """
+    记录一次成绩检查是否命中快速路径
+    
+    Returns:
+        (命中次数, 检查次数)
+    """
+    with _fast_path_lock:
+        FAST_PATH_STATS['checks'] += 1
+        if hit:
+            FAST_PATH_STATS['hits'] += 1
+        return FAST_PATH_STATS['hits'], FAST_PATH_STATS['checks']
+
+def iter_course_keys(courses):
+    """
+    遍历课程及其键（课程名称 + 学年学期）
+    
+    同一学期重复出现的同名课程依次加序号区分，避免互相覆盖。
+    """
+    occurrences = {}
+    for course in courses:
+        key = (course.get('课程名称', ''), course.get('学年学期', ''))
+        occurrence = occurrences.get(key, 0) + 1
+        occurrences[key] = occurrence
+        yield (key if occurrence == 1 else key + (occurrence,)), course
+
+def build_gpa_aggregator(courses) -> GPAAggregator:
+    """由课程列表建立增量GPA统计，键与 find_grade_differences 一致"""
+    aggregator = GPAAggregator()
+    for key, course in iter_course_keys(courses):
+        aggregator.add(course, course_key=key)
+    return aggregator
+
+def _file_signature(file_path: str):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+def get_gpa_aggregator(file_path: str, courses) -> GPAAggregator:
+    """
+    获取成绩文件对应的增量GPA统计
+    
+    文件自上次记录后未变化时复用缓存的统计，否则由 courses（文件中的成绩）重新建立。
+    
+    Args:
+        file_path: 成绩文件路径
+        courses: 文件中的成绩
+    """
+    signature = _file_signature(file_path)
+    with _gpa_aggregators_lock:
+        cached = _gpa_aggregators.get(file_path)
+        if cached is not None and signature is not None and cached[0] == signature:
+            return cached[1]
+    aggregator = build_gpa_aggregator(courses)
+    with _gpa_aggregators_lock:
+        _gpa_aggregators[file_path] = (signature, aggregator)
+    return aggregator
+
+def remember_gpa_aggregator(file_path: str, aggregator: GPAAggregator):
+    """成绩文件已按统计中的成绩保存，记录文件状态以便下次复用"""
+    with _gpa_aggregators_lock:
+        _gpa_aggregators[file_path] = (_file_signature(file_path), aggregator)
+
+def forget_gpa_aggregator(file_path: str):
+    """统计已与成绩文件不一致，下次重新建立"""
+    with _gpa_aggregators_lock:
+        _gpa_aggregators.pop(file_path, None)
+
+def find_grade_differences(old_courses: list, new_courses: list, aggregator: GPAAggregator = None) -> list:
+    """
+    查找成绩变化
+    
+    Args:
+        old_courses: 之前的成绩
+        new_courses: 最新成绩
+        aggregator: 与 old_courses 一致的GPA统计（键来自 iter_course_keys），
+            提供时同时应用新增、更新和已不存在的课程，使其与 new_courses 一致
+    
+    Returns:
+        变化列表
+    """
     differences = []
     
     # 创建旧成绩的索引
-    old_courses_dict = {}
-    for course in old_courses:
-        key = f"{course.get('课程名称', '')}-{course.get('学年学期', '')}"
-        old_courses_dict[key] = course
+    old_courses_dict = dict(iter_course_keys(old_courses))
     
     # 检查新成绩
-    for new_course in new_courses:
-        key = f"{new_course.get('课程名称', '')}-{new_course.get('学年学期', '')}"
+    for key, new_course in iter_course_keys(new_courses):
+        old_course = old_courses_dict.pop(key, None)
         
-        if key not in old_courses_dict:
+        if old_course is None:
             # 新增课程
             differences.append({
                 "type": "新增课程",
                 "course_name": new_course.get('课程名称', '未知'),
                 "data": new_course
             })
+            if aggregator is not None:
+                aggregator.add(new_course, course_key=key)
         else:
             # 检查成绩是否有变化
-            old_course = old_courses_dict[key]
+            changed = False
             for field in ['最终', '总评成绩', '绩点']:
                 if field in new_course and field in old_course:
                     if str(new_course[field]) != str(old_course[field]):
+                        changed = True
                         differences.append({
                             "type": "成绩更新",
                             "course_name": new_course.get('课程名称', '未知'),
@@ -165,206 +262,407 @@ def find_grade_differences(old_courses: list, new_courses: list) -> list:
                             "old_value": old_course[field],
                             "new_value": new_course[field]
                         })
+            if aggregator is not None and (changed or str(new_course.get('学分')) != str(old_course.get('学分'))):
+                aggregator.update(new_course, course_key=key)
+    
+    if aggregator is not None:
+        # 新成绩中已不存在的课程
+        for key in old_courses_dict:
+            aggregator.remove_key(key)
     
     return differences
 
-def send_email(config: Config, differences: list, old_gpa: float, new_gpa: float):
-    """发送邮件通知"""
-    try:
-        # 获取邮件配置
-        smtp_server = config.get('email.smtp_server')
-        smtp_port = config.get('email.smtp_port', 587)
-        sender_email = config.get('email.sender_email')
-        sender_password = config.get('email.sender_password')
-        recipient_email = config.get('email.recipient_email')
-        
-        if not all([smtp_server, sender_email, sender_password, recipient_email]):
-            print("邮件配置不完整，跳过发送")
-            return
-        
-        # 创建邮件内容
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = recipient_email
-        msg['Subject'] = f"成绩更新通知 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        
-        # 构建邮件正文
-        body = f"""
-成绩更新通知
+def get_email_notifier(config: Config) -> EmailNotifier:
+    """
+    获取后台邮件通知器
+    
+    邮件配置变化（重新加载配置后）时创建新的通知器，旧的发送完剩余通知后退出；
+    邮件配置不完整时返回None。
+    """
+    global _email_notifier, _email_settings
+    settings = tuple(config.get(f'email.{key}') for key in EMAIL_SETTING_KEYS)
+    with _email_notifier_lock:
+        if _email_notifier is None or settings != _email_settings:
+            if _email_notifier is not None:
+                _email_notifier.close(timeout=0)
+            _email_notifier = EmailNotifier.from_config(config)
+            _email_settings = settings
+        return _email_notifier
 
-平均绩点变化: {old_gpa} → {new_gpa}
-变化数量: {len(differences)} 项
+def get_notification_dispatcher(config: Config) -> NotificationDispatcher:
+    """
+    获取成绩变化通知分发器
+    
+    按 notify.sinks 配置分发到 webhook / NDJSON文件 / 标准输出 / 邮件，未配置时只发邮件。
+    配置变化时创建新的分发器，旧的发送完已入队的事件后退出。
+    """
+    global _notification_dispatcher, _notification_settings
+    email_notifier = get_email_notifier(config)
+    settings = (json.dumps(config.get('notify.sinks'), sort_keys=True), config.get('email.recipient_email'),
+                email_notifier)
+    with _notification_lock:
+        if _notification_dispatcher is None or settings != _notification_settings:
+            dispatcher = NotificationDispatcher.from_config(config, email_notifier)
+            if _notification_dispatcher is not None:
+                _notification_dispatcher.close(timeout=0)
+            _notification_dispatcher = dispatcher
+            _notification_settings = settings
+        return _notification_dispatcher
 
-详细变化:
-"""
-        
-        for diff in differences:
-            if diff['type'] == '新增课程':
-                course = diff['data']
-                body += f"\n【新增课程】{diff['course_name']}\n"
-                body += f"  学分: {course.get('学分', '未知')}\n"
-                body += f"  成绩: {course.get('最终', course.get('总评成绩', '未知'))}\n"
-                body += f"  绩点: {course.get('绩点', '未知')}\n"
-            
-            elif diff['type'] == '成绩更新':
-                body += f"\n【成绩更新】{diff['course_name']}\n"
-                body += f"  {diff['field']}: {diff['old_value']} → {diff['new_value']}\n"
-        
-        body += f"\n\n此邮件由成绩监控系统自动发送"
-        
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        
-        # 发送邮件
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.send_message(msg)
-        server.quit()
-        
-        print(f"邮件发送成功到: {recipient_email}")
-        
-    except Exception as e:
-        print(f"发送邮件失败: {e}")
+def get_release_history(config: Config) -> ReleaseHistory:
+    """
+    获取成绩发布历史
+    
+    auto.adaptive.enabled 为 true 时启用，否则返回None。
+    """
+    if not config.get('auto.adaptive.enabled', False):
+        return None
+    
+    history_path = config.get('auto.adaptive.history_path', 'output/release_history.json')
+    with _grade_stores_lock:
+        if history_path not in _release_histories:
+            _release_histories[history_path] = ReleaseHistory(history_path)
+        return _release_histories[history_path]
+
+def create_schedule(config: Config):
+    """按配置创建检查时段表（启用自适应时按成绩发布历史调整间隔）"""
+    return AdaptiveSchedule.from_config(config, get_release_history(config))
 
 def get_current_check_interval(config: Config) -> tuple:
-    """获取当前时段的检查间隔"""
+    """获取当前时段的检查间隔（支持跨越午夜的时段）"""
     try:
-        frequent_start = config.get('auto.frequent_period.start_time', '08:00')
-        frequent_end = config.get('auto.frequent_period.end_time', '22:00')
-        frequent_interval = config.get('auto.frequent_period.interval', 1800)
-        cold_interval = config.get('auto.cold_period.interval', 7200)
-        
-        # 解析时间
-        frequent_start_time = datetime.strptime(frequent_start, '%H:%M').time()
-        frequent_end_time = datetime.strptime(frequent_end, '%H:%M').time()
-        current_time = datetime.now().time()
-        
-        # 判断当前时间是否在频繁查询时段
-        if frequent_start_time <= current_time <= frequent_end_time:
-            return frequent_interval, "频繁查询时段"
-        else:
-            return cold_interval, "冷查询时段"
-            
+        return create_schedule(config).interval_at(datetime.now())
     except Exception as e:
         print(f"解析时间配置失败: {e}")
         return 1800, "默认时段"
 
-def check_grades():
-    """检查成绩更新"""
+def use_semester_polling(config: Config, output_path: str) -> bool:
+    """
+    判断本次检查是否只轮询当前学期成绩
+    
+    需要开启 auto.semester_polling.enabled、处于频繁查询时段、已有成绩文件，
+    且距上次完整历史成绩刷新不超过 full_refresh_interval 秒。
+    """
+    if not config.get('auto.semester_polling.enabled', False):
+        return False
+    if not os.path.exists(output_path):
+        return False
+    
+    _, period_name = get_current_check_interval(config)
+    if period_name != "频繁查询时段":
+        return False
+    
+    full_refresh_interval = config.get('auto.semester_polling.full_refresh_interval', 21600)
+    last_full_refresh = _last_full_refresh.get(output_path)
+    return last_full_refresh is not None and time.time() - last_full_refresh < full_refresh_interval
+
+def get_account_output_path(config: Config, account: dict) -> str:
+    """
+    获取账号对应的成绩文件路径
+    
+    单账号模式沿用 output/grades.csv；多账号模式下每个账号
+    使用独立子目录，互不覆盖。
+    """
+    output_dir = config.get_output_dir()
+    filename = config.get('output.grades_filename', 'grades.csv')
+    
+    if config.get('accounts'):
+        output_dir = account.get('output_dir') or os.path.join(output_dir, account['username'])
+    
+    return os.path.join(output_dir, filename)
+
+def create_host_limiter(config: Config) -> HostLimiter:
+    """根据配置创建多账号共享的按主机并发限流器"""
+    host_limits = config.get('auto.host_limits', DEFAULT_HOST_LIMITS)
+    return HostLimiter(host_limits)
+
+def get_grade_store(config: Config) -> GradeStore:
+    """
+    获取配置的SQLite成绩存储
+    
+    storage.backend 为 "sqlite" 时启用，否则返回None。
+    """
+    if config.get('storage.backend', 'csv') != 'sqlite':
+        return None
+    
+    db_path = config.get('storage.sqlite_path') or os.path.join(config.get_output_dir(), 'grades.db')
+    with _grade_stores_lock:
+        if db_path not in _grade_stores:
+            _grade_stores[db_path] = GradeStore(db_path)
+        return _grade_stores[db_path]
+
+def get_cohort_archive(config: Config) -> CohortArchive:
+    """
+    获取配置的群体成绩归档
+    
+    配置了 storage.cohort_dir 时启用，否则返回None。
+    """
+    cohort_dir = config.get('storage.cohort_dir')
+    if not cohort_dir:
+        return None
+    
+    with _grade_stores_lock:
+        if cohort_dir not in _cohort_archives:
+            _cohort_archives[cohort_dir] = CohortArchive(cohort_dir)
+        return _cohort_archives[cohort_dir]
+
+def load_previous_from_store(store: GradeStore, account: str, output_path: str, use_snapshot: bool = False) -> dict:
+    """
+    从SQLite存储读取上次的成绩数据
+    
+    账号尚无快照而已有成绩CSV时，先将CSV导入为初始快照，避免把已有成绩当作新增课程。
+    """
+    if not store.has_account(account) and os.path.exists(output_path):
+        previous_data = load_previous_grades(output_path, use_snapshot)
+        if previous_data['courses']:
+            store.save_snapshot(account, {"courses": previous_data['courses'],
+                                          "headers": previous_data['courses'].columns},
+                                total_gpa=previous_data['gpa'])
+            logging.info(f"已将 {output_path} 导入成绩存储")
+    
+    latest = store.latest(account)
+    # 成绩CSV是存储的导出视图，未变化时复用上次的GPA统计
+    gpa = round(get_gpa_aggregator(output_path, latest['courses']).gpa, 2)
+    return {"courses": latest['courses'], "gpa": gpa}
+
+def check_grades(config: Config = None, account: dict = None, host_limiter: HostLimiter = None):
+    """
+    检查成绩更新
+    
+    Args:
+        config: 配置对象，为None时使用共享配置（文件变化时自动重新加载）
+        account: 账号信息，为None时使用auth中的账号
+        host_limiter: 多账号共享的并发限流器
+    """
+    tag = ""
     try:
         # 加载配置
-        config = Config()
-        credentials = config.get_credentials()
-        output_dir = config.get_output_dir()
+        if config is None:
+            config = get_config()
+        credentials = account or config.get_credentials()
+        tag = f"[{credentials['username']}] " if config.get('accounts') else ""
         
-        # 确保输出目录存在
-        ensure_output_directory(output_dir)
+        # 固定文件名，多账号时按账号分目录
+        output_path = get_account_output_path(config, credentials)
         
-        # 固定文件名
-        filename = config.get('output.grades_filename', 'grades.csv')
-        output_path = os.path.join(output_dir, filename)
+        # 确保输出目录存在
+        ensure_output_directory(os.path.dirname(output_path) or '.')
         
-        # 加载之前的成绩数据
-        previous_data = load_previous_grades(output_path)
+        # 上次成功解析时的页面指纹（成绩文件不存在时不使用）
+        fingerprint_path = output_path + '.sha256'
+        known_fingerprint = load_fingerprint(fingerprint_path) if os.path.exists(output_path) else None
         
         # 创建登录对象
         service_url = config.get('service_data.JiaoWuURL')
         bypass_proxy = config.get('neu_login.bypass_proxy', False)
-        neu_login = NEULogin(service_url=service_url, bypass_proxy=bypass_proxy)
+        neu_login = NEULogin(service_url=service_url, bypass_proxy=bypass_proxy, host_limiter=host_limiter,
+                             cas_base_url=config.get('neu_login.cas_base_url'))
         
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 开始检查成绩...")
-        logging.info("开始检查成绩...")
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {tag}开始检查成绩...")
+        logging.info(f"{tag}开始检查成绩...")
         
-        # 执行认证
-        auth_result = neu_login.authenticate(
+        # 执行认证并访问教务系统（优先复用缓存会话）
+        cache_dir = config.get_session_cache_dir()
+        session_store = SessionStore(cache_dir) if cache_dir else None
+        login_result = neu_login.login(
             credentials['username'], 
-            credentials['password']
+            credentials['password'],
+            session_store
         )
-        logging.info("认证成功")
-        
-        # 访问教务系统
-        service_result = neu_login.access_service()
+        if not login_result['reused']:
+            # 复用缓存会话时 NEULogin.login 已记录日志
+            logging.info(f"{tag}认证成功")
         
         # 创建成绩服务对象
-        grade_service = NEUGradeService(neu_login.get_session())
+        grade_service = NEUGradeService(neu_login.get_session(), base_url=config.get('neu_login.eams_base_url'))
         
-        # 获取成绩信息
-        grades_result = grade_service.get_grades()
+        # 频繁时段内只轮询当前学期成绩，完整历史成绩按较慢的周期刷新
+        semester_mode = use_semester_polling(config, output_path)
+        if semester_mode:
+            semester_id = config.get('auto.semester_polling.semester_id', DEFAULT_SEMESTER_ID)
+            semester_fingerprint_path = output_path + '.semester.sha256'
+            grades_result = grade_service.get_semester_grades(
+                semester_id, known_fingerprint=load_fingerprint(semester_fingerprint_path)
+            )
+        else:
+            grades_result = grade_service.get_grades(known_fingerprint=known_fingerprint)
+            if grades_result['success']:
+                # 完整历史成绩获取成功（包括指纹未变化的快速路径），记录刷新时间
+                _last_full_refresh[output_path] = time.time()
         
-        if grades_result['success']:
-            current_gpa = calculate_gpa(grades_result['courses'])
-            logging.info(f"成绩获取成功: 共{grades_result['course_count']}门课程, 当前GPA: {current_gpa}")
+        if grades_result['success'] and grades_result['unchanged']:
+            # 页面指纹未变化，跳过解析、读取旧成绩和比对
+            hits, checks = record_fast_path(True)
+            print(f"{tag}成绩无变化")
+            logging.info(f"{tag}成绩无变化（页面指纹未变化，快速路径命中 {hits}/{checks}）")
+        elif grades_result['success']:
+            record_fast_path(False)
+            
+            # 加载之前的成绩数据
+            # 默认逐行读取成绩CSV，storage.csv_snapshot 开启时整表载入并使用解析快照
+            use_snapshot = config.get('storage.csv_snapshot', False)
+            grade_store = get_grade_store(config)
+            if grade_store is not None:
+                previous_data = load_previous_from_store(grade_store, credentials['username'], output_path, use_snapshot)
+            else:
+                previous_data = load_previous_grades(output_path, use_snapshot)
+            
+            if semester_mode:
+                logging.info(f"{tag}当前学期成绩共{grades_result['course_count']}门课程，合并到历史成绩")
+                previous_headers = previous_data['courses'].columns if previous_data['courses'] else []
+                grades_result = merge_semester_grades(previous_data['courses'], previous_headers, grades_result)
             
-            # 检查是否有变化
-            differences = find_grade_differences(previous_data['courses'], grades_result['courses'])
+            # 检查是否有变化，只把新增、更新和删除的课程应用到GPA统计
+            aggregator = get_gpa_aggregator(output_path, previous_data['courses'])
+            revision = aggregator.revision
+            differences = find_grade_differences(previous_data['courses'], grades_result['courses'], aggregator)
+            current_gpa = round(aggregator.gpa, 2)
+            if aggregator.revision != revision:
+                # 统计已与成绩文件不一致，保存成功后再记录
+                forget_gpa_aggregator(output_path)
+            logging.info(f"{tag}成绩获取成功: 共{grades_result['course_count']}门课程, 当前GPA: {current_gpa}")
             
             if differences or abs(current_gpa - previous_data['gpa']) > 0.01:
-                print(f"发现成绩更新! 共{len(differences)}项变化")
-                print(f"GPA变化: {previous_data['gpa']} → {current_gpa}")
-                logging.info(f"发现成绩更新! 共{len(differences)}项变化, GPA变化: {previous_data['gpa']} → {current_gpa}")
+                print(f"{tag}发现成绩更新! 共{len(differences)}项变化")
+                print(f"{tag}GPA变化: {previous_data['gpa']} → {current_gpa}")
+                logging.info(f"{tag}发现成绩更新! 共{len(differences)}项变化, GPA变化: {previous_data['gpa']} → {current_gpa}")
                 
-                # 保存新的成绩数据
-                save_grades_to_csv(grades_result, output_path)
+                # 保存新的成绩数据（SQLite存储时保存快照，CSV作为导出视图）
+                if grade_store is not None:
+                    grade_store.save_snapshot(credentials['username'], grades_result, total_gpa=current_gpa)
+                    grade_store.export_csv(credentials['username'], output_path)
+                else:
+                    save_grades_to_csv(grades_result, output_path)
+                remember_gpa_aggregator(output_path, aggregator)
+                # 记录发布时间（首次运行没有历史成绩，不计入）
+                release_history = get_release_history(config)
+                if release_history is not None and previous_data['courses']:
+                    release_history.record(len(differences))
+                cohort_archive = get_cohort_archive(config)
+                if cohort_archive is not None:
+                    cohort_archive.append(credentials['username'], grades_result)
+                if semester_mode and os.path.exists(fingerprint_path):
+                    # 成绩文件已不再对应上次的历史成绩页面，下次完整刷新时必须重新比对
+                    os.remove(fingerprint_path)
                 
-                # 发送邮件通知
-                send_email(config, differences, previous_data['gpa'], current_gpa)
+                # 分发到各通知渠道（只入队，不等待发送）
+                dispatcher = get_notification_dispatcher(config)
+                if dispatcher.workers:
+                    dispatcher.dispatch(build_change_event(
+                        credentials['username'], differences, previous_data['gpa'], current_gpa,
+                        recipient=credentials.get('recipient_email'), tag=tag))
+                else:
+                    print(f"{tag}未配置可用的通知渠道，跳过通知")
             else:
-                print("成绩无变化")
-                logging.info("成绩无变化")
+                print(f"{tag}成绩无变化")
+                logging.info(f"{tag}成绩无变化")
+            
+            # 成绩文件已与本次页面一致，记录指纹
+            save_fingerprint(semester_fingerprint_path if semester_mode else fingerprint_path,
+                             grades_result['fingerprint'])
         else:
-            print("获取成绩失败")
-            logging.error("获取成绩失败")
+            print(f"{tag}获取成绩失败")
+            logging.error(f"{tag}获取成绩失败")
             
     except UnionAuthError as e:
-        print(f"用户名或密码错误: {e}")
-        logging.error(f"用户名或密码错误: {e}")
+        print(f"{tag}用户名或密码错误: {e}")
+        logging.error(f"{tag}用户名或密码错误: {e}")
     except BackendError as e:
-        print(f"后端错误: {e}")
-        logging.error(f"后端错误: {e}")
+        print(f"{tag}后端错误: {e}")
+        logging.error(f"{tag}后端错误: {e}")
     except Exception as e:
-        print(f"检查成绩时出错: {e}")
-        logging.error(f"检查成绩时出错: {e}")
+        print(f"{tag}检查成绩时出错: {e}")
+        logging.error(f"{tag}检查成绩时出错: {e}")
 
 def main():
-    """主函数 - 定时检查成绩"""
+    """主函数 - 按时段调度各账号的成绩检查"""
     setup_logging()
     
-    config = Config()
+    config = get_config()
     
     print("成绩自动监控启动")
     logging.info("成绩自动监控启动")
     
     try:
         # 验证配置
-        config.get_credentials()
-        get_current_check_interval(config)
+        accounts = {account['username']: account for account in config.get_accounts()}
+        schedule = create_schedule(config)
         
     except Exception as e:
         print(f"配置解析错误: {e}")
         logging.error(f"配置解析错误: {e}")
         return
     
+    max_workers = config.get('auto.max_workers', 8)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    host_limiter = create_host_limiter(config)
+    print(f"共监控 {len(accounts)} 个账号，工作线程数: {max_workers}")
+    logging.info(f"共监控 {len(accounts)} 个账号，工作线程数: {max_workers}")
+    
+    # 每个账号独立安排下次检查，启动时立即检查一次
+    scheduler = AccountScheduler(schedule, jitter=config.get('auto.jitter', 0))
+    running = set()
+    running_lock = threading.Lock()
+    tags = {}
+    
+    def on_check_done(username: str, future):
+        # 先安排下次检查再移出运行集合，主循环不会看到既未运行也未安排的账号
+        with running_lock:
+            wake, period_name = scheduler.schedule_next(username)
+            running.discard(username)
+        print(f"{tags.get(username, '')}当前处于{period_name}，下次检查时间: {wake.strftime('%Y-%m-%d %H:%M:%S')}")
+        logging.info(f"快速路径累计命中: {FAST_PATH_STATS['hits']}/{FAST_PATH_STATS['checks']}")
+        if _notification_dispatcher is not None and _notification_dispatcher.workers:
+            logging.info(f"通知渠道统计: {json.dumps(_notification_dispatcher.metrics(), ensure_ascii=False)}")
+    
+    now = datetime.now()
+    for username in accounts:
+        scheduler.schedule_at(username, now)
+    
     while True:
         try:
-            # 获取当前时段的检查间隔
-            current_interval, period_name = get_current_check_interval(config)
-            
-            print(f"当前处于{period_name}，检查间隔: {current_interval}秒")
+            # 没有账号到期时也定期醒来，检查配置文件是否变化
+            due = scheduler.wait_due(max_wait=CONFIG_RELOAD_INTERVAL)
             
-            # 执行成绩检查
-            check_grades()
+            # 配置文件变化时自动重新加载，同步时段表和账号列表
+            try:
+                config = get_config()
+                if scheduler.set_schedule(create_schedule(config), config.get('auto.jitter', 0)):
+                    logging.info("检查时段已变化，按新时段重新安排各账号的检查时间")
+                accounts = {account['username']: account for account in config.get_accounts()}
+            except Exception as e:
+                print(f"配置解析错误，沿用上次配置: {e}")
+                logging.error(f"配置解析错误，沿用上次配置: {e}")
             
-            # 计算下次检查时间
-            next_check_time = datetime.now() + timedelta(seconds=current_interval)
-            next_check_display = next_check_time.replace(second=0, microsecond=0)
+            with running_lock:
+                busy = set(running)
+                for username in accounts:
+                    if username not in scheduler and username not in busy and username not in due:
+                        # 新增的账号立即检查
+                        due.append(username)
+            for username in scheduler.keys():
+                if username not in accounts:
+                    scheduler.remove(username)
             
-            print(f"下次检查时间: {next_check_display.strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            time.sleep(current_interval)
+            for username in due:
+                account = accounts.get(username)
+                if account is None or username in busy:
+                    continue
+                tags[username] = f"[{username}] " if config.get('accounts') else ""
+                with running_lock:
+                    running.add(username)
+                future = executor.submit(check_grades, config, account, host_limiter)
+                future.add_done_callback(lambda f, username=username: on_check_done(username, f))
             
         except KeyboardInterrupt:
             print("\n程序已停止")
             logging.info("程序已停止")
+            executor.shutdown(wait=False)
+            if _notification_dispatcher is not None:
+                _notification_dispatcher.close(timeout=10)
+            if _email_notifier is not None:
+                # 发送合并窗口中尚未发出的通知
+                _email_notifier.close(timeout=30)
             break
         except Exception as e:
             print(f"程序异常: {e}")
@@ -373,8 +671,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
-
-
-
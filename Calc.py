@@ -1,11 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
-import csv
 import os
 import logging
 from typing import Dict, List, Any
 import subprocess
 import sys
+import time
+from core.csv_records import iter_csv_file, read_course_file, write_course_csv, GRADE_FIELD_TYPES, PLAN_FIELD_TYPES, ON_ERROR_DEFAULT
+from core.course_table import CourseTable
+from core.gpa import GPAAggregator
+from core.gpa_whatif import WhatIfEngine, DEFAULT_GRADE_POINTS, solve_target_gpa
 
 class NEUGradeApp:
     def __init__(self, root):
@@ -14,9 +18,14 @@ class NEUGradeApp:
         self.root.geometry("1200x800")
         
         # 数据存储
-        self.grades_data = []
+        self.grades_data = CourseTable()
         self.plan_data = []
         
+        # 总学分和学分绩的增量统计；同一课程序号可能对应多行，按记录对象区分
+        self.gpa_aggregator = GPAAggregator(key=id)
+        # 统计对应的成绩表及其 revision，成绩表被替换或绕过统计增删行后需要重建
+        self._gpa_synced = (self.grades_data, self.grades_data.revision)
+        
         # 创建界面
         self.create_widgets()
         
@@ -45,6 +54,8 @@ class NEUGradeApp:
         ttk.Button(button_frame, text="添加课程", command=self.add_course).grid(row=1, column=0, padx=5, pady=2)
         ttk.Button(button_frame, text="删除选中", command=self.delete_selected).grid(row=1, column=1, padx=5, pady=2)
         ttk.Button(button_frame, text="保存成绩", command=self.save_grades).grid(row=1, column=2, padx=5, pady=2)
+        ttk.Button(button_frame, text="GPA预测", command=self.show_whatif_dialog).grid(row=1, column=3, padx=5, pady=2)
+        ttk.Button(button_frame, text="目标绩点", command=self.show_target_dialog).grid(row=1, column=4, padx=5, pady=2)
         
         # 平均学分绩显示
         self.gpa_var = tk.StringVar(value="平均学分绩: 0.00")
@@ -127,26 +138,7 @@ class NEUGradeApp:
             if not grades_file:
                 return
             
-            new_grades_data = []
-            with open(grades_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # 转换数值字段
-                    if '学分' in row and row['学分']:
-                        try:
-                            row['学分'] = float(row['学分'])
-                        except ValueError:
-                            row['学分'] = 0.0
-                    
-                    if '绩点' in row and row['绩点']:
-                        try:
-                            row['绩点'] = float(row['绩点'])
-                        except ValueError:
-                            row['绩点'] = 0.0
-                    
-                    new_grades_data.append(row)
-            
-            # 如果已有成绩数据，进行增量更新
+            # 如果已有成绩数据，进行增量更新（逐行读取，只保留新增的课程）
             if self.grades_data:
                 # 创建现有成绩的索引（按课程序号和课程名称）
                 existing_courses = {}
@@ -156,19 +148,22 @@ class NEUGradeApp:
                 
                 # 检查新成绩，只添加不存在的课程
                 added_count = 0
-                for new_grade in new_grades_data:
+                for new_grade in iter_csv_file(grades_file, GRADE_FIELD_TYPES, ON_ERROR_DEFAULT, 0.0):
                     key = f"{new_grade.get('课程序号', '')}-{new_grade.get('课程名称', '')}"
                     if key not in existing_courses:
                         self.grades_data.append(new_grade)
+                        self.gpa_aggregator.add(self.grades_data[-1])
                         added_count += 1
+                self.mark_gpa_synced()
                 
                 messagebox.showinfo("成功", 
                     f"增量更新完成\n"
                     f"新增课程: {added_count} 门\n"
                     f"总课程数: {len(self.grades_data)} 门")
             else:
-                # 如果没有现有数据，直接加载全部
-                self.grades_data = new_grades_data
+                # 如果没有现有数据，直接加载全部（转换数值字段）
+                self.grades_data = read_course_file(grades_file, GRADE_FIELD_TYPES, ON_ERROR_DEFAULT, 0.0)
+                self.rebuild_gpa_aggregator()
                 messagebox.showinfo("成功", f"成功加载 {len(self.grades_data)} 门课程成绩")
             
             self.refresh_grades_table()
@@ -184,25 +179,18 @@ class NEUGradeApp:
                 messagebox.showwarning("警告", "计划文件不存在，请先获取培养计划")
                 return
             
-            self.plan_data = []
-            with open(plan_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # 转换数值字段
-                    if '学分数' in row and row['学分数']:
-                        try:
-                            row['学分数'] = float(row['学分数'])
-                        except ValueError:
-                            row['学分数'] = 0.0
-                    
-                    self.plan_data.append(row)
+            # 逐行读取并转换数值字段
+            plan_records = iter_csv_file(plan_file, PLAN_FIELD_TYPES, ON_ERROR_DEFAULT, 0.0)
             
-            # 过滤掉已有成绩的课程（按课程名称匹配）
+            # 过滤掉已有成绩的课程（按课程名称匹配），读取时直接跳过
             if self.grades_data:
                 existing_course_names = {grade.get('课程名称', '') for grade in self.grades_data}
-                original_count = len(self.plan_data)
-                self.plan_data = [course for course in self.plan_data 
-                                if course.get('课程名称', '') not in existing_course_names]
+                original_count = 0
+                self.plan_data = []
+                for course in plan_records:
+                    original_count += 1
+                    if course.get('课程名称', '') not in existing_course_names:
+                        self.plan_data.append(course)
                 filtered_count = original_count - len(self.plan_data)
                 
                 if filtered_count > 0:
@@ -212,21 +200,32 @@ class NEUGradeApp:
                 else:
                     messagebox.showinfo("成功", f"成功加载 {len(self.plan_data)} 门计划课程")
             else:
+                self.plan_data = list(plan_records)
                 messagebox.showinfo("成功", f"成功加载 {len(self.plan_data)} 门计划课程")
                 
         except Exception as e:
             messagebox.showerror("错误", f"读取计划文件失败：{str(e)}")
     
+    def rebuild_gpa_aggregator(self):
+        """按当前成绩数据重建GPA统计"""
+        self.gpa_aggregator = GPAAggregator(self.grades_data, key=id)
+        self.mark_gpa_synced()
+    
+    def mark_gpa_synced(self):
+        """记录GPA统计已与当前成绩表一致（增删行后已同步更新统计）"""
+        self._gpa_synced = (self.grades_data, self.grades_data.revision)
+    
     def refresh_grades_table(self):
         """刷新成绩表格"""
         # 清空表格
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.tree.delete(*self.tree.get_children())
         
-        # 添加数据
-        total_credit_points = 0
-        total_credits = 0
+        # 成绩表被替换，或有行未经统计直接增删、替换时重建
+        synced_table, synced_revision = self._gpa_synced
+        if synced_table is not self.grades_data or synced_revision != self.grades_data.revision:
+            self.rebuild_gpa_aggregator()
         
+        # 添加数据，GPA影响由预先累计的总值计算，单次遍历
         for grade in self.grades_data:
             course_id = grade.get('课程序号', '')
             course_name = grade.get('课程名称', '')
@@ -243,12 +242,10 @@ class NEUGradeApp:
             self.tree.insert("", "end", values=(
                 course_id, course_name, credit, score, grade_point, f"{credit_point:.2f}", gpa_impact_str
             ))
-            
-            total_credits += credit
-            total_credit_points += credit_point
         
-        # 更新平均学分绩
-        avg_gpa = total_credit_points / total_credits if total_credits > 0 else 0
+        # 更新平均学分绩（增量统计，无需重新累加）
+        avg_gpa = self.gpa_aggregator.gpa
+        total_credits = self.gpa_aggregator.total_credits
         self.gpa_var.set(f"平均学分绩: {avg_gpa:.4f} (总学分: {total_credits:.1f})")
         
         # 重置排序状态
@@ -282,6 +279,7 @@ class NEUGradeApp:
             for grade in self.grades_data:
                 if grade.get('课程序号') == course_id:
                     grade['绩点'] = new_grade_point
+                    self.gpa_aggregator.update(grade)
                     break
             
             # 刷新表格
@@ -548,10 +546,214 @@ class NEUGradeApp:
             }
         
         self.grades_data.append(new_grade)
+        self.gpa_aggregator.add(self.grades_data[-1])
+        self.mark_gpa_synced()
         
         # 刷新表格
         self.refresh_grades_table()
     
+    def show_whatif_dialog(self):
+        """显示GPA预测对话框：按培养计划剩余课程批量推演GPA"""
+        if not self.plan_data:
+            messagebox.showwarning("警告", "请先读取计划文件")
+            return
+        
+        try:
+            taken = {grade.get('课程名称', '') for grade in self.grades_data}
+            engine = WhatIfEngine(self.grades_data,
+                                  [course for course in self.plan_data if course.get('课程名称', '') not in taken])
+        except ImportError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        
+        if engine.course_count == 0:
+            messagebox.showwarning("警告", "培养计划中没有可推演的剩余课程")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("GPA预测")
+        dialog.geometry("520x520")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="15")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text=f"当前平均学分绩: {engine.current_gpa:.4f}    "
+                                   f"剩余课程: {engine.course_count} 门 / {engine.credits.sum():.1f} 学分",
+                  font=("Arial", 10, "bold")).grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 10))
+        
+        # 参数输入
+        count_var = tk.StringVar(value="100000")
+        choices_var = tk.StringVar(value=",".join(str(level) for level in DEFAULT_GRADE_POINTS))
+        target_var = tk.StringVar(value=f"{round(engine.current_gpa, 1):.1f}")
+        for row, (label, var) in enumerate([("随机情景数:", count_var), ("可能的绩点:", choices_var),
+                                            ("目标绩点:", target_var)], start=1):
+            ttk.Label(main_frame, text=label).grid(row=row, column=0, sticky=tk.W, pady=3)
+            ttk.Entry(main_frame, textvariable=var, width=40).grid(row=row, column=1, sticky=tk.W, pady=3)
+        
+        result_text = tk.Text(main_frame, height=18, width=60, font=("Consolas", 10))
+        result_text.grid(row=5, column=0, columnspan=2, pady=(10, 0), sticky=(tk.W, tk.E, tk.N, tk.S))
+        main_frame.rowconfigure(5, weight=1)
+        main_frame.columnconfigure(1, weight=1)
+        
+        def run_prediction():
+            try:
+                count = int(count_var.get())
+                choices = [float(value) for value in choices_var.get().replace('，', ',').split(',') if value.strip()]
+                targets = [float(value) for value in target_var.get().replace('，', ',').split(',') if value.strip()]
+                if count <= 0 or not choices:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "请输入有效的情景数、绩点和目标绩点", parent=dialog)
+                return
+            
+            start = time.perf_counter()
+            gpas = engine.simulate(count, choices)
+            elapsed = (time.perf_counter() - start) * 1000
+            summary = WhatIfEngine.summarize(gpas, targets)
+            
+            lines = ["剩余课程全部取同一绩点时:"]
+            for level, gpa in zip(choices, engine.uniform(choices)):
+                lines.append(f"  绩点 {level:.1f} → 平均学分绩 {gpa:.4f}")
+            lines.append("")
+            lines.append(f"随机 {summary['count']} 个情景（各课程等概率取上述绩点，耗时 {elapsed:.1f} ms）:")
+            lines.append(f"  平均 {summary['mean']:.4f}  标准差 {summary['std']:.4f}")
+            lines.append(f"  最低 {summary['min']:.4f}  最高 {summary['max']:.4f}")
+            percentiles = summary['percentiles']
+            lines.append(f"  5% {percentiles['p5']:.4f}  中位数 {percentiles['p50']:.4f}  95% {percentiles['p95']:.4f}")
+            for target, probability in summary['target_probability'].items():
+                lines.append(f"  达到 {target:.2f} 的概率: {probability * 100:.1f}%")
+            
+            result_text.delete("1.0", tk.END)
+            result_text.insert(tk.END, "\n".join(lines))
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=4, column=0, columnspan=2, pady=(5, 0), sticky=tk.W)
+        ttk.Button(button_frame, text="计算", command=run_prediction).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="关闭", command=dialog.destroy).pack(side=tk.LEFT, padx=(10, 0))
+        
+        run_prediction()
+    
+    def show_target_dialog(self):
+        """显示目标绩点对话框：计算剩余课程达到目标平均学分绩所需的最低绩点"""
+        if not self.plan_data:
+            messagebox.showwarning("警告", "请先读取计划文件")
+            return
+        
+        taken = {grade.get('课程名称', '') for grade in self.grades_data}
+        remaining = [course for course in self.plan_data if course.get('课程名称', '') not in taken]
+        if not remaining:
+            messagebox.showwarning("警告", "培养计划中没有剩余课程")
+            return
+        
+        # 课程名称 -> 锁定的绩点
+        fixed = {}
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("目标绩点")
+        dialog.geometry("640x560")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="15")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        main_frame.columnconfigure(1, weight=1)
+        main_frame.rowconfigure(4, weight=1)
+        
+        target_var = tk.StringVar(value=f"{self.gpa_aggregator.gpa + 0.1:.2f}")
+        min_var = tk.StringVar(value="0.0")
+        max_var = tk.StringVar(value="5.0")
+        electives_var = tk.BooleanVar(value=True)
+        
+        input_frame = ttk.Frame(main_frame)
+        input_frame.grid(row=0, column=0, columnspan=2, sticky=tk.W)
+        for column, (label, var) in enumerate([("目标绩点:", target_var), ("绩点下限:", min_var),
+                                               ("绩点上限:", max_var)]):
+            ttk.Label(input_frame, text=label).grid(row=0, column=column * 2, sticky=tk.W, padx=(0, 5))
+            ttk.Entry(input_frame, textvariable=var, width=8).grid(row=0, column=column * 2 + 1, sticky=tk.W,
+                                                                   padx=(0, 10))
+        ttk.Checkbutton(main_frame, text="计入选修课（取消则只修读必修课）",
+                        variable=electives_var).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        summary_var = tk.StringVar()
+        ttk.Label(main_frame, textvariable=summary_var, font=("Arial", 10, "bold"),
+                  justify=tk.LEFT).grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(5, 5))
+        
+        # 每门课程所需绩点
+        table_frame = ttk.Frame(main_frame)
+        table_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+        columns = ('课程名称', '学分数', '课程类型', '所需绩点', '锁定')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=12)
+        for column, width in zip(columns, (220, 60, 80, 80, 50)):
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        tree.configure(yscrollcommand=scrollbar.set)
+        
+        ttk.Label(main_frame, text="双击课程可锁定其绩点（取消输入则解除锁定），其余课程重新分配",
+                  foreground="gray").grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        def solve():
+            try:
+                target = float(target_var.get())
+                min_point = float(min_var.get())
+                max_point = float(max_var.get())
+                if min_point > max_point:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "请输入有效的目标绩点和绩点范围", parent=dialog)
+                return
+            
+            result = solve_target_gpa(self.grades_data, remaining, target, include_electives=electives_var.get(),
+                                      fixed=fixed, min_point=min_point, max_point=max_point)
+            
+            lines = [f"当前平均学分绩: {result['current_gpa']:.4f}    "
+                     f"参与计算: {result['course_count']} 门 / {result['remaining_credits']:.1f} 学分",
+                     f"可达范围: {result['min_gpa']:.4f} ~ {result['max_gpa']:.4f}"]
+            if not result['feasible']:
+                lines.append(f"无法达到 {target:.2f}：剩余课程全部取上限也只能达到 {result['max_gpa']:.4f}")
+            elif result['level'] is None:
+                lines.append(f"当前平均学分绩已达到 {target:.2f}，没有需要计算的剩余课程")
+            elif result['level'] <= min_point and result['min_gpa'] >= target:
+                lines.append(f"剩余课程全部取下限 {min_point:.1f} 也能达到 {target:.2f}")
+            else:
+                lines.append(f"未锁定的课程至少需要统一绩点 {result['level']:.2f}")
+            summary_var.set("\n".join(lines))
+            
+            tree.delete(*tree.get_children())
+            for item in result['courses']:
+                course = item['course']
+                tree.insert('', tk.END, values=(
+                    item['name'], course.get('学分数', ''), course.get('课程类型', ''),
+                    f"{item['grade_point']:.2f}", "是" if item['fixed'] else ""
+                ))
+        
+        def lock_course(event):
+            item_id = tree.identify_row(event.y)
+            if not item_id:
+                return
+            name = tree.item(item_id, 'values')[0]
+            value = simpledialog.askfloat("锁定绩点", f"{name} 的绩点:", parent=dialog,
+                                          initialvalue=fixed.get(name), minvalue=0.0, maxvalue=5.0)
+            if value is None:
+                fixed.pop(name, None)
+            else:
+                fixed[name] = value
+            solve()
+        
+        tree.bind('<Double-1>', lock_course)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=2, column=0, columnspan=2, sticky=tk.W)
+        ttk.Button(button_frame, text="计算", command=solve).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="清除锁定", command=lambda: (fixed.clear(), solve())).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(button_frame, text="关闭", command=dialog.destroy).pack(side=tk.LEFT, padx=(10, 0))
+        
+        solve()
+    
     def delete_selected(self):
         """删除选中的课程"""
         selection = self.tree.selection()
@@ -563,8 +765,13 @@ class NEUGradeApp:
             for item in selection:
                 values = self.tree.item(item, 'values')
                 course_id = values[0]
-                # 从数据中删除
-                self.grades_data = [g for g in self.grades_data if g.get('课程序号') != course_id]
+                # 从数据中删除（倒序删除，下标不受影响）
+                for index in range(len(self.grades_data) - 1, -1, -1):
+                    g = self.grades_data[index]
+                    if g.get('课程序号') == course_id:
+                        self.gpa_aggregator.remove(g)
+                        del self.grades_data[index]
+            self.mark_gpa_synced()
             
             self.refresh_grades_table()
     
@@ -582,54 +789,19 @@ class NEUGradeApp:
                 # 默认字段名
                 fieldnames = ['课程序号', '课程名称', '学分', '成绩', '绩点']
             
-            with open('output/DIY_Grade.csv', 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.grades_data)
+            write_course_csv('output/DIY_Grade.csv', self.grades_data, fieldnames)
             
             messagebox.showinfo("成功", "成绩已保存到 output/DIY_Grade.csv")
         except Exception as e:
             messagebox.showerror("错误", f"保存成绩失败：{str(e)}")
 
     def calculate_gpa_impact(self, target_course):
-        """计算某门课程对总GPA的影响"""
+        """计算某门课程对总GPA的影响（留一法，由累计值直接得出，O(1)）"""
         if not self.grades_data or len(self.grades_data) <= 1:
             return 0.0
         
-        # 计算不包含该课程的GPA
-        other_courses = [course for course in self.grades_data if course != target_course]
-        
-        total_credits_without = 0
-        total_credit_points_without = 0
-        
-        for course in other_courses:
-            credit = float(course.get('学分', 0))
-            grade_point = float(course.get('绩点', 0))
-            total_credits_without += credit
-            total_credit_points_without += credit * grade_point
-        
-        if total_credits_without == 0:
-            return 0.0
-        
-        gpa_without = total_credit_points_without / total_credits_without
-        
-        # 计算包含该课程的总GPA
-        total_credits = 0
-        total_credit_points = 0
-        
-        for course in self.grades_data:
-            credit = float(course.get('学分', 0))
-            grade_point = float(course.get('绩点', 0))
-            total_credits += credit
-            total_credit_points += credit * grade_point
-        
-        if total_credits == 0:
-            return 0.0
-        
-        gpa_with = total_credit_points / total_credits
-        
-        # 返回影响值（正值表示提升GPA，负值表示降低GPA）
-        return gpa_with - gpa_without
+        # 按记录对象区分课程，重复的行各自计算影响
+        return self.gpa_aggregator.gpa_impact(id(target_course))
 
     def sort_by_column(self, column):
         """按列排序"""
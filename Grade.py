@@ -1,10 +1,12 @@
 import os
-import csv
 import logging
 from datetime import datetime
 from core.neu_login import NEULogin, UnionAuthError, BackendError
 from core.neu_get_grade import NEUGradeService
-from core.config import Config
+from core.neu_session import SessionStore
+from core.config import get_config
+from core.gpa import calculate_gpa
+from core.csv_records import write_course_csv
 
 def setup_logging():
     """设置日志"""
@@ -46,10 +48,10 @@ def save_grades_to_csv(grades_data: dict, output_path: str):
         headers = list(courses[0].keys())
     
     try:
-        with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(courses)
+        # 原子写入，内容未变化时跳过
+        if not write_course_csv(output_path, courses, headers):
+            logging.info(f"成绩数据未变化，跳过写入: {output_path}")
+            return
         
         logging.info(f"成绩数据已保存到: {output_path}")
         logging.info(f"共保存 {len(courses)} 条记录")
@@ -58,64 +60,13 @@ def save_grades_to_csv(grades_data: dict, output_path: str):
         logging.error(f"保存CSV文件失败: {e}")
         raise
 
-def calculate_gpa(courses: list) -> float:
-    """
-    计算总平均绩点
-    
-    Args:
-        courses: 课程列表
-        
-    Returns:
-        总平均绩点
-    """
-    total_credits = 0.0
-    total_grade_points = 0.0
-    
-    for course in courses:
-        try:
-            # 获取学分
-            credits = course.get('学分')
-            if credits is None or credits == '':
-                continue
-            
-            # 转换学分为浮点数
-            if isinstance(credits, str):
-                credits = float(credits)
-            elif not isinstance(credits, (int, float)):
-                continue
-            
-            # 获取绩点
-            gpa = course.get('绩点')
-            if gpa is None or gpa == '':
-                continue
-            
-            # 转换绩点为浮点数
-            if isinstance(gpa, str):
-                gpa = float(gpa)
-            elif not isinstance(gpa, (int, float)):
-                continue
-            
-            # 累加计算
-            total_credits += credits
-            total_grade_points += credits * gpa
-            
-        except (ValueError, TypeError):
-            # 跳过无法转换的数据
-            continue
-    
-    # 计算平均绩点
-    if total_credits > 0:
-        return round(total_grade_points / total_credits, 2)
-    else:
-        return 0.0
-
 def main():
     """主函数"""
     setup_logging()
     
     try:
         # 加载配置
-        config = Config()
+        config = get_config()
         credentials = config.get_credentials()
         output_dir = config.get_output_dir()
         
@@ -125,24 +76,28 @@ def main():
         # 创建登录对象
         service_url = config.get('service_data.JiaoWuURL')
         bypass_proxy = config.get('neu_login.bypass_proxy', False)
-        neu_login = NEULogin(service_url=service_url, bypass_proxy=bypass_proxy)
+        neu_login = NEULogin(service_url=service_url, bypass_proxy=bypass_proxy,
+                             cas_base_url=config.get('neu_login.cas_base_url'))
+        
+        # 与其他脚本共享的会话缓存
+        cache_dir = config.get_session_cache_dir()
+        session_store = SessionStore(cache_dir) if cache_dir else None
         
         logging.info("开始登录认证...")
         
-        # 执行认证
-        auth_result = neu_login.authenticate(
+        # 执行认证并访问教务系统（优先复用缓存会话）
+        login_result = neu_login.login(
             credentials['username'], 
-            credentials['password']
+            credentials['password'],
+            session_store
         )
-        logging.info("认证成功")
-        
-        # 访问教务系统
-        logging.info("访问教务系统...")
-        service_result = neu_login.access_service()
-        logging.info(f"访问教务系统成功: {service_result['url']}")
+        if login_result['reused']:
+            logging.info("已复用缓存会话，跳过登录")
+        else:
+            logging.info(f"认证成功，访问教务系统: {login_result['url']}")
         
         # 创建成绩服务对象
-        grade_service = NEUGradeService(neu_login.get_session())
+        grade_service = NEUGradeService(neu_login.get_session(), base_url=config.get('neu_login.eams_base_url'))
         
         # 获取成绩信息
         logging.info("获取成绩信息...")
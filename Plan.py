@@ -1,10 +1,16 @@
 import os
-import csv
+import time
 import logging
 from datetime import datetime
 from core.neu_login import NEULogin, UnionAuthError, BackendError
 from core.neu_get_plan import NEUPlanService
-from core.config import Config
+from core.neu_session import SessionStore
+from core.neu_retry import RetryPolicy
+from core.config import get_config
+from core.csv_records import write_course_csv
+
+# 培养计划页面加载较慢：指数退避重试，总时限60秒
+PLAN_RETRY_POLICY = RetryPolicy(max_attempts=10, base_delay=0.5, factor=2.0, max_delay=8.0, jitter=0.3, deadline=60)
 
 def setup_logging():
     """设置日志"""
@@ -46,10 +52,10 @@ def save_plan_to_csv(plan_data: dict, output_path: str):
         headers = list(courses[0].keys())
     
     try:
-        with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(courses)
+        # 原子写入，内容未变化时跳过
+        if not write_course_csv(output_path, courses, headers):
+            logging.info(f"培养计划数据未变化，跳过写入: {output_path}")
+            return
         
         logging.info(f"培养计划数据已保存到: {output_path}")
         logging.info(f"共保存 {len(courses)} 条记录")
@@ -58,13 +64,41 @@ def save_plan_to_csv(plan_data: dict, output_path: str):
         logging.error(f"保存CSV文件失败: {e}")
         raise
 
+def fetch_plans(plan_service: NEUPlanService, plan_ids: list, output_dir: str, max_workers: int = 4):
+    """
+    并发获取多个培养计划，每完成一个立即保存为 plan_<id>.csv
+    
+    Args:
+        plan_service: 已认证的培养计划服务
+        plan_ids: 培养计划ID列表
+        output_dir: 输出目录
+        max_workers: 最大并发数
+    """
+    logging.info(f"批量获取 {len(plan_ids)} 个培养计划，并发数: {max_workers}")
+    start_time = time.monotonic()
+    
+    def save_result(plan_id: str, plan_result: dict):
+        if plan_result['success']:
+            logging.info(f"培养计划 {plan_id} 获取成功: 共{plan_result['course_count']}门课程，"
+                         f"耗时 {plan_result['elapsed']} 秒")
+            save_plan_to_csv(plan_result, os.path.join(output_dir, f"plan_{plan_id}.csv"))
+        else:
+            logging.error(f"培养计划 {plan_id} 获取失败: {plan_result['error']}")
+    
+    results = plan_service.get_plans(plan_ids, max_workers=max_workers,
+                                      retry_policy=PLAN_RETRY_POLICY, on_result=save_result)
+    
+    succeeded = sum(1 for result in results.values() if result['success'])
+    logging.info(f"批量获取完成: 成功 {succeeded}/{len(results)}，"
+                 f"总耗时 {time.monotonic() - start_time:.2f} 秒")
+
 def main():
     """主函数"""
     setup_logging()
     
     try:
         # 加载配置
-        config = Config()
+        config = get_config()
         credentials = config.get_credentials()
         output_dir = config.get_output_dir()
         
@@ -74,24 +108,34 @@ def main():
         # 创建登录对象
         service_url = config.get('service_data.JiaoWuURL')
         bypass_proxy = config.get('neu_login.bypass_proxy', False)
-        neu_login = NEULogin(service_url=service_url, bypass_proxy=bypass_proxy)
+        neu_login = NEULogin(service_url=service_url, bypass_proxy=bypass_proxy,
+                             cas_base_url=config.get('neu_login.cas_base_url'))
+        
+        # 与其他脚本共享的会话缓存
+        cache_dir = config.get_session_cache_dir()
+        session_store = SessionStore(cache_dir) if cache_dir else None
         
         logging.info("开始登录认证...")
         
-        # 执行认证
-        auth_result = neu_login.authenticate(
+        # 执行认证并访问教务系统（优先复用缓存会话）
+        login_result = neu_login.login(
             credentials['username'], 
-            credentials['password']
+            credentials['password'],
+            session_store
         )
-        logging.info("认证成功")
-        
-        # 访问教务系统
-        logging.info("访问教务系统...")
-        service_result = neu_login.access_service()
-        logging.info(f"访问教务系统成功: {service_result['url']}")
+        if login_result['reused']:
+            logging.info("已复用缓存会话，跳过登录")
+        else:
+            logging.info(f"认证成功，访问教务系统: {login_result['url']}")
         
         # 创建培养计划服务对象
-        plan_service = NEUPlanService(neu_login.get_session())
+        plan_service = NEUPlanService(neu_login.get_session(), base_url=config.get('neu_login.eams_base_url'))
+        
+        # 批量获取多个培养计划（一次登录，并发请求）
+        plan_ids = config.get("service_data.plan_ids")
+        if plan_ids:
+            fetch_plans(plan_service, plan_ids, output_dir, config.get("service_data.plan_workers", 4))
+            return
         
         # 获取培养计划ID（从配置或用户输入）
         plan_id = config.get("service_data.plan_id", "4068")  # 默认使用4068
@@ -99,10 +143,11 @@ def main():
         # 获取培养计划信息
         logging.info("获取培养计划信息...")
         logging.info(f"培养计划ID: {plan_id}")
-        plan_result = plan_service.get_plan(plan_id, max_retries=8, wait_time=3)
+        plan_result = plan_service.get_plan(plan_id, retry_policy=PLAN_RETRY_POLICY)
         
         if plan_result['success']:
-            logging.info(f"培养计划获取成功: 共{plan_result['course_count']}门课程")
+            logging.info(f"培养计划获取成功: 共{plan_result['course_count']}门课程，"
+                         f"耗时 {plan_result['elapsed']} 秒（{plan_result['attempts']} 次请求）")
             
             # 生成输出文件名
             output_path = os.path.join(output_dir, "plan.csv")
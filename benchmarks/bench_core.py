@@ -0,0 +1,281 @@
+"""核心路径基准测试
+
+覆盖成绩/培养计划页面解析、GPA计算（含增量统计）、成绩比对以及成绩CSV的读写，
+使用合成成绩单（几十到几十万行），结果以JSON输出便于对比回归。
+
+用法（在项目根目录运行）:
+    python -m benchmarks.bench_core
+    python -m benchmarks.bench_core --sizes 10,1000,100000 --output bench.json
+    python -m benchmarks.bench_core --cases gpa,diff --pipeline
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional
+
+import Grade
+import AutoGrade
+from core.gpa import calculate_gpa, GPAAggregator
+from core.config import Config
+from core.csv_records import iter_grade_records, read_course_file, GRADE_FIELD_TYPES
+from core.neu_get_grade import NEUGradeService
+from core.neu_get_plan import NEUPlanService
+from core.neu_parser import PARSERS, lxml
+from core.neu_mock_server import (
+    MockNEUServer, GRADE_HEADERS, generate_transcript, render_grades_page,
+    generate_plan, render_plan_page
+)
+
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+# 超过该行数时跳过BeautifulSoup解析（单次耗时过长），可用 --soup-limit 调整
+DEFAULT_SOUP_LIMIT = 20000
+
+
+def measure(func: Callable[[], Any], min_time: float = 0.2, max_runs: int = 50,
+            setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """
+    多次运行函数并统计耗时
+
+    先运行一次；若总耗时不足 min_time 则继续运行，直到达到 min_time 或 max_runs。
+
+    Args:
+        func: 被测函数
+        min_time: 最少累计运行时间（秒）
+        max_runs: 最多运行次数
+        setup: 每次运行前调用的准备函数，不计入耗时
+
+    Returns:
+        包含 runs、min、median、mean（秒）的字典
+    """
+    timings = []
+    while True:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        if sum(timings) >= min_time or len(timings) >= max_runs:
+            break
+
+    return {
+        "runs": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings)
+    }
+
+
+def make_changed_transcript(courses: List[Dict[str, Any]], change_ratio: float = 0.01,
+                            seed: int = 0) -> List[Dict[str, Any]]:
+    """复制成绩单并修改部分课程成绩、追加少量新课程，用于成绩比对"""
+    rng = random.Random(seed)
+    changed = [dict(course) for course in courses]
+    count = max(1, int(len(changed) * change_ratio))
+    for course in rng.sample(changed, min(count, len(changed))):
+        course["最终"] = str(rng.randint(60, 100))
+    for i in range(count):
+        extra = dict(changed[i % len(changed)])
+        extra["课程名称"] = f"新增课程{i}"
+        changed.append(extra)
+    return changed
+
+
+@contextlib.contextmanager
+def _quiet():
+    """屏蔽被测函数的print输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_size(size: int, cases: List[str], workdir: str, min_time: float, soup_limit: int) -> List[Dict[str, Any]]:
+    """
+    对单个规模运行所选用例
+
+    Returns:
+        结果记录列表
+    """
+    results = []
+
+    def record(case: str, stats: Dict[str, Any], **extra):
+        entry = {"case": case, "size": size, **extra, **stats}
+        entry["per_row_us"] = stats["median"] / size * 1e6 if size else 0.0
+        results.append(entry)
+        label = case + "".join(f"[{value}]" for value in extra.values())
+        print(f"{label:<40} {size:>8} 行  中位数 {stats['median'] * 1000:>10.3f} ms  "
+              f"({entry['per_row_us']:.2f} us/行, {stats['runs']} 次)", file=sys.stderr)
+
+    courses = generate_transcript(size, seed=size)
+    grades_html = render_grades_page(courses)
+    grades_result = NEUGradeService(None, parser="soup")._parse_grades_response(grades_html)
+    parsed_courses = grades_result["courses"]
+
+    if "parse" in cases:
+        engines = [name for name in PARSERS if name != "lxml" or lxml is not None]
+        for engine in engines:
+            if engine == "soup" and size > soup_limit:
+                continue
+            service = NEUGradeService(None, parser=engine)
+            record("parse_grades", measure(lambda: service._parse_grades_response(grades_html), min_time),
+                   engine=engine)
+
+        plan_html = render_plan_page(generate_plan(size, seed=size))
+        for engine in engines:
+            if engine == "soup" and size > soup_limit:
+                continue
+            service = NEUPlanService(None, parser=engine)
+            record("parse_plan", measure(lambda: service._parse_plan_response(plan_html), min_time),
+                   engine=engine)
+
+    if "gpa" in cases:
+        dict_courses = parsed_courses.to_dicts()
+        record("calculate_gpa", measure(lambda: calculate_gpa(parsed_courses), min_time), input="table")
+        record("calculate_gpa", measure(lambda: calculate_gpa(dict_courses), min_time), input="dicts")
+
+        aggregator = GPAAggregator(parsed_courses)
+        edited = [dict(course) for course in parsed_courses[:100]]
+        for course in edited:
+            course["绩点"] = 5.0
+
+        def update_aggregator():
+            for course in edited:
+                aggregator.update(course)
+
+        record("gpa_aggregator_build", measure(lambda: GPAAggregator(parsed_courses), min_time))
+        stats = measure(update_aggregator, min_time)
+        results.append({"case": "gpa_aggregator_update", "size": size, **stats,
+                        "per_row_us": stats["median"] / len(edited) * 1e6})
+        print(f"{'gpa_aggregator_update':<40} {size:>8} 行  中位数 {stats['median'] * 1000:>10.3f} ms  "
+              f"({len(edited)} 门课程)", file=sys.stderr)
+
+    if "diff" in cases:
+        changed = make_changed_transcript(parsed_courses, seed=size)
+        record("find_grade_differences",
+               measure(lambda: AutoGrade.find_grade_differences(parsed_courses, changed), min_time))
+
+    if "csv" in cases:
+        csv_path = os.path.join(workdir, f"grades_{size}.csv")
+        save_data = {"courses": parsed_courses, "headers": list(GRADE_HEADERS)}
+        with _quiet():
+            record("save_grades_to_csv", measure(lambda: Grade.save_grades_to_csv(save_data, csv_path), min_time),
+                   module="Grade")
+            record("save_grades_to_csv", measure(lambda: AutoGrade.save_grades_to_csv(save_data, csv_path), min_time),
+                   module="AutoGrade")
+            record("load_previous_grades", measure(lambda: AutoGrade.load_previous_grades(csv_path), min_time))
+            record("stream_csv_gpa", measure(lambda: calculate_gpa(iter_grade_records(csv_path)), min_time))
+            record("read_course_file", measure(
+                lambda: read_course_file(csv_path, GRADE_FIELD_TYPES, use_snapshot=False), min_time), source="csv")
+            read_course_file(csv_path, GRADE_FIELD_TYPES, use_snapshot=True)
+            record("read_course_file", measure(
+                lambda: read_course_file(csv_path, GRADE_FIELD_TYPES, use_snapshot=True), min_time), source="snapshot")
+
+    return results
+
+
+def bench_pipeline(size: int, workdir: str, rounds: int = 5) -> List[Dict[str, Any]]:
+    """
+    在本地模拟服务器上运行完整的 AutoGrade.check_grades 流程
+
+    依次测量：首次完整检查、页面无变化（指纹快速路径）、发布新成绩后的检查。
+
+    Returns:
+        结果记录列表
+    """
+    results = []
+    output_dir = os.path.join(workdir, f"pipeline_{size}")
+    config_path = os.path.join(workdir, f"pipeline_{size}.json")
+
+    with MockNEUServer(transcript_size=size, seed=size) as server:
+        config_data = server.config_overrides()
+        config_data["auth"] = {"username": "bench", "password": "bench"}
+        config_data["output"] = {"directory": output_dir, "grades_filename": "grades.csv"}
+        config_data["session"] = {"enabled": True, "cache_dir": os.path.join(workdir, "cache")}
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config_data, f, ensure_ascii=False)
+        config = Config(config_path)
+
+        def run(case: str):
+            start = time.perf_counter()
+            with _quiet():
+                AutoGrade.check_grades(config)
+            elapsed = time.perf_counter() - start
+            results.append({"case": case, "size": size, "runs": 1, "min": elapsed, "median": elapsed, "mean": elapsed,
+                            "per_row_us": elapsed / size * 1e6 if size else 0.0})
+            print(f"{case:<40} {size:>8} 行  {elapsed * 1000:>10.3f} ms", file=sys.stderr)
+
+        run("pipeline_first_check")
+        for _ in range(rounds):
+            run("pipeline_unchanged")
+        for _ in range(rounds):
+            server.publish_grade("bench")
+            run("pipeline_changed")
+
+    return results
+
+
+def _parse_sizes(text: str) -> List[int]:
+    sizes = []
+    for part in text.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        multiplier = 1000 if part.endswith('k') else 1
+        sizes.append(int(float(part.rstrip('k')) * multiplier))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析、比对、GPA计算和CSV读写的基准测试")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="成绩单行数，逗号分隔，支持 10k 写法")
+    parser.add_argument("--cases", default="parse,gpa,diff,csv", help="运行的用例: parse,gpa,diff,csv")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每个用例最少累计运行时间（秒）")
+    parser.add_argument("--soup-limit", type=int, default=DEFAULT_SOUP_LIMIT,
+                        help="BeautifulSoup解析的最大行数")
+    parser.add_argument("--pipeline", action="store_true", help="额外在本地模拟服务器上运行完整检查流程")
+    parser.add_argument("--pipeline-sizes", default="100,1000", help="完整流程的成绩单行数")
+    parser.add_argument("--output", default=None, help="结果JSON文件路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+    results = []
+    workdir = tempfile.mkdtemp(prefix="neu_bench_")
+    try:
+        for size in _parse_sizes(args.sizes):
+            results.extend(bench_size(size, cases, workdir, args.min_time, args.soup_limit))
+        if args.pipeline:
+            for size in _parse_sizes(args.pipeline_sizes):
+                results.extend(bench_pipeline(size, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "lxml": lxml is not None,
+        "results": results
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"结果已保存到: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
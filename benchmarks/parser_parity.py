@@ -0,0 +1,81 @@
+"""解析引擎一致性检查
+
+用 lxml 引擎和 BeautifulSoup 引擎分别解析同一批页面，比较两者的输出（或抛出的错误）是否完全一致。
+页面包括 benchmarks/pages/ 下按教务系统页面结构整理的样例页（grades_*.html、plan_*.html），
+以及本地模拟服务器渲染的不同规模的合成页面。有不一致时以非零状态退出。
+
+注意：BeautifulSoup 的 html.parser 不会补全未闭合的 <td>/<tr>，这类页面两种引擎的结果不同，
+不在样例范围内。
+
+用法（在项目根目录运行）:
+    python -m benchmarks.parser_parity
+    python -m benchmarks.parser_parity --pages saved/ --sizes 10,1000
+"""
+import os
+import sys
+import glob
+import argparse
+from typing import List, Tuple
+
+from core.neu_parser import compare_parsers, lxml
+from core.neu_mock_server import generate_transcript, render_grades_page, generate_plan, render_plan_page
+
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+DEFAULT_SIZES = [0, 1, 10, 100, 1000]
+
+
+def saved_pages(directory: str) -> List[Tuple[str, str, str]]:
+    """
+    读取目录中的样例页面
+
+    Returns:
+        (名称, 页面类型, HTML) 列表，页面类型由文件名前缀 grades_ / plan_ 决定
+    """
+    pages = []
+    for kind in ("grades", "plan"):
+        for path in sorted(glob.glob(os.path.join(directory, f"{kind}_*.html"))):
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append((os.path.relpath(path), kind, f.read()))
+    return pages
+
+
+def generated_pages(sizes: List[int], seeds: int = 3) -> List[Tuple[str, str, str]]:
+    """模拟服务器渲染的成绩和培养计划页面"""
+    pages = []
+    for size in sizes:
+        for seed in range(seeds):
+            pages.append((f"mock grades size={size} seed={seed}", "grades",
+                          render_grades_page(generate_transcript(size, seed=seed))))
+            pages.append((f"mock plan size={size} seed={seed}", "plan",
+                          render_plan_page(generate_plan(size, seed=seed))))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查lxml与BeautifulSoup解析引擎的输出是否一致")
+    parser.add_argument("--pages", default=PAGES_DIR, help="样例页面目录")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="合成页面的课程数，逗号分隔")
+    args = parser.parse_args()
+
+    if lxml is None:
+        print("未安装lxml，无法比较解析引擎", file=sys.stderr)
+        sys.exit(2)
+
+    sizes = [int(part) for part in args.sizes.split(',') if part.strip()]
+    pages = saved_pages(args.pages) + generated_pages(sizes)
+
+    mismatches = 0
+    for name, kind, html_content in pages:
+        if not compare_parsers(html_content, kind):
+            mismatches += 1
+            print(f"不一致: {name}")
+
+    print(f"共检查 {len(pages)} 个页面，不一致 {mismatches} 个")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
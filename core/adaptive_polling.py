@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from .scheduler import PeriodSchedule
+from .csv_records import atomic_write_bytes
+
+
+# 历史记录最多保留的条数
+MAX_HISTORY_EVENTS = 5000
+
+# 学期结束后按周统计的周数，超出的归入同一组
+DEFAULT_MAX_WEEKS = 8
+
+_ONE_HOUR = timedelta(hours=1)
+
+
+class ReleaseHistory:
+    """成绩发布历史
+
+    记录每次检测到成绩变化的时间和变化数，保存为JSON文件，多个账号共用。
+    """
+
+    def __init__(self, path: str, max_events: int = MAX_HISTORY_EVENTS):
+        """
+        初始化发布历史
+
+        Args:
+            path: 历史文件路径
+            max_events: 最多保留的记录数，超出时丢弃最早的记录
+        """
+        self.path = path
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._events: List[Tuple[float, int]] = []
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._events = sorted((float(item[0]), int(item[1])) for item in data.get("events", []))
+        except FileNotFoundError:
+            self._events = []
+        except (OSError, ValueError, TypeError, IndexError) as e:
+            logging.warning(f"读取成绩发布历史失败: {e}")
+            self._events = []
+
+    def _save(self) -> None:
+        data = {"events": [[timestamp, count] for timestamp, count in self._events]}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            atomic_write_bytes(self.path, json.dumps(data).encode('utf-8'))
+        except OSError as e:
+            logging.warning(f"保存成绩发布历史失败: {e}")
+
+    def record(self, count: int = 1, timestamp: Optional[float] = None) -> None:
+        """
+        记录一次成绩变化
+
+        Args:
+            count: 变化的数量（find_grade_differences 的结果数）
+            timestamp: 检测时间，默认为当前时间
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._events.append((timestamp, max(1, int(count))))
+            self._events.sort()
+            del self._events[:-self.max_events]
+            self._save()
+
+    def events(self) -> List[Tuple[float, int]]:
+        """(时间戳, 变化数) 列表，按时间排序"""
+        with self._lock:
+            return list(self._events)
+
+    def last_release(self) -> Optional[float]:
+        """最近一次成绩变化的时间戳"""
+        with self._lock:
+            return self._events[-1][0] if self._events else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._events)
+
+
+def _parse_dates(values: Iterable[Any]) -> List[date]:
+    result = []
+    for value in values or ():
+        try:
+            result.append(datetime.strptime(str(value), '%Y-%m-%d').date())
+        except ValueError:
+            logging.warning(f"无法解析学期结束日期: {value}")
+    return sorted(result)
+
+
+class AdaptiveSchedule(PeriodSchedule):
+    """根据成绩发布历史调整检查间隔
+
+    统计历史变化所在的小时（相邻小时平滑）和距学期结束的周数，得到各时刻的发布强度
+    （相对平均值的倍数），检查间隔 = 时段间隔 / 强度，并限制在 [min_interval, max_interval]。
+    最近刚检测到变化时（成绩通常成批发布）使用最短间隔；历史记录不足时与时段表相同。
+    """
+
+    def __init__(self, base: PeriodSchedule, history: ReleaseHistory, min_interval: float = 300,
+                 max_interval: float = 14400, half_life_days: float = 365, min_samples: int = 5,
+                 burst_window: float = 3600, semester_end_dates: Iterable[Any] = (),
+                 max_weeks: int = DEFAULT_MAX_WEEKS, now: Optional[datetime] = None):
+        """
+        初始化自适应时段表
+
+        Args:
+            base: 基础时段表
+            history: 成绩发布历史
+            min_interval: 最短检查间隔（秒）
+            max_interval: 最长检查间隔（秒）
+            half_life_days: 历史记录的权重半衰期（天），越早的发布影响越小
+            min_samples: 启用自适应所需的最少记录数
+            burst_window: 检测到变化后保持最短间隔的时长（秒）
+            semester_end_dates: 学期结束日期（YYYY-MM-DD），用于按"学期结束后第几周"统计
+            max_weeks: 学期结束后按周统计的周数
+            now: 统计的参考时间，默认为当前时间
+        """
+        super().__init__(base.periods, base.default_interval, base.default_name)
+        self.history = history
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.burst_window = burst_window
+        self.semester_end_dates = _parse_dates(semester_end_dates)
+        self.max_weeks = max_weeks
+
+        events = history.events()
+        self.enabled = len(events) >= min_samples
+        self.hour_scores = [1.0] * 24
+        self.week_scores = [1.0] * (max_weeks + 1)
+        if self.enabled:
+            self._fit(events, now or datetime.now(), half_life_days)
+
+    @classmethod
+    def from_config(cls, config, history: ReleaseHistory = None) -> PeriodSchedule:
+        """
+        由 auto.adaptive 配置构造时段表，未启用时返回基础时段表
+
+        Args:
+            config: 配置对象
+            history: 成绩发布历史，为None时按 auto.adaptive.history_path 读取
+        """
+        base = PeriodSchedule.from_config(config)
+        if not config.get('auto.adaptive.enabled', False):
+            return base
+        if history is None:
+            history = ReleaseHistory(config.get('auto.adaptive.history_path', 'output/release_history.json'))
+        return cls(
+            base, history,
+            min_interval=config.get('auto.adaptive.min_interval', 300),
+            max_interval=config.get('auto.adaptive.max_interval', 14400),
+            half_life_days=config.get('auto.adaptive.half_life_days', 365),
+            min_samples=config.get('auto.adaptive.min_samples', 5),
+            burst_window=config.get('auto.adaptive.burst_window', 3600),
+            semester_end_dates=config.get('auto.adaptive.semester_end_dates', []),
+            max_weeks=config.get('auto.adaptive.max_weeks', DEFAULT_MAX_WEEKS)
+        )
+
+    def signature(self) -> Tuple:
+        """时段表和学习到的发布强度的摘要"""
+        return super().signature() + (
+            self.enabled, self.min_interval, self.max_interval, self.burst_window,
+            tuple(round(score, 3) for score in self.hour_scores),
+            tuple(round(score, 3) for score in self.week_scores)
+        )
+
+    def week_bucket(self, moment: datetime) -> int:
+        """距最近一个已过的学期结束日的周数，超出统计范围或未配置时为 max_weeks"""
+        day = moment.date()
+        weeks = self.max_weeks
+        for end in self.semester_end_dates:
+            if end <= day:
+                weeks = min(self.max_weeks, (day - end).days // 7)
+        return weeks
+
+    def _fit(self, events: List[Tuple[float, int]], now: datetime, half_life_days: float) -> None:
+        hours = [0.0] * 24
+        weeks = [0.0] * (self.max_weeks + 1)
+        reference = now.timestamp()
+        for timestamp, count in events:
+            age_days = max(0.0, reference - timestamp) / 86400
+            weight = count * 0.5 ** (age_days / half_life_days) if half_life_days > 0 else count
+            moment = datetime.fromtimestamp(timestamp)
+            hours[moment.hour] += weight
+            weeks[self.week_bucket(moment)] += weight
+
+        # 相邻小时平滑并加入均匀先验，避免个别记录把某些小时的强度压到0
+        total = sum(hours)
+        prior = total / 24 * 0.1
+        smoothed = [0.25 * hours[h - 1] + 0.5 * hours[h] + 0.25 * hours[(h + 1) % 24] + prior for h in range(24)]
+        mean = sum(smoothed) / 24
+        if mean > 0:
+            self.hour_scores = [value / mean for value in smoothed]
+
+        if self.semester_end_dates:
+            prior = sum(weeks) / len(weeks) * 0.1
+            weeks = [value + prior for value in weeks]
+            mean = sum(weeks) / len(weeks)
+            if mean > 0:
+                self.week_scores = [value / mean for value in weeks]
+
+    def intensity_at(self, moment: datetime) -> float:
+        """时刻的发布强度（相对平均值的倍数）"""
+        if not self.enabled:
+            return 1.0
+        return self.hour_scores[moment.hour] * self.week_scores[self.week_bucket(moment)]
+
+    def interval_at(self, moment: datetime) -> Tuple[float, str]:
+        """
+        时刻的检查间隔
+
+        Returns:
+            (检查间隔秒数, 时段名称)
+        """
+        interval, name = super().interval_at(moment)
+
+        last_release = self.history.last_release()
+        if last_release is not None and 0 <= moment.timestamp() - last_release < self.burst_window:
+            # 刚检测到变化：同一批成绩通常陆续发布
+            return self.min_interval, name
+        if not self.enabled:
+            return interval, name
+
+        intensity = self.intensity_at(moment)
+        adjusted = min(self.max_interval, max(self.min_interval, interval / intensity))
+        return adjusted, name
+
+    def next_wake(self, moment: datetime) -> Tuple[datetime, str]:
+        """
+        计算下次唤醒时间
+
+        在时段表的基础上，若等待期间进入了间隔更短的小时（发布强度更高），在该小时开始时唤醒。
+
+        Returns:
+            (唤醒时间, 当前时段名称)
+        """
+        wake, name = super().next_wake(moment)
+        if not self.enabled:
+            return wake, name
+
+        interval, _ = self.interval_at(moment)
+        hour = moment.replace(minute=0, second=0, microsecond=0) + _ONE_HOUR
+        while hour < wake:
+            if self.interval_at(hour)[0] < interval:
+                return hour, name
+            hour += _ONE_HOUR
+        return wake, name
+
+    def describe(self) -> Dict[str, Any]:
+        """学习到的发布强度（用于日志和排查）"""
+        return {
+            "enabled": self.enabled,
+            "samples": len(self.history),
+            "hour_scores": [round(score, 3) for score in self.hour_scores],
+            "week_scores": [round(score, 3) for score in self.week_scores] if self.semester_end_dates else None
+        }
+
@@ -0,0 +1,502 @@
+import os
+import sys
+import json
+import time
+import array
+import logging
+import argparse
+import threading
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 群体统计查询为可选功能
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows 下只做进程内加锁
+    fcntl = None
+
+from .gpa import to_float
+from .csv_records import read_course_file, GRADE_FIELD_TYPES
+
+
+ARCHIVE_VERSION = 1
+
+# 课程记录列：列名 -> (array类型码, numpy类型)；每列一个定长记录文件，只追加
+RECORD_COLUMNS = {
+    "snapshot": ('i', 'i4'),      # 快照编号
+    "student": ('i', 'i4'),       # 学生编号（students 字典）
+    "course": ('i', 'i4'),        # 课程编号（courses 字典）
+    "semester": ('i', 'i4'),      # 学期编号（semesters 字典）
+    "category": ('i', 'i4'),      # 课程类别编号（categories 字典）
+    "credit": ('d', 'f8'),        # 学分
+    "grade_point": ('d', 'f8'),   # 绩点
+    "score": ('d', 'f8'),         # 总评成绩（非数字成绩为NaN）
+}
+
+# 快照记录列：每次追加一份成绩单产生一条
+SNAPSHOT_COLUMNS = {
+    "snapshot_student": ('i', 'i4'),
+    "snapshot_time": ('d', 'f8'),
+    "snapshot_end": ('q', 'i8'),  # 追加完成后的课程记录总数
+}
+
+# 字符串字典：编号即在文件中的行号
+DICTIONARIES = ("students", "courses", "semesters", "categories")
+
+# 绩点大于该值的课程计为已获得学分
+DEFAULT_PASS_POINT = 0.0
+
+_NAN = float("nan")
+
+
+def _require_numpy():
+    """检查numpy是否可用"""
+    if np is None:
+        raise ImportError("群体统计查询需要安装numpy: pip install numpy")
+
+
+class _StringDictionary:
+    """只追加的字符串字典文件，每行一个值"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values = []
+        self.codes = {}
+        self._offset = 0
+
+    def refresh(self) -> None:
+        """读取其他进程追加的值"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # 只处理完整的行，未写完的行留到下次
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return
+        for line in data[:end].decode('utf-8').split('\n')[:-1]:
+            self.codes.setdefault(line, len(self.values))
+            self.values.append(line)
+        self._offset += end
+
+    def encode(self, values: Iterable[str]) -> List[int]:
+        """将值转换为编号，新值追加到文件"""
+        new_values = []
+        codes = []
+        for value in values:
+            value = str(value or '').replace('\r', ' ').replace('\n', ' ')
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+                new_values.append(value)
+            codes.append(code)
+        if new_values:
+            data = ''.join(value + '\n' for value in new_values).encode('utf-8')
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._offset += len(data)
+        return codes
+
+
+class CohortArchive:
+    """多名学生成绩快照的列式归档
+
+    每列保存为一个定长记录文件，追加成绩单时各列文件只在末尾写入；
+    查询时通过 numpy.memmap 映射所需的列，不把记录读成Python对象。
+    同一学生的多次快照都会保留，统计默认只使用每名学生的最新快照。
+    """
+
+    def __init__(self, directory: str = "output/cohort"):
+        """
+        打开或创建归档
+
+        Args:
+            directory: 归档目录
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") != ARCHIVE_VERSION:
+                raise ValueError(f"不支持的归档版本: {meta.get('version')}")
+        else:
+            meta = {"version": ARCHIVE_VERSION,
+                    "columns": {name: spec[1] for name, spec in {**RECORD_COLUMNS, **SNAPSHOT_COLUMNS}.items()}}
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        self.dictionaries = {name: _StringDictionary(os.path.join(directory, f"{name}.txt"))
+                             for name in DICTIONARIES}
+        for dictionary in self.dictionaries.values():
+            dictionary.refresh()
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _count(self, columns: Dict[str, Tuple[str, str]]) -> int:
+        """各列都已完整写入的记录数"""
+        counts = []
+        for name, (typecode, _) in columns.items():
+            try:
+                size = os.path.getsize(self._column_path(name))
+            except OSError:
+                size = 0
+            counts.append(size // array.array(typecode).itemsize)
+        return min(counts)
+
+    def __len__(self) -> int:
+        """已提交的课程记录数（含历史快照）"""
+        return self._committed_records(self.snapshot_count)
+
+    def _committed_records(self, snapshot_count: int) -> int:
+        """前 snapshot_count 个快照对应的课程记录数"""
+        if snapshot_count == 0:
+            return 0
+        values = array.array(SNAPSHOT_COLUMNS["snapshot_end"][0])
+        with open(self._column_path("snapshot_end"), 'rb') as f:
+            f.seek((snapshot_count - 1) * values.itemsize)
+            values.fromfile(f, 1)
+        return values[0]
+
+    @property
+    def snapshot_count(self) -> int:
+        """快照数"""
+        return self._count(SNAPSHOT_COLUMNS)
+
+    def _truncate(self, columns: Dict[str, Tuple[str, str]], count: int) -> None:
+        """截掉中断追加留下的未提交记录"""
+        for name, (typecode, _) in columns.items():
+            path = self._column_path(name)
+            size = count * array.array(typecode).itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                logging.warning(f"归档列 {name} 长度不一致，截断到 {count} 条记录")
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _append_columns(self, columns: Dict[str, Tuple[str, str]], values: Dict[str, List[Any]]) -> None:
+        for name, (typecode, _) in columns.items():
+            with open(self._column_path(name), 'ab') as f:
+                array.array(typecode, values[name]).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _file_lock(self):
+        """跨进程的追加锁（不支持时返回None）"""
+        if fcntl is None:
+            return None
+        f = open(os.path.join(self.directory, "append.lock"), 'a')
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return f
+
+    def append(self, student: str, grades_result: Dict[str, Any], taken_at: Optional[float] = None) -> int:
+        """
+        追加一名学生的成绩快照
+
+        Args:
+            student: 学号
+            grades_result: NEUGradeService.get_grades() 的返回值（或包含 courses 的字典）
+            taken_at: 快照时间戳，默认为当前时间
+
+        Returns:
+            追加的课程记录数
+        """
+        courses = grades_result.get('courses') or []
+        taken_at = time.time() if taken_at is None else taken_at
+
+        with self._lock:
+            lock_file = self._file_lock()
+            try:
+                for dictionary in self.dictionaries.values():
+                    dictionary.refresh()
+                snapshot_id = self._count(SNAPSHOT_COLUMNS)
+                self._truncate(SNAPSHOT_COLUMNS, snapshot_id)
+                record_count = self._committed_records(snapshot_id)
+                self._truncate(RECORD_COLUMNS, record_count)
+
+                student_code = self.dictionaries["students"].encode([student])[0]
+                values = {
+                    "snapshot": [snapshot_id] * len(courses),
+                    "student": [student_code] * len(courses),
+                    "course": self.dictionaries["courses"].encode(c.get('课程名称', '') for c in courses),
+                    "semester": self.dictionaries["semesters"].encode(c.get('学年学期', '') for c in courses),
+                    "category": self.dictionaries["categories"].encode(c.get('课程类别', '') for c in courses),
+                }
+                for name, field in (("credit", '学分'), ("grade_point", '绩点'), ("score", '总评成绩')):
+                    column = []
+                    for course in courses:
+                        value = to_float(course.get(field))
+                        column.append(_NAN if value is None else value)
+                    values[name] = column
+
+                # 先写课程记录，再写快照记录；快照记录是追加完成的标志
+                self._append_columns(RECORD_COLUMNS, values)
+                self._append_columns(SNAPSHOT_COLUMNS, {"snapshot_student": [student_code],
+                                                        "snapshot_time": [taken_at],
+                                                        "snapshot_end": [record_count + len(courses)]})
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+
+        logging.info(f"归档 {student} 的成绩快照: {len(courses)} 条记录")
+        return len(courses)
+
+    def import_csv(self, student: str, csv_path: str, taken_at: Optional[float] = None) -> int:
+        """
+        导入已有的成绩CSV
+
+        Args:
+            student: 学号
+            csv_path: 成绩文件路径
+            taken_at: 快照时间戳，默认为文件修改时间
+
+        Returns:
+            追加的课程记录数
+        """
+        courses = read_course_file(csv_path, GRADE_FIELD_TYPES)
+        if taken_at is None:
+            taken_at = os.path.getmtime(csv_path)
+        return self.append(student, {"courses": courses}, taken_at)
+
+    def column(self, name: str, snapshot_count: Optional[int] = None) -> "np.ndarray":
+        """
+        以内存映射方式读取一列
+
+        Args:
+            name: 列名（RECORD_COLUMNS 或 SNAPSHOT_COLUMNS 中的列）
+            snapshot_count: 只读取前若干个快照的数据；同一次查询的各列应传入相同的值，
+                避免并发追加导致各列长度不一致。为None时读取当前全部已提交的数据
+
+        Returns:
+            只读的 numpy 数组
+        """
+        _require_numpy()
+        if snapshot_count is None:
+            snapshot_count = self.snapshot_count
+        if name in RECORD_COLUMNS:
+            count = self._committed_records(snapshot_count)
+            dtype = RECORD_COLUMNS[name][1]
+        elif name in SNAPSHOT_COLUMNS:
+            count = snapshot_count
+            dtype = SNAPSHOT_COLUMNS[name][1]
+        else:
+            raise KeyError(name)
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(count,))
+
+    def _names(self, dictionary: str) -> List[str]:
+        values = self.dictionaries[dictionary]
+        values.refresh()
+        return values.values
+
+    def latest_mask(self, snapshot_count: Optional[int] = None) -> "np.ndarray":
+        """
+        每名学生最新快照中的记录
+
+        Args:
+            snapshot_count: 同 column()
+
+        Returns:
+            与课程记录等长的布尔数组
+        """
+        _require_numpy()
+        if snapshot_count is None:
+            snapshot_count = self.snapshot_count
+        snapshot_students = self.column("snapshot_student", snapshot_count)
+        snapshots = self.column("snapshot", snapshot_count)
+        if snapshot_students.size == 0:
+            return np.zeros(snapshots.size, dtype=bool)
+
+        latest = np.full(int(snapshot_students.max()) + 1, -1, dtype=np.int64)
+        np.maximum.at(latest, snapshot_students, np.arange(snapshot_students.size))
+        is_latest = np.zeros(snapshot_students.size, dtype=bool)
+        is_latest[latest[latest >= 0]] = True
+        return is_latest[snapshots]
+
+    def student_gpas(self) -> Dict[str, Dict[str, float]]:
+        """
+        每名学生（最新快照）的总学分和平均绩点，与 calculate_gpa 的计入规则一致
+
+        Returns:
+            学号 -> {"credits", "gpa"}
+        """
+        _require_numpy()
+        snapshot_count = self.snapshot_count
+        mask = self.latest_mask(snapshot_count)
+        credit = self.column("credit", snapshot_count)
+        grade_point = self.column("grade_point", snapshot_count)
+        students = self.column("student", snapshot_count)
+        valid = mask & ~np.isnan(credit) & ~np.isnan(grade_point)
+
+        names = self._names("students")
+        weights = credit[valid]
+        credits = np.bincount(students[valid], weights=weights, minlength=len(names))
+        points = np.bincount(students[valid], weights=weights * grade_point[valid], minlength=len(names))
+        present = np.bincount(students[mask], minlength=len(names)) > 0
+
+        result = {}
+        for code in np.flatnonzero(present | (credits > 0)):
+            gpa = points[code] / credits[code] if credits[code] > 0 else 0.0
+            result[names[code]] = {"credits": float(credits[code]), "gpa": float(gpa)}
+        return result
+
+    def ranks(self) -> List[Dict[str, Any]]:
+        """
+        按平均绩点排名（并列时名次相同）
+
+        Returns:
+            按名次排序的 {"student", "gpa", "credits", "rank"} 列表
+        """
+        _require_numpy()
+        gpas = self.student_gpas()
+        if not gpas:
+            return []
+        students = list(gpas)
+        values = np.array([gpas[student]["gpa"] for student in students])
+        order = np.argsort(-values, kind="stable")
+        # 名次 = 1 + 绩点严格更高的人数
+        sorted_desc = values[order]
+        ranks = np.searchsorted(-sorted_desc, -sorted_desc, side="left") + 1
+        return [{"student": students[i], "gpa": float(values[i]), "credits": gpas[students[i]]["credits"],
+                 "rank": int(rank)} for i, rank in zip(order, ranks)]
+
+    def course_distribution(self, course: Optional[str] = None, field: str = "grade_point",
+                            percentiles: Iterable[float] = (25, 50, 75)) -> Dict[str, Dict[str, Any]]:
+        """
+        课程成绩分布（最新快照）
+
+        Args:
+            course: 课程名称，为None时统计所有课程
+            field: 统计的列: grade_point 或 score
+            percentiles: 需要计算的分位数
+
+        Returns:
+            课程名称 -> {"count", "mean", "std", "min", "max", "percentiles"}
+        """
+        _require_numpy()
+        if field not in ("grade_point", "score", "credit"):
+            raise ValueError(f"不支持的统计列: {field}")
+        percentiles = list(percentiles)
+        snapshot_count = self.snapshot_count
+        courses = self.column("course", snapshot_count)
+        values = self.column(field, snapshot_count)
+        mask = self.latest_mask(snapshot_count) & ~np.isnan(values)
+        # 字典先于列数据写入，在读取列之后刷新
+        names = self._names("courses")
+        if course is not None:
+            code = self.dictionaries["courses"].codes.get(course)
+            if code is None:
+                return {}
+            mask &= courses == code
+
+        selected_courses = courses[mask]
+        selected_values = values[mask]
+        if selected_values.size == 0:
+            return {}
+
+        # 按课程排序后分组，每组一次向量运算
+        order = np.lexsort((selected_values, selected_courses))
+        selected_courses = selected_courses[order]
+        selected_values = selected_values[order]
+        boundaries = np.flatnonzero(np.diff(selected_courses)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [selected_values.size]))
+
+        result = {}
+        for start, end in zip(starts, ends):
+            group = selected_values[start:end]
+            result[names[selected_courses[start]]] = {
+                "count": int(group.size),
+                "mean": float(group.mean()),
+                "std": float(group.std()),
+                "min": float(group[0]),
+                "max": float(group[-1]),
+                "percentiles": {float(p): float(v) for p, v in zip(percentiles, np.percentile(group, percentiles))}
+                if percentiles else {}
+            }
+        return result
+
+    def credit_completion(self, required_credits: Optional[float] = None,
+                          pass_point: float = DEFAULT_PASS_POINT) -> Dict[str, Dict[str, Any]]:
+        """
+        学分完成情况（最新快照）
+
+        Args:
+            required_credits: 毕业要求学分，给出时计算完成比例
+            pass_point: 绩点大于该值的课程计为已获得学分
+
+        Returns:
+            学号 -> {"earned", "attempted", "ratio"}
+        """
+        _require_numpy()
+        snapshot_count = self.snapshot_count
+        mask = self.latest_mask(snapshot_count)
+        credit = self.column("credit", snapshot_count)
+        grade_point = self.column("grade_point", snapshot_count)
+        students = self.column("student", snapshot_count)
+        attempted_mask = mask & ~np.isnan(credit)
+        earned_mask = attempted_mask & (grade_point > pass_point)
+
+        names = self._names("students")
+        attempted = np.bincount(students[attempted_mask], weights=credit[attempted_mask],
+                                minlength=len(names))
+        earned = np.bincount(students[earned_mask], weights=credit[earned_mask],
+                             minlength=len(names))
+        present = np.bincount(students[mask], minlength=len(names)) > 0
+
+        result = {}
+        for code in np.flatnonzero(present):
+            entry = {"earned": float(earned[code]), "attempted": float(attempted[code])}
+            if required_credits:
+                entry["ratio"] = float(earned[code] / required_credits)
+            result[names[code]] = entry
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="成绩快照列式归档：导入成绩CSV并输出群体统计")
+    parser.add_argument("--archive", default="output/cohort", help="归档目录")
+    parser.add_argument("--import", dest="imports", nargs=2, action="append", metavar=("学号", "CSV"), default=[],
+                        help="导入成绩CSV，可重复")
+    parser.add_argument("--import-dir", default=None,
+                        help="导入目录下各子目录（以学号命名）中的 grades.csv")
+    parser.add_argument("--report", choices=["ranks", "courses", "credits"], default=None, help="输出统计")
+    parser.add_argument("--required-credits", type=float, default=None, help="毕业要求学分")
+    args = parser.parse_args()
+
+    archive = CohortArchive(args.archive)
+    imports = list(args.imports)
+    if args.import_dir:
+        for name in sorted(os.listdir(args.import_dir)):
+            path = os.path.join(args.import_dir, name, "grades.csv")
+            if os.path.isfile(path):
+                imports.append((name, path))
+    for student, path in imports:
+        count = archive.import_csv(student, path)
+        print(f"已导入 {student}: {count} 条记录", file=sys.stderr)
+
+    if args.report == "ranks":
+        report = archive.ranks()
+    elif args.report == "courses":
+        report = archive.course_distribution()
+    elif args.report == "credits":
+        report = archive.credit_completion(args.required_credits)
+    else:
+        return
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
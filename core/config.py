@@ -1,11 +1,102 @@
 import json
 import os
-from typing import Dict, Any, Optional
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+# 默认配置文件路径
+DEFAULT_CONFIG_PATH = "config/config.json"
+
+# 配置中不存在的键
+_MISSING = object()
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_clock(value: Any) -> bool:
+    try:
+        datetime.strptime(value, '%H:%M')
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+# 配置项校验规则：键 -> (检查函数, 说明)；只检查配置中出现的键
+CONFIG_RULES = {
+    'auth.username': (lambda v: isinstance(v, str), "字符串"),
+    'auth.password': (lambda v: isinstance(v, str), "字符串"),
+    'accounts': (lambda v: isinstance(v, list), "列表"),
+    'auto.frequent_period.start_time': (_check_clock, "HH:MM 格式的时刻"),
+    'auto.frequent_period.end_time': (_check_clock, "HH:MM 格式的时刻"),
+    'auto.frequent_period.interval': (lambda v: _is_number(v) and v > 0, "正数（秒）"),
+    'auto.cold_period.start_time': (_check_clock, "HH:MM 格式的时刻"),
+    'auto.cold_period.end_time': (_check_clock, "HH:MM 格式的时刻"),
+    'auto.cold_period.interval': (lambda v: _is_number(v) and v > 0, "正数（秒）"),
+    'auto.max_workers': (lambda v: isinstance(v, int) and not isinstance(v, bool) and v > 0, "正整数"),
+    'auto.jitter': (lambda v: _is_number(v) and v >= 0, "非负数（秒）"),
+    'auto.host_limits': (lambda v: isinstance(v, dict), "主机到并发数的映射"),
+    'auto.adaptive.min_interval': (lambda v: _is_number(v) and v > 0, "正数（秒）"),
+    'auto.adaptive.max_interval': (lambda v: _is_number(v) and v > 0, "正数（秒）"),
+    'auto.adaptive.semester_end_dates': (lambda v: isinstance(v, list), "日期列表"),
+    'email.smtp_port': (lambda v: isinstance(v, int) and not isinstance(v, bool), "整数"),
+    'email.use_tls': (lambda v: isinstance(v, bool), "true 或 false"),
+    'email.digest_window': (lambda v: _is_number(v) and v >= 0, "非负数（秒）"),
+    'email.retry': (lambda v: isinstance(v, dict), "重试策略对象"),
+    'notify.sinks': (lambda v: isinstance(v, list) and all(isinstance(item, dict) for item in v), "渠道配置列表"),
+    'storage.backend': (lambda v: v in ('csv', 'sqlite'), "csv 或 sqlite"),
+    'storage.csv_snapshot': (lambda v: isinstance(v, bool), "true 或 false"),
+}
+
+
+def flatten_config(data: Any, prefix: str = "", result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    将嵌套配置展开为点号分隔的扁平映射，每一级前缀都保留（如 'auto' 和 'auto.max_workers'）
+
+    Args:
+        data: 配置数据
+        prefix: 键前缀
+        result: 输出映射
+
+    Returns:
+        扁平映射
+    """
+    if result is None:
+        result = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            result[path] = value
+            flatten_config(value, path, result)
+    return result
+
+
+def validate_config(data: Any, flat: Dict[str, Any]) -> None:
+    """
+    校验配置结构
+
+    Raises:
+        ValueError: 配置项类型或取值不正确
+    """
+    if not isinstance(data, dict):
+        raise ValueError("配置文件顶层必须是对象")
+    for key, (check, description) in CONFIG_RULES.items():
+        value = flat.get(key, _MISSING)
+        if value is not _MISSING and value is not None and not check(value):
+            raise ValueError(f"配置项 {key} 应为{description}，实际为 {value!r}")
+
 
 class Config:
-    """配置管理类"""
+    """配置管理类
+    
+    加载时校验配置并展开为扁平映射，get() 直接查表；
+    reload_if_changed() 在配置文件变化（修改时间、大小）时重新加载，
+    长期运行的进程通过 get_config() 共用同一个实例，修改配置无需重启。
+    """
     
-    def __init__(self, config_path: str = "config/config.json"):
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH):
         """
         初始化配置管理器
         
@@ -14,21 +105,70 @@ class Config:
         """
         self.config_path = config_path
         self._config_data = None
+        self._flat = {}
+        self._signature = None
+        self._lock = threading.Lock()
+        # 每次成功加载后递增，调用方可据此判断配置是否变化
+        self.version = 0
         self._load_config()
     
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+    
     def _load_config(self) -> None:
         """加载配置文件"""
         try:
             if not os.path.exists(self.config_path):
                 raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
             
+            signature = self._file_signature()
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                self._config_data = json.load(f)
+                config_data = json.load(f)
+            flat = flatten_config(config_data)
+            validate_config(config_data, flat)
                 
         except json.JSONDecodeError as e:
             raise ValueError(f"配置文件格式错误: {e}")
+        except ValueError:
+            raise
         except Exception as e:
             raise RuntimeError(f"加载配置文件失败: {e}")
+        
+        # 数据和扁平映射一起替换，并发读取时不会看到新旧混合的状态
+        self._config_data, self._flat = config_data, flat
+        self._signature = signature
+        self.version += 1
+    
+    def reload_if_changed(self) -> bool:
+        """
+        配置文件变化时重新加载
+        
+        新配置无效时保留当前配置并记录日志，不影响正在运行的程序。
+        
+        Returns:
+            是否重新加载了配置
+        """
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return False
+        
+        with self._lock:
+            if self._file_signature() == self._signature:
+                return False
+            try:
+                self._load_config()
+            except (ValueError, RuntimeError) as e:
+                # 同一个无效文件不重复尝试
+                self._signature = signature
+                logging.error(f"重新加载配置失败，继续使用当前配置: {e}")
+                return False
+        
+        logging.info(f"配置已重新加载: {self.config_path}")
+        return True
     
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -41,18 +181,8 @@ class Config:
         Returns:
             配置值
         """
-        if self._config_data is None:
-            return default
-        
-        keys = key.split('.')
-        value = self._config_data
-        
-        try:
-            for k in keys:
-                value = value[k]
-            return value
-        except (KeyError, TypeError):
-            return default
+        value = self._flat.get(key, _MISSING)
+        return default if value is _MISSING else value
     
     def get_credentials(self) -> Dict[str, str]:
         """
@@ -74,6 +204,64 @@ class Config:
             'password': password
         }
     
+    def get_accounts(self) -> List[Dict[str, Any]]:
+        """
+        获取需要监控的账号列表
+        
+        Returns:
+            账号字典列表，每项至少包含username和password；
+            未配置accounts时退化为auth中的单个账号
+        """
+        accounts = self.get('accounts')
+        if not accounts:
+            return [dict(self.get_credentials())]
+        
+        if not isinstance(accounts, list):
+            raise ValueError("配置项accounts必须是列表")
+        
+        result = []
+        seen = set()
+        for index, account in enumerate(accounts):
+            if not isinstance(account, dict) or not account.get('username') or not account.get('password'):
+                raise ValueError(f"第 {index + 1} 个账号缺少用户名或密码")
+            if account['username'] in seen:
+                raise ValueError(f"账号重复: {account['username']}")
+            seen.add(account['username'])
+            result.append(dict(account))
+        
+        return result
+    
     def get_output_dir(self) -> str:
         """获取输出目录"""
-        return self.get('output.directory', 'output')
\ No newline at end of file
+        return self.get('output.directory', 'output')
+    
+    def get_session_cache_dir(self) -> Optional[str]:
+        """获取会话缓存目录，禁用会话缓存时返回None"""
+        if not self.get('session.enabled', True):
+            return None
+        return self.get('session.cache_dir', 'cache')
+
+
+# 按路径共享的配置实例
+_shared_configs: Dict[str, Config] = {}
+_shared_configs_lock = threading.Lock()
+
+
+def get_config(config_path: str = DEFAULT_CONFIG_PATH) -> Config:
+    """
+    获取进程内共享的配置实例，配置文件变化时自动重新加载
+
+    Args:
+        config_path: 配置文件路径
+
+    Returns:
+        配置对象
+    """
+    key = os.path.abspath(config_path)
+    with _shared_configs_lock:
+        config = _shared_configs.get(key)
+        if config is None:
+            config = _shared_configs[key] = Config(config_path)
+            return config
+    config.reload_if_changed()
+    return config
@@ -0,0 +1,273 @@
+import sys
+from collections.abc import MutableMapping, Mapping
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Sequence
+
+
+# 取值重复度高的列，单元格字符串驻留后多个学生的成绩单共用同一个对象
+INTERNED_COLUMNS = frozenset([
+    "学年学期", "课程类别", "课程性质", "考试或考查课", "课程类型", "课群", "成绩记载方式", "最终", "总评成绩"
+])
+
+# 行中缺失的字段
+_MISSING = object()
+
+
+class CourseSchema:
+    """课程表的列定义，同一张表的所有行共用"""
+
+    __slots__ = ("columns", "index", "_interned")
+
+    def __init__(self, columns: Iterable[str] = ()):
+        self.columns = []
+        self.index = {}
+        self._interned = []
+        for name in columns:
+            self.add_column(name)
+
+    def add_column(self, name: str) -> int:
+        """添加列（已存在时直接返回），返回列位置"""
+        position = self.index.get(name)
+        if position is None:
+            name = sys.intern(name)
+            position = len(self.columns)
+            self.columns.append(name)
+            self.index[name] = position
+            self._interned.append(name in INTERNED_COLUMNS)
+        return position
+
+    def prepare(self, values: Sequence[Any]) -> List[Any]:
+        """复制一行单元格，并驻留高重复度列的字符串"""
+        row = list(values)
+        interned = self._interned
+        for position in range(min(len(row), len(interned))):
+            if interned[position] and type(row[position]) is str:
+                row[position] = sys.intern(row[position])
+        return row
+
+
+class CourseRow(MutableMapping):
+    """一门课程的记录
+
+    只保存单元格值，列名由所属表的 CourseSchema 提供；
+    按字典方式访问（get、[]、in、keys、items、update），与原先的字典记录兼容。
+    """
+
+    __slots__ = ("_schema", "_values")
+
+    def __init__(self, schema: CourseSchema, values: List[Any]):
+        self._schema = schema
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        position = self._schema.index.get(key)
+        if position is None or position >= len(self._values):
+            raise KeyError(key)
+        value = self._values[position]
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self._schema.index.get(key)
+        if position is None or position >= len(self._values):
+            return default
+        value = self._values[position]
+        return default if value is _MISSING else value
+
+    def __contains__(self, key: object) -> bool:
+        position = self._schema.index.get(key)
+        return position is not None and position < len(self._values) and self._values[position] is not _MISSING
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        # 新字段会加入共用的列定义，其余行在该列视为缺失
+        position = self._schema.add_column(key)
+        values = self._values
+        if position >= len(values):
+            values.extend([_MISSING] * (position + 1 - len(values)))
+        values[position] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._values[self._schema.index[key]] = _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        columns = self._schema.columns
+        for position, value in enumerate(self._values):
+            if value is not _MISSING:
+                yield columns[position]
+
+    def __len__(self) -> int:
+        return sum(1 for value in self._values if value is not _MISSING)
+
+    def __repr__(self) -> str:
+        return f"CourseRow({dict(self)!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为普通字典"""
+        return dict(self)
+
+
+class CourseTable(list):
+    """课程记录表
+
+    一张成绩单或培养计划的全部课程，行共用同一个列定义。
+    保持列表接口（len、下标、切片、遍历、append），加入普通字典时自动转换为 CourseRow。
+    每次增删或替换行时 revision 加一，依赖行集合的缓存（如GPA统计）据此判断是否失效。
+    """
+
+    __slots__ = ("schema", "revision")
+
+    def __init__(self, columns: Iterable[str] = (), rows: Iterable[Any] = ()):
+        """
+        初始化课程表
+
+        Args:
+            columns: 列名
+            rows: 初始记录（字典或 CourseRow）
+        """
+        super().__init__()
+        self.schema = CourseSchema(columns)
+        self.revision = 0
+        self.extend(rows)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping], columns: Optional[Iterable[str]] = None) -> "CourseTable":
+        """
+        由字典记录构造课程表
+
+        Args:
+            records: 课程记录
+            columns: 列名，为None时使用第一条记录的字段
+
+        Returns:
+            课程表（记录会被复制）
+        """
+        records = list(records)
+        if columns is None:
+            columns = list(records[0].keys()) if records else []
+        return cls(columns, records)
+
+    @property
+    def columns(self) -> List[str]:
+        """列名"""
+        return list(self.schema.columns)
+
+    def append_values(self, values: Sequence[Any]) -> CourseRow:
+        """
+        按列顺序追加一行单元格值
+
+        Args:
+            values: 单元格值，长度不超过列数
+
+        Returns:
+            新增的行
+        """
+        row = CourseRow(self.schema, self.schema.prepare(values))
+        super().append(row)
+        self.revision += 1
+        return row
+
+    def _like(self, rows: Iterable[CourseRow] = ()) -> "CourseTable":
+        """与本表共用列定义的新表"""
+        table = CourseTable.__new__(CourseTable)
+        table.schema = self.schema
+        table.revision = 0
+        list.extend(table, rows)
+        return table
+
+    def _to_row(self, record: Any) -> CourseRow:
+        if isinstance(record, CourseRow) and record._schema is self.schema:
+            return record
+        schema = self.schema
+        values = [_MISSING] * len(schema.columns)
+        for key, value in record.items():
+            position = schema.add_column(key)
+            if position >= len(values):
+                values.extend([_MISSING] * (position + 1 - len(values)))
+            values[position] = value
+        return CourseRow(schema, schema.prepare(values))
+
+    def append(self, record: Any) -> None:
+        super().append(self._to_row(record))
+        self.revision += 1
+
+    def extend(self, records: Iterable[Any]) -> None:
+        super().extend(self._to_row(record) for record in records)
+        self.revision += 1
+
+    def insert(self, index: int, record: Any) -> None:
+        super().insert(index, self._to_row(record))
+        self.revision += 1
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            super().__setitem__(index, [self._to_row(record) for record in value])
+        else:
+            super().__setitem__(index, self._to_row(value))
+        self.revision += 1
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self.revision += 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._like(super().__getitem__(index))
+        return super().__getitem__(index)
+
+    def __add__(self, records: Iterable[Any]) -> "CourseTable":
+        table = self._like(self)
+        table.extend(records)
+        return table
+
+    def __iadd__(self, records: Iterable[Any]) -> "CourseTable":
+        self.extend(records)
+        return self
+
+    def __imul__(self, count: int) -> "CourseTable":
+        super().__imul__(count)
+        self.revision += 1
+        return self
+
+    def pop(self, index: int = -1) -> CourseRow:
+        row = super().pop(index)
+        self.revision += 1
+        return row
+
+    def remove(self, record: Any) -> None:
+        super().remove(record)
+        self.revision += 1
+
+    def clear(self) -> None:
+        super().clear()
+        self.revision += 1
+
+    def copy(self) -> "CourseTable":
+        return self._like(self)
+
+    def column(self, name: str, default: Any = None) -> List[Any]:
+        """
+        取出一列的值
+
+        Args:
+            name: 列名
+            default: 行中缺失该字段时的值
+
+        Returns:
+            按行顺序排列的值
+        """
+        position = self.schema.index.get(name)
+        if position is None:
+            return [default] * len(self)
+        result = []
+        for row in self:
+            values = row._values
+            value = values[position] if position < len(values) else _MISSING
+            result.append(default if value is _MISSING else value)
+        return result
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """转换为普通字典列表"""
+        return [dict(row) for row in self]
+
@@ -0,0 +1,504 @@
+import io
+import os
+import gc
+import csv
+import sys
+import array
+import marshal
+import logging
+import hashlib
+import stat as stat_module
+import threading
+import contextlib
+from itertools import repeat
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .course_table import CourseSchema, CourseRow, CourseTable, _MISSING
+
+
+# 各类CSV的字段类型，读取成绩/培养计划时共用同一套转换规则
+GRADE_FIELD_TYPES: Dict[str, Callable[[str], Any]] = {'学分': float, '绩点': float}
+PLAN_FIELD_TYPES: Dict[str, Callable[[str], Any]] = {'学分数': float}
+
+# 快照文件后缀及格式版本（格式变化时递增，旧快照自动失效）
+SNAPSHOT_SUFFIX = ".snap"
+SNAPSHOT_VERSION = 1
+
+# 快照中字符串列的分隔符（列中出现该字符时按列表保存）
+_SNAPSHOT_SEPARATOR = "\x1f"
+
+# 字段转换失败时的处理方式
+ON_ERROR_KEEP = "keep"        # 保留原字符串
+ON_ERROR_DEFAULT = "default"  # 使用默认值
+ON_ERROR_SKIP = "skip"        # 跳过整行
+ON_ERROR_RAISE = "raise"      # 抛出 CSVRecordError
+ON_ERROR_POLICIES = (ON_ERROR_KEEP, ON_ERROR_DEFAULT, ON_ERROR_SKIP, ON_ERROR_RAISE)
+
+
+class CSVRecordError(ValueError):
+    """CSV字段转换失败"""
+
+    def __init__(self, line_num: int, field: str, value: str):
+        self.line_num = line_num
+        self.field = field
+        self.value = value
+        super().__init__(f"第{line_num}行字段 {field} 的值 {value!r} 无法转换")
+
+
+def iter_csv_records(csvfile, field_types: Optional[Dict[str, Callable[[str], Any]]] = None,
+                     on_error: str = ON_ERROR_KEEP, default: Any = None,
+                     schema: Optional[CourseSchema] = None) -> Iterator[CourseRow]:
+    """
+    逐行读取CSV，按字段类型转换后产出课程记录
+
+    行的处理与 csv.DictReader 一致：跳过空行，缺少的列为None，多余的列忽略，
+    表头重复时取最后一列的值。所有记录共用一个列定义，只在遍历时读取文件，
+    可直接交给 calculate_gpa、GPAAggregator 或成绩比对而无需先读入整个文件。
+
+    Args:
+        csvfile: 已打开的CSV文件
+        field_types: 字段名 -> 转换函数（空值不转换）
+        on_error: 转换失败时的处理方式: keep、default、skip、raise
+        default: on_error 为 default 时的取值
+        schema: 共用的列定义，为None时新建；传入课程表的列定义时产出的行可直接加入该表
+
+    Returns:
+        课程记录迭代器
+    """
+    if on_error not in ON_ERROR_POLICIES:
+        raise ValueError(f"不支持的错误处理方式: {on_error}")
+
+    reader = csv.reader(csvfile)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    if schema is None:
+        schema = CourseSchema()
+    positions = [schema.add_column(name) for name in header]
+    width = len(header)
+    # 表头与列定义逐列对应时直接使用单元格列表
+    direct = positions == list(range(width)) and len(schema.columns) == width
+
+    converters = []
+    for name, converter in (field_types or {}).items():
+        position = schema.index.get(name)
+        if position is not None and position in positions:
+            converters.append((name, position, converter))
+
+    for cells in reader:
+        if not cells:
+            continue
+        if len(cells) < width:
+            cells = cells + [None] * (width - len(cells))
+        if direct:
+            values = cells[:width] if len(cells) > width else cells
+        else:
+            values = [_MISSING] * len(schema.columns)
+            for position, value in zip(positions, cells):
+                values[position] = value
+
+        skip = False
+        for name, position, converter in converters:
+            value = values[position]
+            if not value:
+                continue
+            try:
+                values[position] = converter(value)
+            except (ValueError, TypeError):
+                if on_error == ON_ERROR_DEFAULT:
+                    values[position] = default
+                elif on_error == ON_ERROR_SKIP:
+                    skip = True
+                    break
+                elif on_error == ON_ERROR_RAISE:
+                    raise CSVRecordError(reader.line_num, name, value)
+        if skip:
+            continue
+
+        yield CourseRow(schema, schema.prepare(values))
+
+
+def iter_csv_file(file_path: str, field_types: Optional[Dict[str, Callable[[str], Any]]] = None,
+                  on_error: str = ON_ERROR_KEEP, default: Any = None) -> Iterator[CourseRow]:
+    """
+    打开CSV文件（utf-8-sig）并逐行产出课程记录，遍历结束或迭代器关闭时关闭文件
+
+    Args:
+        file_path: 文件路径
+        field_types: 字段类型
+        on_error: 转换失败时的处理方式
+        default: on_error 为 default 时的取值
+
+    Returns:
+        课程记录迭代器
+    """
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as csvfile:
+        yield from iter_csv_records(csvfile, field_types, on_error, default)
+
+
+def read_course_csv(csvfile, field_types: Optional[Dict[str, Callable[[str], Any]]] = None,
+                    on_error: str = ON_ERROR_KEEP, default: Any = None) -> CourseTable:
+    """
+    读取成绩/培养计划CSV为课程表
+
+    Args:
+        csvfile: 已打开的CSV文件
+        field_types: 字段类型
+        on_error: 转换失败时的处理方式
+        default: on_error 为 default 时的取值
+
+    Returns:
+        课程表
+    """
+    table = CourseTable()
+    list.extend(table, iter_csv_records(csvfile, field_types, on_error, default, schema=table.schema))
+    return table
+
+
+def snapshot_path(file_path: str) -> str:
+    """CSV文件对应的快照路径"""
+    return file_path + SNAPSHOT_SUFFIX
+
+
+def _conversion_key(field_types: Optional[Dict[str, Callable[[str], Any]]], on_error: str, default: Any) -> str:
+    """转换规则的标识，规则不同的读取不共用快照"""
+    types = sorted((name, getattr(converter, '__qualname__', repr(converter)))
+                   for name, converter in (field_types or {}).items())
+    return repr((types, on_error, default))
+
+
+def _encode_column(values: List[Any]) -> Tuple:
+    """
+    按列编码快照数据
+
+    取值较少的列保存为去重值表+编号数组，其余全为字符串的列拼接为一个字符串，
+    加载时由C实现的 split/map 还原，避免逐个反序列化数百万个小对象。
+    """
+    uniques = {}
+    for value in values:
+        if value not in uniques:
+            uniques[value] = len(uniques)
+            if len(uniques) > len(values) // 2:
+                break
+    else:
+        codes = array.array('H' if len(uniques) <= 0xFFFF else 'I', map(uniques.__getitem__, values))
+        return "dict", list(uniques), codes.typecode, codes.tobytes()
+
+    if all(type(value) is str and _SNAPSHOT_SEPARATOR not in value for value in values):
+        return "join", _SNAPSHOT_SEPARATOR.join(values)
+    return "list", values
+
+
+def _decode_column(encoded: Tuple, count: int) -> List[Any]:
+    """还原 _encode_column 编码的列"""
+    kind = encoded[0]
+    if kind == "dict":
+        uniques = [sys.intern(value) if type(value) is str else value for value in encoded[1]]
+        codes = array.array(encoded[2])
+        codes.frombytes(encoded[3])
+        return list(map(uniques.__getitem__, codes))
+    if kind == "join":
+        return encoded[1].split(_SNAPSHOT_SEPARATOR) if count else []
+    return encoded[1]
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """批量创建大量无循环引用的对象时暂停循环垃圾回收"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _load_snapshot(path: str, stat: os.stat_result, key: str) -> Optional[CourseTable]:
+    """读取与源文件匹配的快照，不存在、已过期或损坏时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            data = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if (not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION
+            or data.get("mtime_ns") != stat.st_mtime_ns or data.get("size") != stat.st_size
+            or data.get("ino") != stat.st_ino
+            or data.get("key") != key):
+        return None
+
+    with _gc_paused():
+        try:
+            count = data["count"]
+            columns = [_decode_column(encoded, count) for encoded in data["data"]]
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+        if any(len(column) != count for column in columns):
+            return None
+
+        table = CourseTable(data["columns"])
+        # 按列还原后转置为行
+        list.extend(table, map(CourseRow, repeat(table.schema), map(list, zip(*columns))))
+    return table
+
+
+def _save_snapshot(path: str, stat: os.stat_result, key: str, table: CourseTable) -> None:
+    """保存快照，失败时只记录日志"""
+    width = len(table.schema.columns)
+    if any(len(row._values) != width or _MISSING in row._values for row in table):
+        return
+    try:
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "ino": stat.st_ino,
+            "key": key,
+            "columns": table.columns,
+            "count": len(table),
+            "data": [_encode_column(table.column(name)) for name in table.columns]
+        }
+        atomic_write_bytes(path, marshal.dumps(data))
+    except (OSError, ValueError, TypeError) as e:
+        logging.debug(f"保存快照失败 {path}: {e}")
+
+
+def read_course_file(file_path: str, field_types: Optional[Dict[str, Callable[[str], Any]]] = None,
+                     on_error: str = ON_ERROR_KEEP, default: Any = None, use_snapshot: bool = False) -> CourseTable:
+    """
+    按路径读取CSV为课程表
+
+    开启 use_snapshot 时，解析结果以 marshal 格式缓存在同目录的 <文件名>.snap 中，按源文件的修改时间（纳秒）、
+    大小、inode（原子替换后会变化）以及转换规则判断是否有效；有效时直接加载快照，跳过CSV解析和数值转换。
+    只需遍历一次时使用 iter_csv_file / CourseFile 逐行读取，不必整表载入。
+
+    Args:
+        file_path: 文件路径
+        field_types: 字段类型
+        on_error: 转换失败时的处理方式
+        default: on_error 为 default 时的取值
+        use_snapshot: 是否使用快照
+
+    Returns:
+        课程表
+    """
+    if not use_snapshot:
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as csvfile:
+            return read_course_csv(csvfile, field_types, on_error, default)
+
+    stat = os.stat(file_path)
+    key = _conversion_key(field_types, on_error, default)
+    snap_path = snapshot_path(file_path)
+    table = _load_snapshot(snap_path, stat, key)
+    if table is not None:
+        return table
+
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as csvfile:
+        table = read_course_csv(csvfile, field_types, on_error, default)
+
+    # 读取期间源文件未被替换时才保存快照
+    try:
+        current = os.stat(file_path)
+    except OSError:
+        return table
+    if (current.st_mtime_ns, current.st_size, current.st_ino) == (stat.st_mtime_ns, stat.st_size, stat.st_ino):
+        _save_snapshot(snap_path, stat, key, table)
+    return table
+
+
+def iter_grade_records(file_path: str, on_error: str = ON_ERROR_KEEP) -> Iterator[CourseRow]:
+    """逐行读取成绩CSV（学分、绩点转换为浮点数）"""
+    return iter_csv_file(file_path, GRADE_FIELD_TYPES, on_error)
+
+
+def iter_plan_records(file_path: str, on_error: str = ON_ERROR_KEEP) -> Iterator[CourseRow]:
+    """逐行读取培养计划CSV（学分数转换为浮点数）"""
+    return iter_csv_file(file_path, PLAN_FIELD_TYPES, on_error)
+
+
+class CourseFile:
+    """按需逐行读取的CSV课程记录
+
+    每次遍历都重新打开文件逐行产出记录，不在内存中保留整个文件，
+    可依次交给成绩比对、GPA统计等只需遍历一次的函数。
+    """
+
+    def __init__(self, file_path: str, field_types: Optional[Dict[str, Callable[[str], Any]]] = None,
+                 on_error: str = ON_ERROR_KEEP, default: Any = None):
+        """
+        Args:
+            file_path: 文件路径
+            field_types: 字段类型
+            on_error: 转换失败时的处理方式
+            default: on_error 为 default 时的取值
+        """
+        self.file_path = file_path
+        self.field_types = field_types
+        self.on_error = on_error
+        self.default = default
+
+    def __iter__(self) -> Iterator[CourseRow]:
+        return iter_csv_file(self.file_path, self.field_types, self.on_error, self.default)
+
+    def __bool__(self) -> bool:
+        records = iter(self)
+        try:
+            return next(records, None) is not None
+        finally:
+            records.close()
+
+    @property
+    def columns(self) -> List[str]:
+        """表头"""
+        with open(self.file_path, 'r', encoding='utf-8-sig', newline='') as csvfile:
+            return next(csv.reader(csvfile), [])
+
+
+# 已写入文件的内容摘要缓存：路径 -> (sha256, st_mtime_ns, st_size)
+_written_digests: Dict[str, Tuple[str, int, int]] = {}
+_written_digests_lock = threading.Lock()
+
+
+def _fsync_directory(directory: str) -> None:
+    """同步目录项，确保重命名落盘（不支持的平台忽略）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _existing_mode(path: str) -> Optional[int]:
+    """目标文件的权限，文件不存在时返回None"""
+    try:
+        return stat_module.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return None
+
+
+def _create_temp_file(path: str) -> Tuple[int, str]:
+    """
+    在目标文件所在目录创建临时文件
+
+    与 open(path, 'w') 一样以0666创建，由umask决定最终权限。
+
+    Returns:
+        (文件描述符, 临时文件路径)
+    """
+    directory, name = os.path.split(path)
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+    while True:
+        tmp_path = os.path.join(directory, f".{name}.{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def _content_unchanged(path: str, data: bytes, digest: str) -> bool:
+    """判断文件内容是否与待写入的数据相同，命中摘要缓存时无需读取文件"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != len(data):
+        return False
+
+    with _written_digests_lock:
+        cached = _written_digests.get(path)
+    if cached is not None and cached[1:] == (stat.st_mtime_ns, stat.st_size):
+        return cached[0] == digest
+
+    # 文件由其他进程写入或首次写入：读取比较一次
+    try:
+        with open(path, 'rb') as f:
+            unchanged = f.read() == data
+    except OSError:
+        return False
+    if unchanged:
+        with _written_digests_lock:
+            _written_digests[path] = (digest, stat.st_mtime_ns, stat.st_size)
+    return unchanged
+
+
+def atomic_write_bytes(path: str, data: bytes, skip_unchanged: bool = True) -> bool:
+    """
+    原子写入文件
+
+    先写入同目录的临时文件并fsync，再用 os.replace 替换目标文件，
+    写入过程中崩溃时原文件保持完整。
+
+    Args:
+        path: 目标文件路径
+        data: 文件内容
+        skip_unchanged: 内容与现有文件相同时跳过写入
+
+    Returns:
+        是否实际写入了文件
+    """
+    path = os.path.abspath(path)
+    digest = hashlib.sha256(data).hexdigest()
+    if skip_unchanged and _content_unchanged(path, data, digest):
+        return False
+
+    directory = os.path.dirname(path)
+    fd, tmp_path = _create_temp_file(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # 替换已有文件时保持其原有的权限，新文件使用umask决定的权限
+        mode = _existing_mode(path)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directory(directory)
+
+    stat = os.stat(path)
+    with _written_digests_lock:
+        _written_digests[path] = (digest, stat.st_mtime_ns, stat.st_size)
+    return True
+
+
+def serialize_course_csv(courses: Iterable[Mapping[str, Any]], headers: List[str]) -> bytes:
+    """
+    将课程记录序列化为CSV（utf-8-sig编码，与原先直接写文件的格式相同）
+
+    Args:
+        courses: 课程记录
+        headers: 表头
+
+    Returns:
+        文件内容
+    """
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=headers)
+    writer.writeheader()
+    writer.writerows(courses)
+    return buffer.getvalue().encode('utf-8-sig')
+
+
+def write_course_csv(output_path: str, courses: Iterable[Mapping[str, Any]], headers: List[str]) -> bool:
+    """
+    原子写入课程CSV，内容未变化时跳过
+
+    Args:
+        output_path: 输出文件路径
+        courses: 课程记录
+        headers: 表头
+
+    Returns:
+        是否实际写入了文件
+    """
+    return atomic_write_bytes(output_path, serialize_course_csv(courses, headers))
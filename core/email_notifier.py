@@ -0,0 +1,361 @@
+import time
+import smtplib
+import logging
+import threading
+from datetime import datetime
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from typing import Dict, Any, List, Optional
+
+from .neu_retry import RetryPolicy
+
+
+# 同一收件人的通知合并发送的等待时间（秒）
+DEFAULT_DIGEST_WINDOW = 60
+
+# 发送失败的默认重试策略
+DEFAULT_EMAIL_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=10, factor=2.0, max_delay=300, jitter=0.2)
+
+# 连接空闲超过该时间（秒）后关闭
+DEFAULT_IDLE_TIMEOUT = 120
+
+# 复用连接前用NOOP确认连接可用的空闲阈值（秒）
+_NOOP_AFTER = 30
+
+# 重试无意义的错误：收件人或发件人被拒绝、认证失败
+_PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPAuthenticationError)
+
+
+def format_grade_changes(differences: list, old_gpa: float, new_gpa: float) -> str:
+    """
+    格式化一次检查发现的成绩变化
+
+    Args:
+        differences: find_grade_differences 的结果
+        old_gpa: 变化前的平均绩点
+        new_gpa: 变化后的平均绩点
+
+    Returns:
+        邮件正文片段
+    """
+    body = f"""
+平均绩点变化: {old_gpa} → {new_gpa}
+变化数量: {len(differences)} 项
+
+详细变化:
+"""
+
+    for diff in differences:
+        if diff['type'] == '新增课程':
+            course = diff['data']
+            body += f"\n【新增课程】{diff['course_name']}\n"
+            body += f"  学分: {course.get('学分', '未知')}\n"
+            body += f"  成绩: {course.get('最终', course.get('总评成绩', '未知'))}\n"
+            body += f"  绩点: {course.get('绩点', '未知')}\n"
+
+        elif diff['type'] == '成绩更新':
+            body += f"\n【成绩更新】{diff['course_name']}\n"
+            body += f"  {diff['field']}: {diff['old_value']} → {diff['new_value']}\n"
+
+    return body
+
+
+class _Digest:
+    """同一收件人待发送的通知"""
+
+    def __init__(self, recipient: str, due: float):
+        self.recipient = recipient
+        self.due = due
+        self.items: List[Dict[str, Any]] = []
+        self.attempts = 0
+        self.first_attempt: Optional[float] = None
+
+
+class EmailNotifier:
+    """后台发送成绩变化邮件
+
+    notify() 只把通知放入队列并立即返回；后台线程在合并窗口结束后把同一收件人的
+    通知合并为一封邮件发送，复用已登录的SMTP连接，失败时按重试策略退避后重发，
+    检查成绩的线程不会因邮件服务器缓慢或无响应而阻塞。
+    """
+
+    def __init__(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str,
+                 use_tls: bool = True, digest_window: float = DEFAULT_DIGEST_WINDOW,
+                 retry_policy: Optional[RetryPolicy] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 timeout: float = 30, max_pending: int = 1000):
+        """
+        初始化邮件通知器
+
+        Args:
+            smtp_server: SMTP服务器地址
+            smtp_port: SMTP端口
+            sender_email: 发件人邮箱（同时作为登录用户名）
+            sender_password: 邮箱密码或授权码
+            use_tls: 是否使用STARTTLS
+            digest_window: 同一收件人的通知合并发送的等待时间（秒），0表示立即发送
+            retry_policy: 发送失败的重试策略
+            idle_timeout: 连接空闲超过该时间（秒）后关闭
+            timeout: 网络操作超时（秒）
+            max_pending: 待发送通知的上限，超出时丢弃新通知
+        """
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.use_tls = use_tls
+        self.digest_window = digest_window
+        self.retry_policy = retry_policy or DEFAULT_EMAIL_RETRY_POLICY
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_pending = max_pending
+
+        self._digests: Dict[str, _Digest] = {}
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._flush_requested = False
+        self._closing = False
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self.stats = {"queued": 0, "dropped": 0, "sent": 0, "failed": 0, "retries": 0, "connections": 0}
+
+        self._thread = threading.Thread(target=self._run, name="EmailNotifier", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, config) -> Optional["EmailNotifier"]:
+        """
+        由 email 配置创建通知器，配置不完整时返回None
+
+        Args:
+            config: 配置对象
+        """
+        smtp_server = config.get('email.smtp_server')
+        sender_email = config.get('email.sender_email')
+        sender_password = config.get('email.sender_password')
+        if not all([smtp_server, sender_email, sender_password]):
+            return None
+
+        return cls(
+            smtp_server, config.get('email.smtp_port', 587), sender_email, sender_password,
+            use_tls=config.get('email.use_tls', True),
+            digest_window=config.get('email.digest_window', DEFAULT_DIGEST_WINDOW),
+            retry_policy=RetryPolicy(
+                max_attempts=config.get('email.retry.max_attempts', DEFAULT_EMAIL_RETRY_POLICY.max_attempts),
+                base_delay=config.get('email.retry.base_delay', DEFAULT_EMAIL_RETRY_POLICY.base_delay),
+                factor=DEFAULT_EMAIL_RETRY_POLICY.factor,
+                max_delay=config.get('email.retry.max_delay', DEFAULT_EMAIL_RETRY_POLICY.max_delay),
+                jitter=DEFAULT_EMAIL_RETRY_POLICY.jitter
+            ),
+            idle_timeout=config.get('email.idle_timeout', DEFAULT_IDLE_TIMEOUT)
+        )
+
+    def notify(self, recipient: str, differences: list, old_gpa: float, new_gpa: float, tag: str = "") -> bool:
+        """
+        加入一条成绩变化通知（不等待发送）
+
+        Args:
+            recipient: 收件人邮箱
+            differences: find_grade_differences 的结果
+            old_gpa: 变化前的平均绩点
+            new_gpa: 变化后的平均绩点
+            tag: 账号标识，多账号合并时用于区分
+
+        Returns:
+            是否已加入队列；通知器已关闭或队列已满时返回False
+        """
+        item = {"time": datetime.now(), "tag": tag, "differences": list(differences),
+                "old_gpa": old_gpa, "new_gpa": new_gpa}
+        with self._condition:
+            if self._closing or self._pending >= self.max_pending:
+                self.stats["dropped"] += 1
+                logging.warning(f"邮件通知队列已满或已关闭，丢弃发给 {recipient} 的通知")
+                return False
+            digest = self._digests.get(recipient)
+            if digest is None:
+                digest = self._digests[recipient] = _Digest(recipient, time.monotonic() + self.digest_window)
+            digest.items.append(item)
+            self._pending += 1
+            self.stats["queued"] += 1
+            self._condition.notify_all()
+        return True
+
+    def pending(self) -> int:
+        """尚未发送的通知数"""
+        with self._condition:
+            return self._pending
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        立即发送所有等待合并的通知，并等待队列清空
+
+        正在退避重试的通知仍按重试时间发送。
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            队列是否已清空
+        """
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = 30) -> None:
+        """
+        停止接收新通知，尽量发送完剩余通知后关闭连接
+
+        Args:
+            timeout: 等待发送完成的最长时间（秒）
+        """
+        with self._condition:
+            self._closing = True
+            self._flush_requested = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _build_message(self, digest: _Digest, items: List[Dict[str, Any]]) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = self.sender_email
+        msg['To'] = digest.recipient
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if len(items) == 1:
+            msg['Subject'] = f"成绩更新通知 - {now}"
+            body = "\n成绩更新通知\n" + format_grade_changes(
+                items[0]['differences'], items[0]['old_gpa'], items[0]['new_gpa'])
+        else:
+            msg['Subject'] = f"成绩更新通知（{len(items)}次更新）- {now}"
+            body = f"\n成绩更新通知\n\n共合并 {len(items)} 次检查发现的变化\n"
+            for item in items:
+                body += f"\n========== {item['tag']}{item['time'].strftime('%Y-%m-%d %H:%M:%S')} ==========\n"
+                body += format_grade_changes(item['differences'], item['old_gpa'], item['new_gpa'])
+
+        body += "\n\n此邮件由成绩监控系统自动发送"
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+        return msg
+
+    def _connection(self) -> smtplib.SMTP:
+        """获取已登录的连接，空闲较久的连接先用NOOP确认可用"""
+        if self._smtp is not None and time.monotonic() - self._last_used > _NOOP_AFTER:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._disconnect()
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+            try:
+                if self.use_tls:
+                    smtp.starttls()
+                smtp.login(self.sender_email, self.sender_password)
+            except BaseException:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.stats["connections"] += 1
+        return self._smtp
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _send(self, digest: _Digest, items: List[Dict[str, Any]]) -> None:
+        msg = self._build_message(digest, items)
+        reused = self._smtp is not None
+        try:
+            try:
+                self._connection().send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                if not reused:
+                    raise
+                # 复用的连接已被服务器关闭，重新连接后再发一次（不计入重试次数）
+                self._disconnect()
+                self._connection().send_message(msg)
+        except BaseException:
+            # 出错后连接状态不确定，下次重新建立
+            self._disconnect()
+            raise
+        finally:
+            self._last_used = time.monotonic()
+
+    def _deliver(self, digest: _Digest) -> None:
+        """发送一个收件人的合并通知（在后台线程中、不持有锁时调用）"""
+        items = digest.items
+        digest.attempts += 1
+        if digest.first_attempt is None:
+            digest.first_attempt = time.monotonic()
+
+        try:
+            self._send(digest, items)
+        except Exception as e:
+            delay = None
+            if not isinstance(e, _PERMANENT_ERRORS):
+                delay = self.retry_policy.next_delay(digest.attempts, time.monotonic() - digest.first_attempt)
+            with self._condition:
+                if delay is None or self._closing:
+                    self._pending -= len(items)
+                    self.stats["failed"] += len(items)
+                    self._condition.notify_all()
+                    logging.error(f"发送邮件到 {digest.recipient} 失败（已尝试{digest.attempts}次）: {e}")
+                    return
+                # 退避后重发；等待期间的新通知合并到同一封邮件
+                self.stats["retries"] += 1
+                newer = self._digests.get(digest.recipient)
+                if newer is not None:
+                    digest.items = items + newer.items
+                digest.due = time.monotonic() + delay
+                self._digests[digest.recipient] = digest
+                self._condition.notify_all()
+            logging.warning(f"发送邮件到 {digest.recipient} 失败，{delay:.1f}秒后重试: {e}")
+            return
+
+        with self._condition:
+            self._pending -= len(items)
+            self.stats["sent"] += len(items)
+            self._condition.notify_all()
+        print(f"邮件发送成功到: {digest.recipient}")
+        logging.info(f"邮件发送成功到: {digest.recipient}（合并{len(items)}条通知）")
+
+    def _take_due(self) -> List[_Digest]:
+        """取出到期的合并通知（持有锁时调用）"""
+        now = time.monotonic()
+        due = [digest for digest in self._digests.values()
+               if digest.due <= now or self._closing or (self._flush_requested and digest.attempts == 0)]
+        for digest in due:
+            del self._digests[digest.recipient]
+        return due
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                due = self._take_due()
+                if not due:
+                    if self._closing and not self._digests:
+                        break
+                    if self._flush_requested and not self._closing and all(
+                            digest.attempts for digest in self._digests.values()):
+                        self._flush_requested = False
+
+                    now = time.monotonic()
+                    deadlines = [digest.due for digest in self._digests.values()]
+                    idle_at = self._last_used + self.idle_timeout if self._smtp is not None else None
+                    if idle_at is None or idle_at > now:
+                        if idle_at is not None:
+                            deadlines.append(idle_at)
+                        self._condition.wait(max(0.0, min(deadlines) - now) if deadlines else None)
+                        continue
+
+            if due:
+                for digest in due:
+                    self._deliver(digest)
+            else:
+                # 连接空闲超时
+                self._disconnect()
+
+        self._disconnect()
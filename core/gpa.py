@@ -0,0 +1,286 @@
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple, Callable, Hashable
+
+from .course_table import CourseTable
+
+
+# 学分总和小于该值时视为没有学分（避免增删后的浮点残差）
+_EPSILON = 1e-9
+
+
+def to_float(value: Any) -> Optional[float]:
+    """学分/绩点转换为浮点数，空值或无法转换时返回None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def course_credit_point(course: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """
+    读取一门课程的学分和绩点
+
+    Args:
+        course: 课程记录
+
+    Returns:
+        (学分, 绩点)；学分或绩点缺失、无法转换时返回None（该课程不计入GPA）
+    """
+    credit = to_float(course.get('学分'))
+    if credit is None:
+        return None
+    grade_point = to_float(course.get('绩点'))
+    if grade_point is None:
+        return None
+    return credit, grade_point
+
+
+def iter_credit_points(courses: Iterable[Dict[str, Any]]) -> Iterator[Tuple[float, float]]:
+    """遍历计入GPA的课程的(学分, 绩点)，CourseTable按列扫描"""
+    if isinstance(courses, CourseTable):
+        for credit, grade_point in zip(courses.column('学分'), courses.column('绩点')):
+            credit = to_float(credit)
+            if credit is None:
+                continue
+            grade_point = to_float(grade_point)
+            if grade_point is None:
+                continue
+            yield credit, grade_point
+    else:
+        for course in courses:
+            values = course_credit_point(course)
+            if values is not None:
+                yield values
+
+
+def calculate_gpa(courses: Iterable[Dict[str, Any]]) -> float:
+    """
+    计算总平均绩点
+
+    Args:
+        courses: 课程列表
+
+    Returns:
+        总平均绩点（保留两位小数）
+    """
+    total_credits = 0.0
+    total_grade_points = 0.0
+
+    for credit, grade_point in iter_credit_points(courses):
+        total_credits += credit
+        total_grade_points += credit * grade_point
+
+    # 计算平均绩点
+    if total_credits > 0:
+        return round(total_grade_points / total_credits, 2)
+    else:
+        return 0.0
+
+
+class _Bucket:
+    """一组课程的学分和学分绩点累计"""
+
+    __slots__ = ("credits", "points", "count")
+
+    def __init__(self):
+        self.credits = 0.0
+        self.points = 0.0
+        self.count = 0
+
+    def add(self, credit: float, grade_point: float, sign: int = 1) -> None:
+        self.credits += sign * credit
+        self.points += sign * credit * grade_point
+        self.count += sign
+        if self.count == 0:
+            # 全部移除后清零，避免浮点残差
+            self.credits = 0.0
+            self.points = 0.0
+
+    @property
+    def gpa(self) -> float:
+        return self.points / self.credits if abs(self.credits) > _EPSILON else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"credits": self.credits, "points": self.points, "count": self.count, "gpa": self.gpa}
+
+
+def default_course_key(course: Dict[str, Any]) -> Hashable:
+    """课程键：课程名称 + 学年学期（与成绩比对一致）"""
+    return course.get('课程名称', ''), course.get('学年学期', '')
+
+
+class GPAAggregator:
+    """增量GPA统计
+
+    维护学分和学分×绩点的累计值，以及按学期、按课程类别的分组累计，
+    增加、移除、更新一门课程均为O(1)，无需重新扫描全部课程。
+    学分或绩点无效的课程会被记录但不计入GPA，与 calculate_gpa 一致。
+    """
+
+    def __init__(self, courses: Iterable[Dict[str, Any]] = (),
+                 key: Callable[[Dict[str, Any]], Hashable] = default_course_key,
+                 semester_field: str = '学年学期', category_field: str = '课程类别'):
+        """
+        初始化GPA统计
+
+        Args:
+            courses: 初始课程
+            key: 由课程记录得到唯一键的函数
+            semester_field: 学期字段名
+            category_field: 课程类别字段名
+        """
+        self.key = key
+        self.semester_field = semester_field
+        self.category_field = category_field
+        self._total = _Bucket()
+        self._semesters = {}
+        self._categories = {}
+        # 键 -> (学分, 绩点, 学期, 类别)，无效课程的学分绩点为None
+        self._entries = {}
+        # 每次增删改加一，调用方据此判断统计是否变化
+        self.revision = 0
+        for course in courses:
+            self.add(course)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, course_key: Hashable) -> bool:
+        return course_key in self._entries
+
+    def _apply(self, entry: Tuple, sign: int) -> None:
+        credit, grade_point, semester, category = entry
+        if credit is None:
+            return
+        self._total.add(credit, grade_point, sign)
+        for groups, name in ((self._semesters, semester), (self._categories, category)):
+            bucket = groups.get(name)
+            if bucket is None:
+                bucket = groups[name] = _Bucket()
+            bucket.add(credit, grade_point, sign)
+            if bucket.count == 0:
+                del groups[name]
+
+    def _entry(self, course: Dict[str, Any]) -> Tuple:
+        values = course_credit_point(course)
+        credit, grade_point = values if values is not None else (None, None)
+        return credit, grade_point, course.get(self.semester_field, ''), course.get(self.category_field, '')
+
+    def add(self, course: Dict[str, Any], course_key: Optional[Hashable] = None) -> None:
+        """
+        添加一门课程；键已存在时按更新处理
+
+        Args:
+            course: 课程记录
+            course_key: 课程键，为None时由 key 函数计算
+        """
+        if course_key is None:
+            course_key = self.key(course)
+        self.revision += 1
+        if course_key in self._entries:
+            self._apply(self._entries[course_key], -1)
+        entry = self._entry(course)
+        self._entries[course_key] = entry
+        self._apply(entry, 1)
+
+    update = add
+
+    def remove(self, course: Dict[str, Any]) -> bool:
+        """
+        移除一门课程
+
+        Returns:
+            课程是否存在
+        """
+        return self.remove_key(self.key(course))
+
+    def remove_key(self, course_key: Hashable) -> bool:
+        """按键移除一门课程"""
+        entry = self._entries.pop(course_key, None)
+        if entry is None:
+            return False
+        self.revision += 1
+        self._apply(entry, -1)
+        return True
+
+    def clear(self) -> None:
+        """清空全部课程"""
+        self.revision += 1
+        self._total = _Bucket()
+        self._semesters.clear()
+        self._categories.clear()
+        self._entries.clear()
+
+    @property
+    def total_credits(self) -> float:
+        """计入GPA的总学分"""
+        return self._total.credits
+
+    @property
+    def total_points(self) -> float:
+        """学分×绩点总和"""
+        return self._total.points
+
+    @property
+    def gpa(self) -> float:
+        """总平均绩点（未取整）"""
+        return self._total.gpa
+
+    def gpa_without(self, course_key: Hashable) -> float:
+        """
+        去掉一门课程后的总平均绩点，O(1)
+
+        Args:
+            course_key: 课程键
+
+        Returns:
+            去掉该课程后的平均绩点；剩余学分为0时返回0
+        """
+        entry = self._entries.get(course_key)
+        if entry is None or entry[0] is None:
+            return self.gpa
+        credits = self._total.credits - entry[0]
+        if abs(credits) <= _EPSILON:
+            return 0.0
+        return (self._total.points - entry[0] * entry[1]) / credits
+
+    def gpa_impact(self, course_key: Hashable) -> float:
+        """
+        一门课程对总平均绩点的影响（留一法），O(1)
+
+        Args:
+            course_key: 课程键
+
+        Returns:
+            包含该课程与不包含该课程的平均绩点之差，正值表示提升GPA；
+            课程不计入GPA或去掉后没有剩余学分时返回0
+        """
+        entry = self._entries.get(course_key)
+        if entry is None or entry[0] is None:
+            return 0.0
+        if abs(self._total.credits - entry[0]) <= _EPSILON or abs(self._total.credits) <= _EPSILON:
+            return 0.0
+        return self.gpa - self.gpa_without(course_key)
+
+    def by_semester(self) -> Dict[str, Dict[str, Any]]:
+        """按学期的学分、学分绩点、课程数和平均绩点"""
+        return {name: bucket.to_dict() for name, bucket in self._semesters.items()}
+
+    def by_category(self) -> Dict[str, Dict[str, Any]]:
+        """按课程类别的学分、学分绩点、课程数和平均绩点"""
+        return {name: bucket.to_dict() for name, bucket in self._categories.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        """总计及分组统计"""
+        return {
+            "gpa": round(self.gpa, 2),
+            "total_credits": self.total_credits,
+            "course_count": len(self._entries),
+            "by_semester": self.by_semester(),
+            "by_category": self.by_category()
+        }
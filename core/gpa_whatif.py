@@ -0,0 +1,308 @@
+from typing import Dict, Any, List, Iterable, Optional, Sequence, Tuple
+
+import math
+
+try:
+    import numpy as np
+except ImportError:  # GPA预测为可选功能
+    np = None
+
+from .gpa import iter_credit_points, to_float
+from .csv_records import iter_grade_records, read_course_file, PLAN_FIELD_TYPES
+
+
+# 可选的绩点等级（百分制 60~100 对应 1.0~5.0）
+DEFAULT_GRADE_POINTS = (1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0)
+
+# 绩点范围
+MIN_GRADE_POINT = 0.0
+MAX_GRADE_POINT = 5.0
+
+
+def _require_numpy():
+    """检查numpy是否可用"""
+    if np is None:
+        raise ImportError("GPA预测需要安装numpy: pip install numpy")
+
+
+class WhatIfEngine:
+    """批量GPA情景推演
+
+    以当前成绩单的学分和学分绩点累计为基数，对培养计划中剩余课程的绩点方案
+    做矩阵运算，一次得到所有情景下的总平均绩点。
+    """
+
+    def __init__(self, current_courses: Iterable[Dict[str, Any]], remaining_courses: Iterable[Dict[str, Any]],
+                 credit_field: str = '学分数'):
+        """
+        初始化推演引擎
+
+        Args:
+            current_courses: 已有成绩的课程（学分、绩点字段）
+            remaining_courses: 尚未修读的课程（通常来自培养计划）
+            credit_field: 剩余课程的学分字段名，培养计划为"学分数"
+        """
+        _require_numpy()
+
+        self.base_credits = 0.0
+        self.base_points = 0.0
+        for credit, grade_point in iter_credit_points(current_courses):
+            self.base_credits += credit
+            self.base_points += credit * grade_point
+
+        # 学分无效的课程不参与推演
+        self.courses = []
+        credits = []
+        for course in remaining_courses:
+            credit = to_float(course.get(credit_field))
+            if credit is None or credit <= 0:
+                continue
+            self.courses.append(course)
+            credits.append(credit)
+        self.credits = np.asarray(credits, dtype=np.float64)
+
+    @classmethod
+    def from_files(cls, grades_path: str, plan_path: str) -> "WhatIfEngine":
+        """
+        由成绩CSV和培养计划CSV构造推演引擎，已有成绩的课程（按课程名称）从计划中排除
+
+        Args:
+            grades_path: 成绩文件路径
+            plan_path: 培养计划文件路径
+
+        Returns:
+            推演引擎
+        """
+        plan = read_course_file(plan_path, PLAN_FIELD_TYPES)
+
+        # 成绩文件逐行读取，只保留课程名称；构造时先累计成绩再遍历计划，排除已修课程
+        taken = set()
+
+        def current_courses():
+            for course in iter_grade_records(grades_path):
+                taken.add(course.get('课程名称', ''))
+                yield course
+
+        return cls(current_courses(), (course for course in plan if course.get('课程名称', '') not in taken))
+
+    @property
+    def course_count(self) -> int:
+        """参与推演的剩余课程数"""
+        return len(self.courses)
+
+    @property
+    def current_gpa(self) -> float:
+        """当前平均绩点"""
+        return self.base_points / self.base_credits if self.base_credits > 0 else 0.0
+
+    def evaluate(self, grade_points) -> "np.ndarray":
+        """
+        计算各情景下的总平均绩点
+
+        Args:
+            grade_points: 形状为 (情景数, 课程数) 的绩点矩阵（单个情景可为一维）；
+                NaN 表示该情景下不修读此课程
+
+        Returns:
+            形状为 (情景数,) 的平均绩点数组；某情景总学分为0时结果为0
+        """
+        matrix = np.asarray(grade_points, dtype=np.float64)
+        if matrix.ndim == 1:
+            matrix = matrix[np.newaxis, :]
+        if matrix.ndim != 2 or matrix.shape[1] != self.course_count:
+            raise ValueError(f"绩点矩阵应为 (情景数, {self.course_count})，实际为 {matrix.shape}")
+
+        taken = ~np.isnan(matrix)
+        if taken.all():
+            points = self.base_points + matrix @ self.credits
+            credits = np.full(matrix.shape[0], self.base_credits + self.credits.sum())
+        else:
+            points = self.base_points + np.where(taken, matrix, 0.0) @ self.credits
+            credits = self.base_credits + taken @ self.credits
+
+        result = np.zeros(matrix.shape[0], dtype=np.float64)
+        np.divide(points, credits, out=result, where=credits > 0)
+        return result
+
+    def uniform(self, levels: Sequence[float] = DEFAULT_GRADE_POINTS) -> "np.ndarray":
+        """
+        所有剩余课程取同一绩点时的总平均绩点
+
+        Args:
+            levels: 绩点等级
+
+        Returns:
+            与 levels 对应的平均绩点数组
+        """
+        levels = np.asarray(levels, dtype=np.float64)
+        points = self.base_points + levels * self.credits.sum()
+        credits = self.base_credits + self.credits.sum()
+        return points / credits if credits > 0 else np.zeros_like(levels)
+
+    def random_scenarios(self, count: int, choices: Sequence[float] = DEFAULT_GRADE_POINTS,
+                         probabilities: Optional[Sequence[float]] = None, seed: Optional[int] = None) -> "np.ndarray":
+        """
+        随机生成绩点方案
+
+        Args:
+            count: 情景数
+            choices: 可选绩点
+            probabilities: 各绩点的概率，为None时等概率
+            seed: 随机种子
+
+        Returns:
+            形状为 (count, 课程数) 的绩点矩阵
+        """
+        rng = np.random.default_rng(seed)
+        return rng.choice(np.asarray(choices, dtype=np.float64), size=(count, self.course_count), p=probabilities)
+
+    def simulate(self, count: int = 100000, choices: Sequence[float] = DEFAULT_GRADE_POINTS,
+                 probabilities: Optional[Sequence[float]] = None, seed: Optional[int] = None) -> "np.ndarray":
+        """随机生成 count 个情景并计算各自的总平均绩点"""
+        return self.evaluate(self.random_scenarios(count, choices, probabilities, seed))
+
+    @staticmethod
+    def summarize(gpas, targets: Iterable[float] = ()) -> Dict[str, Any]:
+        """
+        汇总情景结果
+
+        Args:
+            gpas: evaluate() 返回的平均绩点数组
+            targets: 需要计算达成概率的目标绩点
+
+        Returns:
+            包含情景数、均值、标准差、最小/最大值、分位数和目标达成概率的字典
+        """
+        gpas = np.asarray(gpas, dtype=np.float64)
+        if gpas.size == 0:
+            return {"count": 0}
+        p5, p25, p50, p75, p95 = np.percentile(gpas, [5, 25, 50, 75, 95])
+        return {
+            "count": int(gpas.size),
+            "mean": float(gpas.mean()),
+            "std": float(gpas.std()),
+            "min": float(gpas.min()),
+            "max": float(gpas.max()),
+            "percentiles": {"p5": float(p5), "p25": float(p25), "p50": float(p50), "p75": float(p75), "p95": float(p95)},
+            "target_probability": {float(target): float((gpas >= target).mean()) for target in targets}
+        }
+
+    def course_names(self) -> List[str]:
+        """参与推演的课程名称，与绩点矩阵的列顺序一致"""
+        return [course.get('课程名称', '') for course in self.courses]
+
+
+def is_required_course(course: Dict[str, Any]) -> bool:
+    """按培养计划的"课程类型"判断是否为必修课"""
+    return "必修" in str(course.get('课程类型', ''))
+
+
+def _ceil_level(value: float, step: float = 0.01) -> float:
+    """向上取到step的整数倍，保证取整后仍能达到目标"""
+    return math.ceil(value / step - 1e-9) * step
+
+
+def solve_target_gpa(current_courses: Iterable[Dict[str, Any]], remaining_courses: Iterable[Dict[str, Any]],
+                     target: float, include_electives: bool = True,
+                     fixed: Optional[Dict[str, float]] = None,
+                     min_point: float = MIN_GRADE_POINT, max_point: float = MAX_GRADE_POINT,
+                     credit_field: str = '学分数') -> Dict[str, Any]:
+    """
+    计算剩余课程达到目标平均绩点所需的最低绩点
+
+    未锁定的课程取同一水平g（受各自上下限约束），求使总平均绩点达到目标的最小g：
+    Σ c_i·clamp(g, lo_i, hi_i) 关于g单调分段线性，在排序后的断点间插值求解，O(n log n)。
+    没有锁定课程时即为"所有剩余课程统一绩点"的解。
+
+    Args:
+        current_courses: 已有成绩的课程
+        remaining_courses: 尚未修读的课程（通常来自培养计划）
+        target: 目标平均绩点
+        include_electives: 是否计入选修课，为False时只修读必修课
+        fixed: 课程名称 -> 锁定的绩点（如已有把握的课程）
+        min_point: 绩点下限
+        max_point: 绩点上限
+        credit_field: 剩余课程的学分字段名
+
+    Returns:
+        包含 feasible、level（所需统一绩点，已满足时为下限）、current_gpa、
+        min_gpa/max_gpa（剩余课程全取下限/上限时的平均绩点）、courses（每门课程的学分和所需绩点）的字典
+    """
+    fixed = fixed or {}
+
+    base_credits = 0.0
+    base_points = 0.0
+    for credit, grade_point in iter_credit_points(current_courses):
+        base_credits += credit
+        base_points += credit * grade_point
+
+    # 参与计算的课程：(课程, 学分, 下限, 上限)
+    items: List[Tuple[Dict[str, Any], float, float, float]] = []
+    for course in remaining_courses:
+        credit = to_float(course.get(credit_field))
+        if credit is None or credit <= 0:
+            continue
+        if not include_electives and not is_required_course(course):
+            continue
+        name = course.get('课程名称', '')
+        if name in fixed:
+            value = min(max(float(fixed[name]), min_point), max_point)
+            items.append((course, credit, value, value))
+        else:
+            items.append((course, credit, min_point, max_point))
+
+    total_credits = base_credits + sum(credit for _, credit, _, _ in items)
+    current_gpa = base_points / base_credits if base_credits > 0 else 0.0
+
+    def points_at(level: float) -> float:
+        return sum(credit * min(max(level, low), high) for _, credit, low, high in items)
+
+    result = {
+        "target": target,
+        "current_gpa": current_gpa,
+        "course_count": len(items),
+        "remaining_credits": total_credits - base_credits,
+        "min_gpa": (base_points + points_at(min_point)) / total_credits if total_credits > 0 else 0.0,
+        "max_gpa": (base_points + points_at(max_point)) / total_credits if total_credits > 0 else 0.0
+    }
+
+    # 剩余课程需要贡献的学分绩点
+    needed = target * total_credits - base_points
+    breakpoints = sorted({min_point, max_point, *(low for _, _, low, _ in items), *(high for _, _, _, high in items)})
+
+    if not items:
+        # 没有可调整的剩余课程：只看当前绩点是否已达到目标
+        result.update({"feasible": base_credits > 0 and needed <= 1e-9, "level": None, "courses": []})
+        return result
+
+    if points_at(breakpoints[-1]) < needed - 1e-9:
+        result.update({"feasible": False, "level": None, "courses": []})
+        return result
+
+    if points_at(breakpoints[0]) >= needed:
+        level = breakpoints[0]
+    else:
+        # 二分查找 needed 所在的断点区间，区间内线性插值
+        lo_index, hi_index = 0, len(breakpoints) - 1
+        while hi_index - lo_index > 1:
+            middle = (lo_index + hi_index) // 2
+            if points_at(breakpoints[middle]) < needed:
+                lo_index = middle
+            else:
+                hi_index = middle
+        left, right = breakpoints[lo_index], breakpoints[hi_index]
+        left_points, right_points = points_at(left), points_at(right)
+        level = left + (needed - left_points) * (right - left) / (right_points - left_points)
+        level = min(_ceil_level(level), right)
+
+    result.update({
+        "feasible": True,
+        "level": level,
+        "courses": [
+            {"course": course, "name": course.get('课程名称', ''), "credit": credit,
+             "required": is_required_course(course), "fixed": low == high,
+             "grade_point": min(max(level, low), high)}
+            for course, credit, low, high in items
+        ]
+    })
+    return result
@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from .course_table import CourseTable
+from .csv_records import write_course_csv
+
+
+# 课程变化类型
+CHANGE_ADDED = "added"
+CHANGE_UPDATED = "updated"
+CHANGE_REMOVED = "removed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    fingerprint TEXT,
+    total_gpa REAL,
+    course_count INTEGER NOT NULL,
+    headers TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_account_time ON snapshots (account, taken_at);
+
+CREATE TABLE IF NOT EXISTS course_rows (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    account TEXT NOT NULL,
+    course TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    change_type TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_course_rows_key ON course_rows (account, course, semester);
+CREATE INDEX IF NOT EXISTS idx_course_rows_snapshot ON course_rows (snapshot_id);
+
+CREATE TABLE IF NOT EXISTS latest_courses (
+    account TEXT NOT NULL,
+    course TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, course, semester)
+);
+"""
+
+
+def course_key(course: Dict[str, Any]) -> Tuple[str, str]:
+    """课程的唯一键：课程名称 + 学年学期（与成绩比对一致）"""
+    return str(course.get('课程名称', '')), str(course.get('学年学期', ''))
+
+
+def _normalize_value(value: Any) -> str:
+    """比较用的字段值：数字统一格式，CSV读入的 "4" 与解析得到的 4.0 视为相同"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value)
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return str(value).strip()
+
+
+def _comparable(course: Dict[str, Any]) -> Dict[str, str]:
+    """课程行的比较形式，忽略字段值类型的差异"""
+    return {str(key): _normalize_value(value) for key, value in course.items()}
+
+
+class GradeStore:
+    """基于SQLite的成绩历史存储
+
+    每次成绩变化保存一个快照，只记录发生变化的课程行；
+    latest_courses 表保存每个账号的当前成绩，用于读取上次状态。
+    数据库使用WAL模式，写入使用 BEGIN IMMEDIATE，多个监控进程可同时写入。
+    """
+
+    def __init__(self, db_path: str = "output/grades.db", timeout: float = 30.0):
+        """
+        初始化成绩存储
+
+        Args:
+            db_path: 数据库文件路径
+            timeout: 等待其他进程释放写锁的最长时间（秒）
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 自行管理事务，写入时显式 BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """关闭当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def has_account(self, account: str) -> bool:
+        """账号是否已有快照"""
+        row = self._connection().execute(
+            "SELECT 1 FROM snapshots WHERE account = ? LIMIT 1", (account,)
+        ).fetchone()
+        return row is not None
+
+    def latest_snapshot(self, account: str) -> Optional[Dict[str, Any]]:
+        """
+        获取账号最近一次快照的信息
+
+        Returns:
+            包含 id、taken_at、fingerprint、total_gpa、course_count、headers 的字典，没有快照时返回None
+        """
+        row = self._connection().execute(
+            "SELECT id, taken_at, fingerprint, total_gpa, course_count, headers FROM snapshots "
+            "WHERE account = ? ORDER BY id DESC LIMIT 1", (account,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "taken_at": row[1],
+            "fingerprint": row[2],
+            "total_gpa": row[3],
+            "course_count": row[4],
+            "headers": json.loads(row[5])
+        }
+
+    def latest(self, account: str) -> Dict[str, Any]:
+        """
+        读取账号的当前成绩
+
+        Args:
+            account: 账号（学号）
+
+        Returns:
+            包含 courses（CourseTable）、headers、total_gpa 的字典，没有数据时courses为空
+        """
+        snapshot = self.latest_snapshot(account)
+        if snapshot is None:
+            return {"courses": CourseTable(), "headers": [], "total_gpa": 0.0}
+
+        rows = self._connection().execute(
+            "SELECT data FROM latest_courses WHERE account = ? ORDER BY position", (account,)
+        ).fetchall()
+        courses = CourseTable(snapshot["headers"], (json.loads(row[0]) for row in rows))
+        return {"courses": courses, "headers": snapshot["headers"], "total_gpa": snapshot["total_gpa"]}
+
+    def save_snapshot(self, account: str, grades_result: Dict[str, Any],
+                      total_gpa: Optional[float] = None, taken_at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        保存一次成绩快照
+
+        与当前成绩逐门比较，只记录新增、更新和移除的课程；
+        没有任何变化时不创建快照。
+
+        Args:
+            account: 账号（学号）
+            grades_result: 与 get_grades() 结构相同的成绩结果
+            total_gpa: 本次计算的总平均绩点，为None时使用结果中的total_gpa
+            taken_at: 快照时间戳，默认为当前时间
+
+        Returns:
+            包含 snapshot_id（无变化时为None）和 changes 列表的字典
+        """
+        courses = grades_result.get('courses') or []
+        headers = list(grades_result.get('headers') or (list(courses[0].keys()) if courses else []))
+        if total_gpa is None:
+            total_gpa = grades_result.get('total_gpa', 0.0)
+        taken_at = time.time() if taken_at is None else taken_at
+
+        new_rows = {}
+        for position, course in enumerate(courses):
+            key = course_key(course)
+            if key in new_rows:
+                # 同一学期同名课程（如重修）用序号区分，避免被主键覆盖
+                occurrence = 2
+                while (f"{key[0]}#{occurrence}", key[1]) in new_rows:
+                    occurrence += 1
+                logging.warning(f"{account} 的课程 {key[0]}（{key[1]}）重复出现，按 {key[0]}#{occurrence} 保存")
+                key = (f"{key[0]}#{occurrence}", key[1])
+            new_rows[key] = (position, json.dumps(dict(course), ensure_ascii=False), _comparable(course))
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = {}
+            for course, semester, position, data in conn.execute(
+                "SELECT course, semester, position, data FROM latest_courses WHERE account = ?", (account,)
+            ):
+                stored[(course, semester)] = (position, data)
+
+            changes = []
+            for key, (position, data, comparable) in new_rows.items():
+                old = stored.get(key)
+                if old is None:
+                    changes.append((key, CHANGE_ADDED, data))
+                elif old[1] != data and _comparable(json.loads(old[1])) != comparable:
+                    changes.append((key, CHANGE_UPDATED, data))
+            for key, (_, data) in stored.items():
+                if key not in new_rows:
+                    changes.append((key, CHANGE_REMOVED, data))
+
+            order_changed = any(stored[key][0] != position for key, (position, _, _) in new_rows.items() if key in stored)
+            if not changes and not order_changed:
+                conn.execute("COMMIT")
+                return {"snapshot_id": None, "changes": []}
+
+            cursor = conn.execute(
+                "INSERT INTO snapshots (account, taken_at, fingerprint, total_gpa, course_count, headers) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (account, taken_at, grades_result.get('fingerprint'), total_gpa, len(new_rows),
+                 json.dumps(headers, ensure_ascii=False))
+            )
+            snapshot_id = cursor.lastrowid
+
+            conn.executemany(
+                "INSERT INTO course_rows (snapshot_id, account, course, semester, change_type, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(snapshot_id, account, key[0], key[1], change_type, data) for key, change_type, data in changes]
+            )
+            conn.execute("DELETE FROM latest_courses WHERE account = ?", (account,))
+            conn.executemany(
+                "INSERT INTO latest_courses (account, course, semester, position, snapshot_id, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(account, key[0], key[1], position, snapshot_id, data)
+                 for key, (position, data, _) in new_rows.items()]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        logging.debug(f"成绩快照 {snapshot_id} 已保存: {account}，{len(changes)} 门课程变化")
+        return {
+            "snapshot_id": snapshot_id,
+            "changes": [
+                {"course": key[0], "semester": key[1], "change_type": change_type, "data": json.loads(data)}
+                for key, change_type, data in changes
+            ]
+        }
+
+    def changes_since(self, account: str, since: float) -> List[Dict[str, Any]]:
+        """
+        查询某时间之后的成绩变化
+
+        Args:
+            account: 账号（学号）
+            since: 起始时间戳（不含）
+
+        Returns:
+            按时间排序的变化列表，每项包含 taken_at、course、semester、change_type、data
+        """
+        rows = self._connection().execute(
+            "SELECT s.taken_at, r.course, r.semester, r.change_type, r.data "
+            "FROM course_rows r JOIN snapshots s ON s.id = r.snapshot_id "
+            "WHERE s.account = ? AND s.taken_at > ? ORDER BY s.id",
+            (account, since)
+        ).fetchall()
+        return [
+            {"taken_at": taken_at, "course": course, "semester": semester,
+             "change_type": change_type, "data": json.loads(data)}
+            for taken_at, course, semester, change_type, data in rows
+        ]
+
+    def course_history(self, account: str, course: str, semester: str) -> List[Dict[str, Any]]:
+        """
+        查询单门课程的全部变化记录
+
+        Returns:
+            按时间排序的变化列表，每项包含 taken_at、change_type、data
+        """
+        rows = self._connection().execute(
+            "SELECT s.taken_at, r.change_type, r.data FROM course_rows r "
+            "JOIN snapshots s ON s.id = r.snapshot_id "
+            "WHERE r.account = ? AND r.course = ? AND r.semester = ? ORDER BY s.id",
+            (account, course, semester)
+        ).fetchall()
+        return [{"taken_at": taken_at, "change_type": change_type, "data": json.loads(data)}
+                for taken_at, change_type, data in rows]
+
+    def export_csv(self, account: str, output_path: str) -> int:
+        """
+        将账号的当前成绩导出为CSV（与 save_grades_to_csv 格式相同）
+
+        Returns:
+            导出的课程数
+        """
+        latest = self.latest(account)
+        courses = latest["courses"]
+        headers = latest["headers"] or (list(courses[0].keys()) if courses else [])
+
+        write_course_csv(output_path, courses, headers)
+        return len(courses)
@@ -0,0 +1,339 @@
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Callable, Union
+
+try:
+    import aiohttp
+except ImportError:  # 异步后端为可选功能
+    aiohttp = None
+
+from .neu_login import (
+    NEULoginError, BackendError, CAS_BASE_URL, CAS_LOGIN_PATH, DEFAULT_HEADERS,
+    parse_login_form, build_login_data, interpret_login_response
+)
+from .neu_get_grade import (
+    NEUGradeService, GRADES_PATH, GRADES_HEADERS, GRADES_REFERER_PATH, SEMESTER_GRADES_PATH, SEMESTER_GRADES_HEADERS,
+    SEMESTER_GRADES_REFERER_PATH, eams_request_headers
+)
+from .neu_get_plan import NEUPlanService, PLAN_PATH, PLAN_HEADERS, PLAN_REFERER_PATH, run_result_callback
+from .neu_parser import PageParser
+from .neu_retry import RetryPolicy
+
+
+def _require_aiohttp():
+    """检查aiohttp是否可用"""
+    if aiohttp is None:
+        raise ImportError("异步后端需要安装aiohttp: pip install -r requirements-async.txt")
+
+
+def create_connector(limit: int = 100, limit_per_host: int = 8) -> "aiohttp.TCPConnector":
+    """
+    创建多个账号共享的连接池
+
+    必须在事件循环中调用。
+
+    Args:
+        limit: 连接总数上限
+        limit_per_host: 每台主机的连接数上限
+
+    Returns:
+        可传给 AsyncNEULogin 的连接器
+    """
+    _require_aiohttp()
+    return aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host)
+
+
+class AsyncNEULogin:
+    """NEU登录工具（asyncio版本）
+
+    每个实例持有独立的cookie，多个实例可共享同一个连接器，
+    认证流程和返回结果与 NEULogin 一致。
+    """
+
+    def __init__(self, service_url: Optional[str] = None, bypass_proxy: bool = False,
+                 connector: Optional["aiohttp.TCPConnector"] = None, cas_base_url: Optional[str] = None):
+        """
+        初始化NEU登录
+
+        Args:
+            service_url: 基础URL
+            bypass_proxy: 是否跳过系统代理
+            connector: 共享连接池，为None时使用独立连接池
+            cas_base_url: 统一身份认证地址，默认为 https://pass.neu.edu.cn
+        """
+        _require_aiohttp()
+        self.service_url = service_url
+        self.cas_base_url = (cas_base_url or CAS_BASE_URL).rstrip('/')
+        self.bypass_proxy = bypass_proxy
+        self.connector = connector
+        self.ticket = None
+        self._session = None
+
+    async def __aenter__(self) -> "AsyncNEULogin":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def get_session(self) -> "aiohttp.ClientSession":
+        """获取当前会话对象，首次调用时创建"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=self.connector,
+                connector_owner=self.connector is None,
+                headers=DEFAULT_HEADERS,
+                # 教务系统以IP访问，需要允许IP主机的cookie
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                trust_env=not self.bypass_proxy
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """关闭会话，共享连接池不会被关闭"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def authenticate(self, username: str, password: str) -> Dict[str, Any]:
+        """
+        执行认证
+
+        Args:
+            username: 用户名
+            password: 密码
+
+        Returns:
+            认证结果字典，包含ticket和cookies
+        """
+        session = self.get_session()
+
+        try:
+            # 获取登录表单数据
+            async with session.get(self.cas_base_url + CAS_LOGIN_PATH) as response:
+                form_data = parse_login_form(await response.text(errors="replace"))
+
+            # 提交登录请求，但不允许重定向
+            async with session.post(
+                self.cas_base_url + form_data['form_destination'],
+                data=build_login_data(username, password, form_data),
+                allow_redirects=False
+            ) as response:
+                result = interpret_login_response(
+                    response.status,
+                    response.headers.get('Location', ''),
+                    await response.text(errors="replace")
+                )
+
+            if "ticket" in result:
+                self.ticket = result["ticket"]
+            result["cookies"] = {cookie.key: cookie.value for cookie in session.cookie_jar}
+            return result
+
+        except Exception as e:
+            if isinstance(e, NEULoginError):
+                raise
+            else:
+                raise BackendError(f"认证过程中发生异常: {str(e)}")
+
+    async def access_service(self, service_url: Optional[str] = None) -> Dict[str, Any]:
+        """
+        使用已认证的会话访问目标服务
+
+        Args:
+            service_url: 要访问的服务URL，如果不提供则使用初始化时的URL
+
+        Returns:
+            访问结果字典
+        """
+        target = service_url or self.service_url
+
+        try:
+            cas_url = f"{self.cas_base_url}{CAS_LOGIN_PATH}?service={target}"
+            async with self.get_session().get(cas_url, allow_redirects=True) as response:
+                return {
+                    "success": response.status == 200,
+                    "status_code": response.status,
+                    "url": str(response.url),
+                    "content": await response.text(errors="replace")
+                }
+        except Exception as e:
+            raise BackendError(f"访问服务时发生异常: {str(e)}")
+
+
+class AsyncNEUGradeService(NEUGradeService):
+    """NEU成绩获取服务（asyncio版本），解析逻辑与同步版本共用"""
+
+    def __init__(self, session: "aiohttp.ClientSession", parser: Union[str, PageParser, None] = None,
+                 base_url: Optional[str] = None):
+        """
+        初始化成绩获取服务
+
+        Args:
+            session: AsyncNEULogin.get_session() 返回的已认证会话
+            parser: 解析引擎名称或实例，默认优先使用lxml
+            base_url: 教务系统地址，默认为 http://219.216.96.4
+        """
+        super().__init__(session, parser, base_url)
+
+    async def get_grades(self, project_type: str = "MAJOR", known_fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取学生成绩信息
+
+        Args:
+            project_type: 项目类型，默认为"MAJOR"（主修）
+            known_fingerprint: 上次成功解析时的页面指纹，指纹一致时跳过解析
+
+        Returns:
+            与 NEUGradeService.get_grades 相同的结果字典
+        """
+        try:
+            grades_url = self.base_url + GRADES_PATH.format(project_type=project_type)
+
+            headers = eams_request_headers(GRADES_HEADERS, self.base_url, GRADES_REFERER_PATH)
+            async with self.session.post(grades_url, headers=headers) as response:
+                if response.status != 200:
+                    raise BackendError(f"获取成绩失败，状态码: {response.status}")
+                html_content = await response.text(errors="replace")
+
+            return self._handle_grades_response(html_content, known_fingerprint)
+
+        except Exception as e:
+            if isinstance(e, NEULoginError):
+                raise
+            else:
+                raise BackendError(f"获取成绩时发生异常: {str(e)}")
+
+    async def get_semester_grades(self, semester_id: str, project_type: str = "",
+                                  known_fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取单个学期的成绩
+
+        Args:
+            semester_id: 教务系统中的学期ID
+            project_type: 项目类型，默认为空（与教务系统页面一致）
+            known_fingerprint: 上次成功解析时的页面指纹，指纹一致时跳过解析
+
+        Returns:
+            与 NEUGradeService.get_semester_grades 相同的结果字典
+        """
+        try:
+            semester_url = self.base_url + SEMESTER_GRADES_PATH.format(semester_id=semester_id, project_type=project_type)
+
+            headers = eams_request_headers(SEMESTER_GRADES_HEADERS, self.base_url, SEMESTER_GRADES_REFERER_PATH,
+                                           origin=False)
+            async with self.session.get(semester_url, headers=headers) as response:
+                if response.status != 200:
+                    raise BackendError(f"获取学期成绩失败，状态码: {response.status}")
+                html_content = await response.text(errors="replace")
+
+            return self._handle_grades_response(html_content, known_fingerprint)
+
+        except Exception as e:
+            if isinstance(e, NEULoginError):
+                raise
+            else:
+                raise BackendError(f"获取学期成绩时发生异常: {str(e)}")
+
+
+class AsyncNEUPlanService(NEUPlanService):
+    """NEU培养计划获取服务（asyncio版本），解析逻辑与同步版本共用"""
+
+    def __init__(self, session: "aiohttp.ClientSession", parser: Union[str, PageParser, None] = None,
+                 base_url: Optional[str] = None):
+        """
+        初始化培养计划获取服务
+
+        Args:
+            session: AsyncNEULogin.get_session() 返回的已认证会话
+            parser: 解析引擎名称或实例，默认优先使用lxml
+            base_url: 教务系统地址，默认为 http://219.216.96.4
+        """
+        super().__init__(session, parser, base_url)
+
+    async def get_plan(self, plan_id: str, max_retries: int = 5, wait_time: int = 2,
+                       retry_policy: Optional[RetryPolicy] = None) -> Dict[str, Any]:
+        """
+        获取培养计划信息
+
+        Args:
+            plan_id: 培养计划ID
+            max_retries: 最大尝试次数（未指定retry_policy时生效）
+            wait_time: 每次重试间隔时间（秒，未指定retry_policy时生效）
+            retry_policy: 重试策略
+
+        Returns:
+            与 NEUPlanService.get_plan 相同的结果字典
+        """
+        policy = retry_policy or RetryPolicy.fixed(max_retries, wait_time)
+
+        try:
+            loop = asyncio.get_running_loop()
+            start_time = loop.time()
+            attempt = 0
+
+            while True:
+                attempt += 1
+
+                headers = eams_request_headers(PLAN_HEADERS, self.base_url, PLAN_REFERER_PATH)
+                async with self.session.post(self.base_url + PLAN_PATH, data={"planId": plan_id}, headers=headers) as response:
+                    if response.status != 200:
+                        raise BackendError(f"获取培养计划失败，状态码: {response.status}")
+                    content = await response.read()
+                    charset = response.charset or "utf-8"
+
+                result = self._evaluate_plan_page(
+                    content, lambda: content.decode(charset, errors="replace"), attempt
+                )
+                if result is not None:
+                    return self._finish_plan_result(result, attempt, loop.time() - start_time)
+
+                delay = policy.next_delay(attempt, loop.time() - start_time)
+                if delay is None:
+                    break
+                logging.info(f"等待 {delay:.1f} 秒后重试...")
+                await asyncio.sleep(delay)
+
+            raise BackendError(f"经过 {attempt} 次尝试仍未能获取到培养计划数据")
+
+        except Exception as e:
+            if isinstance(e, NEULoginError):
+                raise
+            else:
+                raise BackendError(f"获取培养计划时发生异常: {str(e)}")
+
+    async def get_plans(self, plan_ids: List[str], max_workers: int = 4,
+                        retry_policy: Optional[RetryPolicy] = None,
+                        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        在同一个已认证会话中并发获取多个培养计划
+
+        Args:
+            plan_ids: 培养计划ID列表
+            max_workers: 最大并发数
+            retry_policy: 每个培养计划使用的重试策略
+            on_result: 每个培养计划完成时的回调，参数为(plan_id, 结果)，按完成顺序执行；
+                回调出错时该计划记为失败，不影响其他计划
+
+        Returns:
+            与 NEUPlanService.get_plans 相同的结果字典
+        """
+        results = {}
+        unique_ids = list(dict.fromkeys(str(plan_id) for plan_id in plan_ids))
+        if not unique_ids:
+            return results
+
+        semaphore = asyncio.Semaphore(max(1, min(max_workers, len(unique_ids))))
+
+        async def fetch(plan_id: str) -> None:
+            async with semaphore:
+                try:
+                    result = await self.get_plan(plan_id, retry_policy=retry_policy)
+                except NEULoginError as e:
+                    logging.error(f"培养计划 {plan_id} 获取失败: {getattr(e, 'page_content', e)}")
+                    result = {"success": False, "error": str(getattr(e, 'page_content', e))}
+
+            results[plan_id] = run_result_callback(on_result, plan_id, result)
+
+        await asyncio.gather(*(fetch(plan_id) for plan_id in unique_ids))
+        # 按请求顺序返回
+        return {plan_id: results[plan_id] for plan_id in unique_ids}
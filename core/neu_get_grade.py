@@ -1,53 +1,177 @@
+import re
+import hashlib
 import logging
-from typing import Dict, Any
-from bs4 import BeautifulSoup
+from typing import Dict, Any, List, Optional, Union
 from requests import Session
 from .neu_login import NEULoginError, BackendError
+from .neu_parser import PageParser, get_parser
+from .course_table import CourseTable
+
+
+EAMS_BASE_URL = "http://219.216.96.4"
+GRADES_PATH = "/eams/teach/grade/course/person!historyCourseGrade.action?projectType={project_type}"
+
+# 成绩查询请求头（Origin、Referer 按服务的教务系统地址在每次请求时添加）
+GRADES_HEADERS = {
+    "Accept": "*/*",
+    "X-Requested-With": "XMLHttpRequest",
+    "Content-Length": "0"
+}
+GRADES_REFERER_PATH = "/eams/teach/grade/course/person!search.action?semesterId=110&projectType="
+
+# 指纹计算：归一化空白，并提取总平均绩点片段
+_WHITESPACE_RE = re.compile(r"\s+")
+_GPA_SECTION_RE = re.compile(r"总平均绩点[：:]\s*[\d.]*")
+
+SEMESTER_GRADES_PATH = "/eams/teach/grade/course/person!search.action?semesterId={semester_id}&projectType={project_type}"
+
+# 当前学期成绩查询请求头
+SEMESTER_GRADES_HEADERS = {
+    "Accept": "text/html, */*; q=0.01",
+    "X-Requested-With": "XMLHttpRequest"
+}
+SEMESTER_GRADES_REFERER_PATH = "/eams/teach/grade/course/person.action"
+
+
+def eams_request_headers(headers: Dict[str, str], base_url: str, referer_path: str,
+                         origin: bool = True) -> Dict[str, str]:
+    """
+    为请求头加上指向教务系统地址的 Referer（及 Origin）
+    
+    Args:
+        headers: 基础请求头
+        base_url: 教务系统地址
+        referer_path: Referer 页面路径
+        origin: 是否添加 Origin
+        
+    Returns:
+        新的请求头字典
+    """
+    result = dict(headers)
+    if origin:
+        result["Origin"] = base_url
+    result["Referer"] = base_url + referer_path
+    return result
+
+
+def fingerprint_grades_page(html_content: str) -> Optional[str]:
+    """
+    计算成绩页面的内容指纹
+    
+    只取成绩表格和总平均绩点所在片段，并归一化空白，
+    页面其余部分（时间戳、随机token等）的变化不影响指纹。
+    
+    Args:
+        html_content: 成绩页面HTML
+        
+    Returns:
+        十六进制SHA-256指纹，找不到成绩表格时返回None
+    """
+    class_pos = html_content.find("gridtable")
+    if class_pos < 0:
+        return None
+    
+    table_start = html_content.rfind("<table", 0, class_pos)
+    table_end = html_content.find("</table>", class_pos)
+    if table_start < 0 or table_end < 0:
+        return None
+    
+    digest = hashlib.sha256()
+    digest.update(_WHITESPACE_RE.sub(" ", html_content[table_start:table_end]).encode("utf-8"))
+    
+    gpa_match = _GPA_SECTION_RE.search(html_content)
+    if gpa_match:
+        digest.update(gpa_match.group(0).encode("utf-8"))
+    
+    return digest.hexdigest()
+
+
+def merge_semester_grades(history_courses: List[Dict[str, Any]], history_headers: List[str],
+                          semester_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将当前学期成绩合并到已保存的完整历史成绩中
+    
+    以"课程名称+学年学期"匹配课程：已有课程用学期页面的值更新，
+    新课程追加到末尾；学期页面中历史表头没有的列会被忽略。
+    
+    Args:
+        history_courses: 已保存的历史成绩课程列表
+        history_headers: 历史成绩表头
+        semester_result: get_semester_grades() 的解析结果
+        
+    Returns:
+        与 get_grades() 结构相同的合并结果
+    """
+    headers = list(history_headers) or list(semester_result.get('headers', []))
+    
+    merged = CourseTable(headers, history_courses)
+    index = {}
+    for position, course in enumerate(merged):
+        index[(course.get('课程名称', ''), course.get('学年学期', ''))] = position
+    
+    for course in semester_result['courses']:
+        key = (course.get('课程名称', ''), course.get('学年学期', ''))
+        projected = {header: course[header] for header in headers if header in course}
+        if key in index:
+            merged[index[key]].update(projected)
+        else:
+            new_course = dict.fromkeys(headers, '')
+            new_course.update(projected)
+            index[key] = len(merged)
+            merged.append(new_course)
+    
+    return {
+        "success": True,
+        "unchanged": False,
+        "fingerprint": semester_result.get('fingerprint'),
+        "total_gpa": semester_result.get('total_gpa', 0.0),
+        "course_count": len(merged),
+        "courses": merged,
+        "headers": headers
+    }
 
 
 class NEUGradeService:
     """NEU成绩获取服务"""
     
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, parser: Union[str, PageParser, None] = None,
+                 base_url: Optional[str] = None):
         """
         初始化成绩获取服务
         
         Args:
             session: 已认证的会话对象
+            parser: 解析引擎名称或实例，默认优先使用lxml
+            base_url: 教务系统地址，默认为 http://219.216.96.4
         """
         self.session = session
+        self.base_url = (base_url or EAMS_BASE_URL).rstrip('/')
+        self.parser = parser if isinstance(parser, PageParser) else get_parser(parser)
     
-    def get_grades(self, project_type: str = "MAJOR") -> Dict[str, Any]:
+    def get_grades(self, project_type: str = "MAJOR", known_fingerprint: Optional[str] = None) -> Dict[str, Any]:
         """
         获取学生成绩信息
         
         Args:
             project_type: 项目类型，默认为"MAJOR"（主修）
+            known_fingerprint: 上次成功解析时的页面指纹，指纹一致时跳过解析
             
         Returns:
-            包含成绩信息的字典，包括总平均绩点和课程列表
+            包含成绩信息的字典，包括总平均绩点和课程列表；
+            页面未变化时只返回 unchanged=True 和指纹
         """
         try:
             # 构造成绩查询URL
-            grades_url = f"http://219.216.96.4/eams/teach/grade/course/person!historyCourseGrade.action?projectType={project_type}"
-            
-            # 设置请求头
-            headers = {
-                "Accept": "*/*",
-                "X-Requested-With": "XMLHttpRequest",
-                "Origin": "http://219.216.96.4",
-                "Referer": "http://219.216.96.4/eams/teach/grade/course/person!search.action?semesterId=110&projectType=",
-                "Content-Length": "0"
-            }
+            grades_url = self.base_url + GRADES_PATH.format(project_type=project_type)
             
             # 发送POST请求获取成绩数据
-            response = self.session.post(grades_url, headers=headers)
+            response = self.session.post(grades_url, headers=eams_request_headers(
+                GRADES_HEADERS, self.base_url, GRADES_REFERER_PATH))
             
             if response.status_code != 200:
                 raise BackendError(f"获取成绩失败，状态码: {response.status_code}")
             
-            # 解析HTML响应
-            return self._parse_grades_response(response.text)
+            return self._handle_grades_response(response.text, known_fingerprint)
             
         except Exception as e:
             if isinstance(e, NEULoginError):
@@ -55,87 +179,56 @@ class NEUGradeService:
             else:
                 raise BackendError(f"获取成绩时发生异常: {str(e)}")
 
-    def _parse_grades_response(self, html_content: str) -> Dict[str, Any]:
-        """解析成绩页面响应"""
-        try:
-            soup = BeautifulSoup(html_content, "html.parser")
-            
-            # 查找成绩表格
-            table = soup.find("table", {"class": "gridtable"})
-            if not table:
-                raise BackendError("未找到成绩表格")
-            
-            # 解析表头
-            header_row = table.find("tr")
-            if not header_row:
-                raise BackendError("未找到表头")
+    def get_semester_grades(self, semester_id: str, project_type: str = "",
+                            known_fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取单个学期的成绩（比完整历史成绩页面小得多）
+        
+        Args:
+            semester_id: 教务系统中的学期ID
+            project_type: 项目类型，默认为空（与教务系统页面一致）
+            known_fingerprint: 上次成功解析时的页面指纹，指纹一致时跳过解析
             
-            headers = [th.get_text(strip=True) for th in header_row.find_all(["th", "td"])]
+        Returns:
+            与 get_grades() 结构相同的结果字典
+        """
+        try:
+            semester_url = self.base_url + SEMESTER_GRADES_PATH.format(semester_id=semester_id, project_type=project_type)
+            response = self.session.get(semester_url, headers=eams_request_headers(
+                SEMESTER_GRADES_HEADERS, self.base_url, SEMESTER_GRADES_REFERER_PATH, origin=False))
             
-            # 解析数据行
-            courses = []
-            data_rows = table.find_all("tr")[1:]  # 跳过表头
+            if response.status_code != 200:
+                raise BackendError(f"获取学期成绩失败，状态码: {response.status_code}")
             
-            # 查找总平均绩点
-            total_gpa = 0.0
-            gpa_text = soup.find(string=lambda text: text and "总平均绩点" in text)
-            if gpa_text:
-                try:
-                    # 提取绩点数值
-                    import re
-                    gpa_match = re.search(r'总平均绩点[：:]\s*([\d.]+)', gpa_text)
-                    if gpa_match:
-                        total_gpa = float(gpa_match.group(1))
-                except (ValueError, AttributeError):
-                    pass
+            return self._handle_grades_response(response.text, known_fingerprint)
             
-            for row in data_rows:
-                cells = row.find_all(["td", "th"])
-                if len(cells) >= len(headers):
-                    course_data = {}
-                    for i, header in enumerate(headers):
-                        if i < len(cells):
-                            cell_text = cells[i].get_text(strip=True)
-                            course_data[header] = cell_text
-                    
-                    # 处理学分数值
-                    if "学分" in course_data and course_data["学分"]:
-                        try:
-                            if course_data["学分"].replace('.', '').isdigit():
-                                course_data["学分"] = float(course_data["学分"])
-                        except ValueError:
-                            pass
-                    
-                    # 处理绩点数值
-                    if "绩点" in course_data and course_data["绩点"]:
-                        try:
-                            if course_data["绩点"].replace('.', '').isdigit():
-                                course_data["绩点"] = float(course_data["绩点"])
-                        except ValueError:
-                            pass
-                    
-                    # 处理成绩数值
-                    for grade_field in ["平时成绩", "期中成绩", "期末成绩", "总评成绩", "最终"]:
-                        if grade_field in course_data and course_data[grade_field]:
-                            try:
-                                # 尝试转换为数值
-                                if course_data[grade_field].replace('.', '').isdigit():
-                                    course_data[grade_field] = float(course_data[grade_field])
-                            except ValueError:
-                                pass
-                    
-                    courses.append(course_data)
-        
+        except Exception as e:
+            if isinstance(e, NEULoginError):
+                raise
+            else:
+                raise BackendError(f"获取学期成绩时发生异常: {str(e)}")
+
+    def _handle_grades_response(self, html_content: str, known_fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """计算页面指纹，未变化时跳过解析，否则解析HTML响应"""
+        fingerprint = fingerprint_grades_page(html_content)
+        if fingerprint is not None and fingerprint == known_fingerprint:
             return {
                 "success": True,
-                "total_gpa": total_gpa,
-                "course_count": len(courses),
-                "courses": courses,
-                "headers": headers
+                "unchanged": True,
+                "fingerprint": fingerprint
             }
-            
+        
+        result = self._parse_grades_response(html_content)
+        result["unchanged"] = False
+        result["fingerprint"] = fingerprint
+        return result
+
+    def _parse_grades_response(self, html_content: str) -> Dict[str, Any]:
+        """解析成绩页面响应"""
+        try:
+            return self.parser.parse_grades(html_content)
         except Exception as e:
             if isinstance(e, NEULoginError):
                 raise
             else:
-                raise BackendError(f"解析成绩数据时发生异常: {str(e)}")
\ No newline at end of file
+                raise BackendError(f"解析成绩数据时发生异常: {str(e)}")
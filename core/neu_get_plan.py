@@ -1,85 +1,127 @@
 import logging
 import time
-from typing import Dict, Any
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, List, Optional, Union
 from requests import Session
 from .neu_login import NEULoginError, BackendError
+from .neu_get_grade import eams_request_headers
+from .neu_parser import PageParser, get_parser
+from .neu_retry import RetryPolicy
+
+
+EAMS_BASE_URL = "http://219.216.96.4"
+PLAN_PATH = "/eams/studentMajorPlan!view.action"
+
+# 培养计划查询请求头（Origin、Referer 按服务的教务系统地址在每次请求时添加）
+PLAN_HEADERS = {
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Cache-Control": "max-age=0",
+    "Upgrade-Insecure-Requests": "1",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
+}
+PLAN_REFERER_PATH = "/eams/studentMajorPlan!search.action"
+
+
+# 页面就绪标记：计划表格class及"学时种类"（兼容UTF-8和GBK编码页面）
+_PLAN_TABLE_MARKER = b"planTable"
+_PLAN_READY_MARKERS = tuple({"学时种类".encode(encoding) for encoding in ("utf-8", "gb18030")})
+
+# 解析时表示页面尚未加载完成的错误
+PLAN_NOT_READY_ERRORS = ("未找到培养计划表格", "未找到包含'学时种类'的表格")
+
+
+def is_plan_page_ready(content: bytes) -> bool:
+    """
+    在原始响应字节上判断培养计划页面是否已就绪
+    
+    Args:
+        content: 响应原始字节
+        
+    Returns:
+        页面是否包含培养计划表格和"学时种类"
+    """
+    if _PLAN_TABLE_MARKER not in content:
+        return False
+    return any(marker in content for marker in _PLAN_READY_MARKERS)
+
+
+def run_result_callback(on_result: Optional[Callable[[str, Dict[str, Any]], None]], plan_id: str,
+                        result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    执行 get_plans 的结果回调
+    
+    Returns:
+        计划结果；回调出错时返回 {"success": False, "error": 错误信息}
+    """
+    if on_result is None:
+        return result
+    try:
+        on_result(plan_id, result)
+    except Exception as e:
+        logging.error(f"培养计划 {plan_id} 结果处理失败: {e}")
+        return {"success": False, "error": f"结果处理失败: {e}"}
+    return result
 
 
 class NEUPlanService:
     """NEU培养计划获取服务"""
     
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, parser: Union[str, PageParser, None] = None,
+                 base_url: Optional[str] = None):
         """
         初始化培养计划获取服务
         
         Args:
             session: 已认证的会话对象
+            parser: 解析引擎名称或实例，默认优先使用lxml
+            base_url: 教务系统地址，默认为 http://219.216.96.4
         """
         self.session = session
+        self.base_url = (base_url or EAMS_BASE_URL).rstrip('/')
+        self.parser = parser if isinstance(parser, PageParser) else get_parser(parser)
     
-    def get_plan(self, plan_id: str, max_retries: int = 5, wait_time: int = 2) -> Dict[str, Any]:
+    def get_plan(self, plan_id: str, max_retries: int = 5, wait_time: int = 2,
+                 retry_policy: Optional[RetryPolicy] = None) -> Dict[str, Any]:
         """
         获取培养计划信息
         
         Args:
             plan_id: 培养计划ID
-            max_retries: 最大重试次数
-            wait_time: 每次重试间隔时间（秒）
+            max_retries: 最大尝试次数（未指定retry_policy时生效）
+            wait_time: 每次重试间隔时间（秒，未指定retry_policy时生效）
+            retry_policy: 重试策略，支持指数退避、抖动和总时限
             
         Returns:
-            包含培养计划信息的字典
+            包含培养计划信息的字典，elapsed为获取到就绪页面的耗时（秒），
+            attempts为请求次数
         """
+        policy = retry_policy or RetryPolicy.fixed(max_retries, wait_time)
+        
         try:
-            # 构造POST请求URL和数据
-            target_url = "http://219.216.96.4/eams/studentMajorPlan!view.action"
             post_data = {"planId": plan_id}
+            start_time = time.monotonic()
+            attempt = 0
             
-            # 设置请求头
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded",
-                "Origin": "http://219.216.96.4",
-                "Referer": "http://219.216.96.4/eams/studentMajorPlan!search.action",
-                "Cache-Control": "max-age=0",
-                "Upgrade-Insecure-Requests": "1",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
-            }
-            
-            # 发送POST请求获取页面数据
-            response = self.session.post(target_url, data=post_data, headers=headers)
-            
-            if response.status_code != 200:
-                raise BackendError(f"获取培养计划失败，状态码: {response.status_code}")
-            
-            # 等待页面加载并重试解析
-            for attempt in range(max_retries):
-                logging.info(f"第 {attempt + 1} 次尝试解析页面...")
+            while True:
+                attempt += 1
                 
-                if attempt > 0:
-                    # 重新请求页面
-                    time.sleep(wait_time)
-                    response = self.session.post(target_url, data=post_data, headers=headers)
-                    if response.status_code != 200:
-                        raise BackendError(f"重新获取页面失败，状态码: {response.status_code}")
+                # 发送POST请求获取页面数据
+                response = self.session.post(self.base_url + PLAN_PATH, data=post_data,
+                                             headers=eams_request_headers(PLAN_HEADERS, self.base_url, PLAN_REFERER_PATH))
+                if response.status_code != 200:
+                    raise BackendError(f"获取培养计划失败，状态码: {response.status_code}")
                 
-                try:
-                    # 尝试解析HTML响应
-                    result = self._parse_plan_response(response.text, attempt + 1)
-                    if result['success'] and result['course_count'] > 0:
-                        logging.info(f"成功解析页面，共找到 {result['course_count']} 门课程")
-                        return result
-                    else:
-                        logging.warning(f"第 {attempt + 1} 次解析未找到课程数据")
-                except Exception as parse_error:
-                    error_msg = str(parse_error)
-                    if ("未找到培养计划表格" in error_msg or "未找到包含'学时种类'的表格" in error_msg) and attempt < max_retries - 1:
-                        logging.warning(f"第 {attempt + 1} 次解析失败: {parse_error}，等待 {wait_time} 秒后重试...")
-                        continue
-                    else:
-                        # 如果是最后一次尝试或其他错误，直接抛出
-                        raise parse_error
+                result = self._evaluate_plan_page(response.content, lambda: response.text, attempt)
+                if result is not None:
+                    return self._finish_plan_result(result, attempt, time.monotonic() - start_time)
+                
+                delay = policy.next_delay(attempt, time.monotonic() - start_time)
+                if delay is None:
+                    break
+                logging.info(f"等待 {delay:.1f} 秒后重试...")
+                time.sleep(delay)
             
-            raise BackendError(f"经过 {max_retries} 次尝试仍未能获取到培养计划数据")
+            raise BackendError(f"经过 {attempt} 次尝试仍未能获取到培养计划数据")
             
         except Exception as e:
             if isinstance(e, NEULoginError):
@@ -87,86 +129,91 @@ class NEUPlanService:
             else:
                 raise BackendError(f"获取培养计划时发生异常: {str(e)}")
 
-    def _parse_plan_response(self, html_content: str, attempt: int = 1) -> Dict[str, Any]:
-        """解析培养计划页面响应"""
-        try:
-            soup = BeautifulSoup(html_content, "html.parser")
-            
-            # 查找所有class="planTable"的表格
-            plan_tables = soup.find_all("table", {"class": "planTable"})
-            
-            if not plan_tables:
-                raise BackendError("未找到培养计划表格")
-            
-            # 筛选包含"学时种类"的表格
-            target_table = None
-            for i, table in enumerate(plan_tables):
-                table_text = table.get_text()
-                if "学时种类" in table_text:
-                    target_table = table
-                    break
-            
-            if not target_table:
-                raise BackendError("未找到包含'学时种类'的表格")
-            
-            # 获取tbody
-            tbody = target_table.find("tbody")
-            if not tbody:
-                raise BackendError("未找到表格tbody")
-            
-            # 获取所有tr
-            all_rows = tbody.find_all("tr")
-            
-            # 移除包含rowspan参数的td的tr
-            filtered_rows = []
-            for row in all_rows:
-                has_rowspan = False
-                for td in row.find_all("td"):
-                    if td.get("rowspan"):
-                        has_rowspan = True
-                        break
-                if not has_rowspan:
-                    filtered_rows.append(row)
-            
-            # 解析数据
-            courses = []
-            for row in filtered_rows:
-                cells = row.find_all("td")
-                if len(cells) >= 12:  # 确保有足够的列
-                    # 移除第1列"序号"，移除5列"学时种类"（假设在第5-9列）
-                    course_data = {
-                        "课程序号": cells[1].get_text(strip=True),
-                        "课程名称": cells[2].get_text(strip=True),
-                        "课程学时": cells[3].get_text(strip=True),
-                        "学分数": cells[9].get_text(strip=True),
-                        "周学时": cells[10].get_text(strip=True),
-                        "考试或考查课": cells[11].get_text(strip=True),
-                        "课程类型": cells[12].get_text(strip=True) if len(cells) > 12 else "",
-                        "课群": cells[13].get_text(strip=True) if len(cells) > 13 else "",
-                        "成绩记载方式": cells[14].get_text(strip=True) if len(cells) > 14 else ""
-                    }
-                    
-                    # 处理数值字段
-                    for field in ["课程学时", "学分数", "周学时"]:
-                        if field in course_data and course_data[field]:
-                            try:
-                                if course_data[field].replace('.', '').isdigit():
-                                    course_data[field] = float(course_data[field])
-                            except ValueError:
-                                pass
-                    
-                    courses.append(course_data)
+    def get_plans(self, plan_ids: List[str], max_workers: int = 4,
+                  retry_policy: Optional[RetryPolicy] = None,
+                  on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        在同一个已认证会话中并发获取多个培养计划
+        
+        Args:
+            plan_ids: 培养计划ID列表
+            max_workers: 最大并发数
+            retry_policy: 每个培养计划使用的重试策略
+            on_result: 每个培养计划完成时的回调，参数为(plan_id, 结果)，
+                在调用线程中按完成顺序执行；回调出错时该计划记为失败，不影响其他计划
             
-            return {
-                "success": True,
-                "course_count": len(courses),
-                "courses": courses,
-                "headers": ["课程序号", "课程名称", "课程学时", "学分数", "周学时", "考试或考查课", "课程类型", "课群", "成绩记载方式"]
+        Returns:
+            按请求顺序排列的 plan_id 到结果的字典；获取失败的计划结果为 {"success": False, "error": 错误信息}
+        """
+        results = {}
+        unique_ids = list(dict.fromkeys(str(plan_id) for plan_id in plan_ids))
+        if not unique_ids:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_ids)))) as executor:
+            futures = {
+                executor.submit(self.get_plan, plan_id, retry_policy=retry_policy): plan_id
+                for plan_id in unique_ids
             }
+            for future in as_completed(futures):
+                plan_id = futures[future]
+                try:
+                    result = future.result()
+                except NEULoginError as e:
+                    logging.error(f"培养计划 {plan_id} 获取失败: {getattr(e, 'page_content', e)}")
+                    result = {"success": False, "error": str(getattr(e, 'page_content', e))}
+                
+                results[plan_id] = run_result_callback(on_result, plan_id, result)
+        
+        # 按请求顺序返回
+        return {plan_id: results[plan_id] for plan_id in unique_ids}
+
+    def _evaluate_plan_page(self, content: bytes, decode: Callable[[], str], attempt: int) -> Optional[Dict[str, Any]]:
+        """
+        检查一次请求得到的页面，就绪时解析
+        
+        Args:
+            content: 响应原始字节
+            decode: 返回响应文本的函数，仅在页面就绪时调用
+            attempt: 当前尝试次数
             
+        Returns:
+            解析结果；页面未就绪或没有课程数据时返回None
+        """
+        # 先在原始字节上做就绪检查，未就绪的页面不做解码和DOM解析
+        if not is_plan_page_ready(content):
+            logging.warning(f"第 {attempt} 次请求页面尚未就绪")
+            return None
+        
+        logging.info(f"第 {attempt} 次尝试解析页面...")
+        try:
+            result = self._parse_plan_response(decode(), attempt)
+        except BackendError as e:
+            if e.page_content in PLAN_NOT_READY_ERRORS:
+                logging.warning(f"第 {attempt} 次解析失败: {e.page_content}")
+                return None
+            raise
+        
+        if result['success'] and result['course_count'] > 0:
+            return result
+        
+        logging.warning(f"第 {attempt} 次解析未找到课程数据")
+        return None
+
+    def _finish_plan_result(self, result: Dict[str, Any], attempt: int, elapsed: float) -> Dict[str, Any]:
+        """记录获取耗时"""
+        result['attempts'] = attempt
+        result['elapsed'] = round(elapsed, 3)
+        logging.info(f"成功解析页面，共找到 {result['course_count']} 门课程，"
+                     f"第 {attempt} 次请求就绪，耗时 {elapsed:.2f} 秒")
+        return result
+
+    def _parse_plan_response(self, html_content: str, attempt: int = 1) -> Dict[str, Any]:
+        """解析培养计划页面响应"""
+        try:
+            return self.parser.parse_plan(html_content)
         except Exception as e:
             if isinstance(e, NEULoginError):
                 raise
             else:
                 raise BackendError(f"解析培养计划数据时发生异常: {str(e)}")
-
@@ -0,0 +1,69 @@
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+
+class HostLimiter:
+    """按主机限制并发请求数
+
+    多个账号的会话共享同一个限流器，保证同一时刻发往
+    统一身份认证和教务系统的请求数不超过上限。
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, default_limit: int = 0):
+        """
+        初始化限流器
+
+        Args:
+            limits: 主机名到并发上限的映射，如 {"219.216.96.4": 8}
+            default_limit: 未配置主机的并发上限，0表示不限制
+        """
+        self._limits = dict(limits or {})
+        self._default_limit = default_limit
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore_for(self, host: str) -> Optional[threading.BoundedSemaphore]:
+        """获取主机对应的信号量，不限制时返回None"""
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                limit = self._limits.get(host, self._default_limit)
+                if limit <= 0:
+                    return None
+                semaphore = threading.BoundedSemaphore(limit)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    def acquire(self, url: str) -> Optional[threading.BoundedSemaphore]:
+        """
+        为指定URL获取并发许可
+
+        Args:
+            url: 请求URL
+
+        Returns:
+            已获取的信号量，需在请求结束后调用release；不限制时返回None
+        """
+        semaphore = self._semaphore_for(urlparse(url).hostname or "")
+        if semaphore is not None:
+            semaphore.acquire()
+        return semaphore
+
+
+class LimitedAdapter(HTTPAdapter):
+    """在发送请求前向HostLimiter申请许可的适配器"""
+
+    def __init__(self, limiter: HostLimiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        semaphore = self.limiter.acquire(request.url)
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            if semaphore is not None:
+                semaphore.release()
@@ -4,6 +4,10 @@ from urllib.parse import parse_qs, urlparse
 
 from bs4 import BeautifulSoup, Tag
 from requests import Session
+from requests.cookies import create_cookie
+
+from .neu_session import SessionStore
+from .neu_limiter import HostLimiter, LimitedAdapter
 
 
 class NEULoginError(Exception):
@@ -23,31 +27,123 @@ class BackendError(NEULoginError):
         super().__init__("后端服务异常")
 
 
+CAS_BASE_URL = "https://pass.neu.edu.cn"
+CAS_LOGIN_PATH = "/tpass/login"
+
+# 会话默认请求头
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:94.0) Gecko/20100101 Firefox/94.0",
+    "Accept": "application/json",
+    "Accept-Language": "zh-CN",
+    "Accept-Encoding": "gzip, deflate",
+    "X-Requested-With": "XMLHttpRequest",
+    "Connection": "keep-alive"
+}
+
+
+def parse_login_form(html_content: str) -> Dict[str, str]:
+    """
+    解析统一身份认证登录页中的表单参数
+    
+    Args:
+        html_content: 登录页HTML
+        
+    Returns:
+        包含lt、表单提交地址和execution的字典
+    """
+    page_soup = BeautifulSoup(html_content, "html.parser")
+    form: Tag = page_soup.find("form", {'id': 'loginForm'})
+    
+    if not form:
+        raise BackendError("无法找到登录表单")
+    
+    return {
+        "form_lt_string": form.find("input", {'id': 'lt'}).attrs["value"],
+        "form_destination": form.attrs['action'],
+        "form_execution": form.find("input", {'name': 'execution'}).attrs["value"]
+    }
+
+
+def build_login_data(username: str, password: str, form_data: Dict[str, str]) -> Dict[str, Any]:
+    """构造登录提交数据"""
+    return {
+        'rsa': username + password + form_data['form_lt_string'],
+        'ul': len(username),
+        'pl': len(password),
+        'lt': form_data['form_lt_string'],
+        'execution': form_data['form_execution'],
+        '_eventId': 'submit'
+    }
+
+
+def interpret_login_response(status_code: int, location: str, html_content: str) -> Dict[str, Any]:
+    """
+    根据登录提交的响应判断认证结果
+    
+    Args:
+        status_code: 响应状态码
+        location: 响应的Location头
+        html_content: 响应内容
+        
+    Returns:
+        认证结果字典（不含cookies），认证失败时抛出异常
+    """
+    # 检查是否认证成功（通常会返回302重定向）
+    if status_code == 302:
+        logging.debug(f"认证成功，重定向位置: {location}")
+        
+        # 检查重定向位置，如果是个人门户说明认证成功
+        if "personal.neu.edu.cn" in location or "pass.neu.edu.cn" in location:
+            return {
+                "success": True,
+                "redirect_url": location
+            }
+        
+        # 从重定向URL中提取ticket（如果有的话）
+        if "ticket=" in location:
+            ticket = location.split("ticket=")[1].split("&")[0]
+            return {
+                "success": True,
+                "ticket": ticket
+            }
+    
+    # 如果没有重定向，检查响应内容
+    soup = BeautifulSoup(html_content, "html.parser")
+    title = soup.find("title")
+    if title and title.text.strip() == "智慧东大--统一身份认证":
+        raise UnionAuthError("用户名或密码错误")
+    
+    # 其他情况认为认证失败
+    raise BackendError("认证失败，未获取到有效响应")
+
+
 class NEULogin:
     """NEU登录工具"""
     
-    def __init__(self, service_url: Optional[str] = None, bypass_proxy: bool = False):
+    def __init__(self, service_url: Optional[str] = None, bypass_proxy: bool = False,
+                 host_limiter: Optional[HostLimiter] = None, cas_base_url: Optional[str] = None):
         """
         初始化NEU登录
         
         Args:
             service_url: 基础URL
             bypass_proxy: 是否跳过系统代理
+            host_limiter: 多账号共享的按主机并发限流器
+            cas_base_url: 统一身份认证地址，默认为 https://pass.neu.edu.cn
         """
         self.service_url = service_url
-        self.session = self._prepare_session(bypass_proxy)
+        self.cas_base_url = (cas_base_url or CAS_BASE_URL).rstrip('/')
+        self.session = self._prepare_session(bypass_proxy, host_limiter)
+        self.ticket = None
         
-    def _prepare_session(self, bypass_proxy: bool) -> Session:
+    def _prepare_session(self, bypass_proxy: bool, host_limiter: Optional[HostLimiter] = None) -> Session:
         """准备会话"""
         sess = Session()
-        sess.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:94.0) Gecko/20100101 Firefox/94.0",
-            "Accept": "application/json",
-            "Accept-Language": "zh-CN",
-            "Accept-Encoding": "gzip, deflate",
-            "X-Requested-With": "XMLHttpRequest",
-            "Connection": "keep-alive"
-        })
+        if host_limiter is not None:
+            adapter = LimitedAdapter(host_limiter)
+            sess.mount("http://", adapter)
+            sess.mount("https://", adapter)
+        sess.headers.update(DEFAULT_HEADERS)
         
         if bypass_proxy:
             sess.trust_env = False
@@ -69,70 +165,29 @@ class NEULogin:
             认证结果字典，包含ticket和cookies
         """
         # 使用空服务URL创建认证请求
-        auth_url = "https://pass.neu.edu.cn/tpass/login"
+        auth_url = self.cas_base_url + CAS_LOGIN_PATH
         
         try:
             # 获取登录表单数据
             response = self.session.get(auth_url)
-            page_soup = BeautifulSoup(response.text, "html.parser")
-            form: Tag = page_soup.find("form", {'id': 'loginForm'})
-            
-            if not form:
-                raise BackendError("无法找到登录表单")
-                
-            form_data = {
-                "form_lt_string": form.find("input", {'id': 'lt'}).attrs["value"],
-                "form_destination": form.attrs['action'],
-                "form_execution": form.find("input", {'name': 'execution'}).attrs["value"]
-            }
-            
-            # 构造登录数据
-            login_data = {
-                'rsa': username + password + form_data['form_lt_string'],
-                'ul': len(username),
-                'pl': len(password),
-                'lt': form_data['form_lt_string'],
-                'execution': form_data['form_execution'],
-                '_eventId': 'submit'
-            }
+            form_data = parse_login_form(response.text)
             
             # 提交登录请求，但不允许重定向
             response = self.session.post(
-                "https://pass.neu.edu.cn" + form_data['form_destination'],
-                data=login_data,
+                self.cas_base_url + form_data['form_destination'],
+                data=build_login_data(username, password, form_data),
                 allow_redirects=False
             )
             
-            # 检查是否认证成功（通常会返回302重定向）
-            if response.status_code == 302:
-                location = response.headers.get('Location', '')
-                logging.debug(f"认证成功，重定向位置: {location}")
-                
-                # 检查重定向位置，如果是个人门户说明认证成功
-                if "personal.neu.edu.cn" in location or "pass.neu.edu.cn" in location:
-                    return {
-                        "success": True,
-                        "cookies": dict(self.session.cookies),
-                        "redirect_url": location
-                    }
-                
-                # 从重定向URL中提取ticket（如果有的话）
-                if "ticket=" in location:
-                    ticket = location.split("ticket=")[1].split("&")[0]
-                    return {
-                        "success": True,
-                        "ticket": ticket,
-                        "cookies": dict(self.session.cookies)
-                    }
-            
-            # 如果没有重定向，检查响应内容
-            soup = BeautifulSoup(response.text, "html.parser")
-            title = soup.find("title")
-            if title and title.text.strip() == "智慧东大--统一身份认证":
-                raise UnionAuthError("用户名或密码错误")
-            
-            # 其他情况认为认证失败
-            raise BackendError("认证失败，未获取到有效响应")
+            result = interpret_login_response(
+                response.status_code,
+                response.headers.get('Location', ''),
+                response.text
+            )
+            if "ticket" in result:
+                self.ticket = result["ticket"]
+            result["cookies"] = dict(self.session.cookies)
+            return result
             
         except Exception as e:
             if isinstance(e, NEULoginError):
@@ -154,7 +209,7 @@ class NEULogin:
         
         try:
             # 构造带有CAS认证的URL
-            cas_url = f"https://pass.neu.edu.cn/tpass/login?service={target}"
+            cas_url = f"{self.cas_base_url}{CAS_LOGIN_PATH}?service={target}"
             response = self.session.get(cas_url, allow_redirects=True)
             
             return {
@@ -164,4 +219,116 @@ class NEULogin:
                 "content": response.text
             }
         except Exception as e:
-            raise BackendError(f"访问服务时发生异常: {str(e)}")
\ No newline at end of file
+            raise BackendError(f"访问服务时发生异常: {str(e)}")
+
+    def export_state(self) -> Dict[str, Any]:
+        """
+        导出当前会话状态，用于持久化
+        
+        Returns:
+            包含cookies和ticket的字典
+        """
+        cookies = []
+        for cookie in self.session.cookies:
+            cookies.append({
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure,
+                "expires": cookie.expires
+            })
+        
+        return {
+            "cookies": cookies,
+            "ticket": self.ticket,
+            "service_url": self.service_url
+        }
+    
+    def import_state(self, state: Dict[str, Any]) -> None:
+        """
+        从持久化的会话状态恢复cookies和ticket
+        
+        Args:
+            state: export_state() 导出的字典
+        """
+        for item in state.get("cookies", []):
+            self.session.cookies.set_cookie(create_cookie(
+                name=item["name"],
+                value=item["value"],
+                domain=item.get("domain", ""),
+                path=item.get("path", "/"),
+                secure=item.get("secure", False),
+                expires=item.get("expires")
+            ))
+        self.ticket = state.get("ticket")
+    
+    def is_session_valid(self, service_url: Optional[str] = None) -> bool:
+        """
+        探测教务系统会话是否仍然有效
+        
+        只请求一次服务页面且不跟随重定向、不读取响应体；
+        会话过期时教务系统会重定向到统一身份认证登录页。
+        
+        Args:
+            service_url: 用于探测的服务URL，如果不提供则使用初始化时的URL
+            
+        Returns:
+            会话是否有效
+        """
+        target = service_url or self.service_url
+        if not target:
+            return False
+        
+        try:
+            response = self.session.get(target, allow_redirects=False, stream=True, timeout=10)
+            response.close()
+        except Exception as e:
+            logging.debug(f"会话探测失败: {e}")
+            return False
+        
+        if response.status_code == 200:
+            return True
+        
+        location = response.headers.get('Location', '')
+        logging.debug(f"会话已失效，状态码: {response.status_code}，重定向位置: {location}")
+        return False
+    
+    def login(self, username: str, password: str, store: Optional[SessionStore] = None) -> Dict[str, Any]:
+        """
+        登录并进入教务系统，优先复用缓存的会话
+        
+        缓存会话探测有效时直接复用；否则执行完整的认证和服务访问，
+        并将新的会话状态写回缓存。
+        
+        Args:
+            username: 用户名
+            password: 密码
+            store: 会话缓存，为None时不使用缓存
+            
+        Returns:
+            登录结果字典，reused字段表示是否复用了缓存会话
+        """
+        if store is not None:
+            state = store.load(username)
+            if state:
+                self.import_state(state)
+                if self.is_session_valid():
+                    logging.info("复用缓存会话")
+                    return {"success": True, "reused": True}
+                
+                logging.info("缓存会话已过期，重新登录")
+                self.session.cookies.clear()
+                self.ticket = None
+        
+        self.authenticate(username, password)
+        service_result = self.access_service()
+        
+        if store is not None and service_result["success"]:
+            store.save(username, self.export_state())
+        
+        return {
+            "success": service_result["success"],
+            "reused": False,
+            "url": service_result["url"]
+        }
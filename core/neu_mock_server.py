@@ -0,0 +1,612 @@
+import os
+import sys
+import time
+import json
+import random
+import secrets
+import logging
+import argparse
+import threading
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs, quote
+
+from .neu_login import CAS_LOGIN_PATH
+
+
+# 教务系统各页面路径（与 neu_get_grade / neu_get_plan 中的请求地址对应）
+HOME_PATH = "/eams/homeExt.action"
+GRADES_PAGE_PATH = "/eams/teach/grade/course/person!historyCourseGrade.action"
+SEMESTER_PAGE_PATH = "/eams/teach/grade/course/person!search.action"
+PLAN_PAGE_PATH = "/eams/studentMajorPlan!view.action"
+
+# 成绩表头（与教务系统历史成绩页面一致）
+GRADE_HEADERS = ["学年学期", "课程代码", "课程序号", "课程名称", "课程类别", "学分", "总评成绩", "最终", "绩点"]
+
+_COURSE_WORDS = ["高等数学", "线性代数", "大学物理", "程序设计", "数据结构", "操作系统", "计算机网络",
+                 "数据库原理", "编译原理", "软件工程", "概率论", "离散数学", "大学英语", "体育", "思想政治"]
+_CATEGORIES = ["必修", "选修", "限选", "通识"]
+_CREDITS = [0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0]
+
+
+def _semester_name(index: int, start_year: int = 2020) -> str:
+    """第index个学期的名称，如"2020-2021 1" """
+    year = start_year + index // 2
+    return f"{year}-{year + 1} {index % 2 + 1}"
+
+
+def _grade_point(score: float) -> float:
+    """百分制成绩换算绩点"""
+    if score < 60:
+        return 0.0
+    return round(min(5.0, (score - 50) / 10), 1)
+
+
+def generate_course(rng: random.Random, index: int, semester: str) -> Dict[str, Any]:
+    """生成一门课程的成绩记录（字段均为页面上的文本）"""
+    score = rng.choice([rng.randint(55, 100), rng.randint(70, 95)])
+    return {
+        "学年学期": semester,
+        "课程代码": f"C{index:06d}",
+        "课程序号": f"A{index:06d}.{rng.randint(1, 9):02d}",
+        "课程名称": f"{rng.choice(_COURSE_WORDS)}{index}",
+        "课程类别": rng.choice(_CATEGORIES),
+        "学分": str(rng.choice(_CREDITS)),
+        "总评成绩": str(score),
+        "最终": str(score),
+        "绩点": str(_grade_point(score))
+    }
+
+
+def generate_transcript(size: int, seed: Any = 0, courses_per_semester: int = 10) -> List[Dict[str, Any]]:
+    """
+    生成合成成绩单
+
+    Args:
+        size: 课程数
+        seed: 随机种子，相同种子生成相同成绩单
+        courses_per_semester: 每学期课程数
+
+    Returns:
+        课程记录列表
+    """
+    rng = random.Random(str(seed))
+    return [generate_course(rng, i, _semester_name(i // courses_per_semester)) for i in range(size)]
+
+
+def render_grades_page(courses: List[Dict[str, Any]], headers: Optional[List[str]] = None) -> str:
+    """
+    渲染成绩页面HTML（gridtable表格 + 总平均绩点）
+
+    Args:
+        courses: 课程记录列表
+        headers: 表头，默认为 GRADE_HEADERS
+
+    Returns:
+        页面HTML
+    """
+    headers = headers or GRADE_HEADERS
+    total_credits = 0.0
+    total_points = 0.0
+    for course in courses:
+        try:
+            credit = float(course.get("学分", 0))
+            total_credits += credit
+            total_points += credit * float(course.get("绩点", 0))
+        except (TypeError, ValueError):
+            continue
+    total_gpa = total_points / total_credits if total_credits else 0.0
+
+    parts = [
+        '<div class="grid">',
+        f'<div class="gpa">总平均绩点：{total_gpa:.2f}</div>',
+        '<table class="gridtable">',
+        '<thead class="gridhead"><tr>',
+        "".join(f"<th>{escape(header)}</th>" for header in headers),
+        '</tr></thead><tbody>'
+    ]
+    for course in courses:
+        parts.append('<tr>')
+        parts.append("".join(f"<td>{escape(str(course.get(header, '')))}</td>" for header in headers))
+        parts.append('</tr>\n')
+    parts.append('</tbody></table></div>')
+    return "".join(parts)
+
+
+def generate_plan(size: int, seed: Any = 0) -> List[List[str]]:
+    """
+    生成合成培养计划数据行
+
+    Returns:
+        每行15个单元格文本：序号、课程序号、课程名称、课程学时、5列学时种类、
+        学分数、周学时、考试或考查课、课程类型、课群、成绩记载方式
+    """
+    rng = random.Random(f"plan-{seed}")
+    rows = []
+    for i in range(size):
+        hours = rng.choice([16, 32, 48, 64])
+        rows.append([
+            str(i + 1), f"P{i:06d}", f"{rng.choice(_COURSE_WORDS)}{i}", str(hours),
+            str(hours), "0", "0", "0", "0",
+            str(rng.choice(_CREDITS)), str(hours // 16),
+            rng.choice(["考试", "考查"]), rng.choice(["必修", "选修"]),
+            rng.choice(["基础课", "专业课", "通识课"]), rng.choice(["百分制", "五级制"])
+        ])
+    return rows
+
+
+def render_plan_page(rows: List[List[str]]) -> str:
+    """渲染培养计划页面HTML（汇总表 + 含"学时种类"的计划表）"""
+    parts = [
+        '<html><head><meta charset="UTF-8"><title>培养计划</title></head><body>',
+        '<table class="planTable"><tr><td>总学分</td><td>170</td></tr></table>',
+        '<table class="planTable"><thead><tr><th>序号</th><th>课程序号</th><th>课程名称</th><th>课程学时</th>',
+        '<th colspan="5">学时种类</th><th>学分数</th><th>周学时</th><th>考试或考查课</th>',
+        '<th>课程类型</th><th>课群</th><th>成绩记载方式</th></tr></thead><tbody>'
+    ]
+    for i, row in enumerate(rows):
+        if i % 20 == 0:
+            # 分组行（含rowspan），解析时会被过滤
+            parts.append(f'<tr><td rowspan="20">第{i // 20 + 1}组</td></tr>')
+        parts.append("<tr>" + "".join(f"<td>{escape(cell)}</td>" for cell in row) + "</tr>\n")
+    parts.append('</tbody></table></body></html>')
+    return "".join(parts)
+
+
+def render_loading_page() -> str:
+    """培养计划尚未加载完成时的页面"""
+    return '<html><head><meta charset="UTF-8"></head><body><div class="loading">正在加载...</div></body></html>'
+
+
+def render_login_page(action: str) -> Tuple[str, str]:
+    """统一身份认证登录页，返回页面HTML和其中的lt"""
+    lt = "LT-" + secrets.token_hex(8)
+    return (
+        '<html><head><meta charset="UTF-8"><title>智慧东大--统一身份认证</title></head><body>'
+        f'<form id="loginForm" action="{escape(action)}" method="post">'
+        f'<input type="hidden" id="lt" name="lt" value="{lt}">'
+        '<input type="hidden" name="execution" value="e1s1">'
+        '<input type="hidden" name="_eventId" value="submit">'
+        '</form></body></html>'
+    ), lt
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """客户端主动断开连接时不打印异常堆栈"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockNEUServer:
+    """本地模拟的统一身份认证和教务系统
+
+    模拟 NEULogin 依赖的登录表单(lt/execution)、302跳转和service ticket流程，
+    以及成绩(gridtable)和培养计划(planTable)页面，用于离线测试和压测。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 users: Optional[Dict[str, str]] = None,
+                 latency: float = 0.0, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0, not_ready_count: int = 0, not_ready_rate: float = 0.0,
+                 transcript_size: int = 40, plan_size: int = 60,
+                 session_ttl: float = 1800, fixtures_dir: Optional[str] = None, seed: Any = 0):
+        """
+        初始化模拟服务器
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            users: 用户名到密码的映射，为None时接受任意账号
+            latency: 每个请求的固定延迟（秒）
+            latency_jitter: 额外的随机延迟上限（秒）
+            error_rate: 教务系统页面返回500的概率
+            not_ready_count: 每个会话前N次请求培养计划时返回未就绪页面
+            not_ready_rate: 培养计划请求返回未就绪页面的概率
+            transcript_size: 每个账号的成绩单课程数
+            plan_size: 培养计划课程数
+            session_ttl: 教务系统会话有效期（秒）
+            fixtures_dir: 页面文件目录，存在 grades.html / semester.html / plan.html 时直接返回
+            seed: 随机种子
+        """
+        self.users = users
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.not_ready_count = not_ready_count
+        self.not_ready_rate = not_ready_rate
+        self.transcript_size = transcript_size
+        self.plan_size = plan_size
+        self.session_ttl = session_ttl
+        self.fixtures_dir = fixtures_dir
+        self.seed = seed
+
+        self._rng = random.Random(f"server-{seed}")
+        self._lock = threading.Lock()
+        self._login_tickets = set()
+        self._tgc = {}
+        self._service_tickets = {}
+        self._eams_sessions = {}
+        self._plan_requests = {}
+        self._transcripts = {}
+        self._plans = {}
+        self.stats = {}
+
+        self._httpd = _QuietHTTPServer((host, port), _MockHandler)
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """服务器地址，可同时作为 cas_base_url 和 eams_base_url"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def config_overrides(self) -> Dict[str, Any]:
+        """指向本服务器所需的配置项"""
+        return {
+            "neu_login": {
+                "service_url": self.base_url + HOME_PATH,
+                "cas_base_url": self.base_url,
+                "eams_base_url": self.base_url
+            },
+            "service_data": {
+                "JiaoWuURL": self.base_url + HOME_PATH
+            }
+        }
+
+    def start(self) -> "MockNEUServer":
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """在当前线程中运行服务器"""
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        """停止服务器"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockNEUServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    # ---- 测试辅助 ----
+
+    def transcript(self, username: str) -> List[Dict[str, Any]]:
+        """获取账号的成绩单（首次访问时按种子生成）"""
+        with self._lock:
+            if username not in self._transcripts:
+                self._transcripts[username] = generate_transcript(self.transcript_size, f"{self.seed}-{username}")
+            return self._transcripts[username]
+
+    def publish_grade(self, username: str, course: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        为账号发布一门新成绩，模拟教务系统成绩更新
+
+        Args:
+            username: 用户名
+            course: 课程记录，为None时随机生成
+
+        Returns:
+            新增的课程记录
+        """
+        courses = self.transcript(username)
+        with self._lock:
+            if course is None:
+                semester = courses[-1]["学年学期"] if courses else _semester_name(0)
+                course = generate_course(self._rng, len(courses) + 100000, semester)
+            courses.append(course)
+        return course
+
+    def expire_sessions(self) -> None:
+        """使所有教务系统会话失效，模拟会话过期"""
+        with self._lock:
+            self._eams_sessions.clear()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    # ---- 认证状态 ----
+
+    def _issue_login_ticket(self, lt: str) -> None:
+        with self._lock:
+            self._login_tickets.add(lt)
+
+    def _check_credentials(self, form: Dict[str, str]) -> Optional[str]:
+        """校验登录表单，成功时返回用户名"""
+        lt = form.get("lt", "")
+        with self._lock:
+            if lt not in self._login_tickets:
+                return None
+            self._login_tickets.discard(lt)
+
+        try:
+            ul, pl = int(form.get("ul", 0)), int(form.get("pl", 0))
+        except ValueError:
+            return None
+        rsa = form.get("rsa", "")
+        username, password = rsa[:ul], rsa[ul:ul + pl]
+        if not username or rsa[ul + pl:] != lt:
+            return None
+        if self.users is not None and self.users.get(username) != password:
+            return None
+        return username
+
+    def _create_tgc(self, username: str) -> str:
+        tgc = "TGT-" + secrets.token_hex(12)
+        with self._lock:
+            self._tgc[tgc] = username
+        return tgc
+
+    def _create_service_ticket(self, username: str) -> str:
+        ticket = "ST-" + secrets.token_hex(12)
+        with self._lock:
+            self._service_tickets[ticket] = username
+        return ticket
+
+    def _redeem_service_ticket(self, ticket: str) -> Optional[str]:
+        with self._lock:
+            return self._service_tickets.pop(ticket, None)
+
+    def _create_eams_session(self, username: str) -> str:
+        session_id = secrets.token_hex(16).upper()
+        with self._lock:
+            self._eams_sessions[session_id] = (username, time.time() + self.session_ttl)
+        return session_id
+
+    def _eams_user(self, session_id: Optional[str]) -> Optional[str]:
+        if not session_id:
+            return None
+        with self._lock:
+            entry = self._eams_sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._eams_sessions[session_id]
+                return None
+            return entry[0]
+
+    def _tgc_user(self, tgc: Optional[str]) -> Optional[str]:
+        if not tgc:
+            return None
+        with self._lock:
+            return self._tgc.get(tgc)
+
+    # ---- 页面内容 ----
+
+    def _fixture(self, name: str) -> Optional[str]:
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def grades_page(self, username: str) -> str:
+        return self._fixture("grades.html") or render_grades_page(self.transcript(username))
+
+    def semester_page(self, username: str) -> str:
+        fixture = self._fixture("semester.html")
+        if fixture:
+            return fixture
+        courses = self.transcript(username)
+        current = courses[-1]["学年学期"] if courses else ""
+        return render_grades_page([course for course in courses if course["学年学期"] == current])
+
+    def plan_page(self, session_id: str, plan_id: str) -> str:
+        with self._lock:
+            key = (session_id, plan_id)
+            self._plan_requests[key] = self._plan_requests.get(key, 0) + 1
+            not_ready = (self._plan_requests[key] <= self.not_ready_count
+                         or self._rng.random() < self.not_ready_rate)
+        if not_ready:
+            self._count("plan_not_ready")
+            return render_loading_page()
+
+        fixture = self._fixture("plan.html")
+        if fixture:
+            return fixture
+        with self._lock:
+            if plan_id not in self._plans:
+                self._plans[plan_id] = render_plan_page(generate_plan(self.plan_size, plan_id))
+            return self._plans[plan_id]
+
+    def _simulate_conditions(self) -> bool:
+        """施加延迟，并按错误率决定是否返回500"""
+        delay = self.latency + (self._rng.random() * self.latency_jitter if self.latency_jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """模拟服务器请求处理"""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def mock(self) -> MockNEUServer:
+        return self.server.mock
+
+    def log_message(self, format, *args):
+        logging.debug("mock: " + format % args)
+
+    def _cookies(self) -> Dict[str, str]:
+        cookies = {}
+        for part in self.headers.get("Cookie", "").split(";"):
+            if "=" in part:
+                name, value = part.strip().split("=", 1)
+                cookies[name] = value
+        return cookies
+
+    def _read_form(self) -> Dict[str, str]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        return {key: values[0] for key, values in parse_qs(body, keep_blank_values=True).items()}
+
+    def _send(self, status: int, body: str = "", headers: Optional[Dict[str, str]] = None,
+              cookies: Optional[List[str]] = None) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        for cookie in cookies or []:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, location: str, cookies: Optional[List[str]] = None) -> None:
+        self._send(302, "", {"Location": location}, cookies)
+
+    def _self_url(self, path: str) -> str:
+        return f"http://{self.headers.get('Host', '127.0.0.1')}{path}"
+
+    def _redirect_to_login(self, service_path: str) -> None:
+        service = quote(self._self_url(service_path), safe=":/")
+        self._redirect(self._self_url(f"{CAS_LOGIN_PATH}?service={service}"))
+
+    def _ticket_location(self, service: str, username: str) -> str:
+        ticket = self.mock._create_service_ticket(username)
+        return f"{service}{'&' if '?' in service else '?'}ticket={ticket}"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        form = self._read_form() if method == "POST" else {}
+        self.mock._count(url.path)
+
+        if self.mock._simulate_conditions():
+            self.mock._count("injected_errors")
+            self._send(500, "<html><body>Internal Server Error</body></html>")
+            return
+
+        if url.path == CAS_LOGIN_PATH:
+            if method == "GET":
+                self._cas_login_page(url, query)
+            else:
+                self._cas_login_submit(query, form)
+            return
+
+        session_id = self._cookies().get("JSESSIONID")
+        username = self.mock._eams_user(session_id)
+
+        if url.path == HOME_PATH:
+            ticket_user = self.mock._redeem_service_ticket(query.get("ticket", ""))
+            if ticket_user:
+                session_id = self.mock._create_eams_session(ticket_user)
+                self._send(200, "<html><body>教务系统首页</body></html>",
+                           cookies=[f"JSESSIONID={session_id}; Path=/eams; HttpOnly"])
+            elif username:
+                self._send(200, "<html><body>教务系统首页</body></html>")
+            else:
+                self._redirect_to_login(HOME_PATH)
+            return
+
+        if url.path not in (GRADES_PAGE_PATH, SEMESTER_PAGE_PATH, PLAN_PAGE_PATH):
+            self._send(404, "<html><body>Not Found</body></html>")
+            return
+
+        if not username:
+            # 与教务系统一致：会话失效时跳转到统一身份认证
+            self._redirect_to_login(HOME_PATH)
+            return
+
+        if url.path == GRADES_PAGE_PATH:
+            self._send(200, self.mock.grades_page(username))
+        elif url.path == SEMESTER_PAGE_PATH:
+            self._send(200, self.mock.semester_page(username))
+        else:
+            self._send(200, self.mock.plan_page(session_id, form.get("planId", "")))
+
+    def _cas_login_page(self, url, query: Dict[str, str]) -> None:
+        service = query.get("service")
+        tgc_user = self.mock._tgc_user(self._cookies().get("CASTGC"))
+        if service and tgc_user:
+            self._redirect(self._ticket_location(service, tgc_user))
+            return
+
+        action = url.path + (f"?{url.query}" if url.query else "")
+        page, lt = render_login_page(action)
+        self.mock._issue_login_ticket(lt)
+        self._send(200, page)
+
+    def _cas_login_submit(self, query: Dict[str, str], form: Dict[str, str]) -> None:
+        username = self.mock._check_credentials(form)
+        if not username:
+            self.mock._count("login_failed")
+            page, lt = render_login_page(CAS_LOGIN_PATH)
+            self.mock._issue_login_ticket(lt)
+            self._send(200, page)
+            return
+
+        tgc = self.mock._create_tgc(username)
+        cookies = [f"CASTGC={tgc}; Path=/tpass; HttpOnly"]
+        service = query.get("service")
+        if service:
+            self._redirect(self._ticket_location(service, username), cookies)
+        else:
+            self._redirect("https://personal.neu.edu.cn/portal", cookies)
+
+
+def main():
+    """命令行启动模拟服务器
+
+    用法: python -m core.neu_mock_server --port 8080 --latency 0.05 --error-rate 0.01
+    """
+    parser = argparse.ArgumentParser(description="NEU统一身份认证/教务系统本地模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="教务系统页面返回500的概率")
+    parser.add_argument("--not-ready-count", type=int, default=0, help="每个会话前N次培养计划请求返回未就绪页面")
+    parser.add_argument("--not-ready-rate", type=float, default=0.0, help="培养计划请求返回未就绪页面的概率")
+    parser.add_argument("--transcript-size", type=int, default=40, help="每个账号的成绩单课程数")
+    parser.add_argument("--plan-size", type=int, default=60, help="培养计划课程数")
+    parser.add_argument("--session-ttl", type=float, default=1800, help="教务系统会话有效期（秒）")
+    parser.add_argument("--fixtures", default=None, help="页面文件目录（grades.html / semester.html / plan.html）")
+    parser.add_argument("--seed", default="0")
+    args = parser.parse_args()
+
+    server = MockNEUServer(
+        host=args.host, port=args.port,
+        latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+        not_ready_count=args.not_ready_count, not_ready_rate=args.not_ready_rate,
+        transcript_size=args.transcript_size, plan_size=args.plan_size,
+        session_ttl=args.session_ttl, fixtures_dir=args.fixtures, seed=args.seed
+    )
+
+    print(f"模拟服务器已启动: {server.base_url}")
+    print("在 config.json 中加入以下配置即可指向本服务器：")
+    print(json.dumps(server.config_overrides(), ensure_ascii=False, indent=4))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n模拟服务器已停止")
+        print(json.dumps(server.stats, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+import re
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # 未安装lxml时退回BeautifulSoup解析
+    lxml = None
+
+from .neu_login import BackendError
+from .course_table import CourseTable
+
+
+# 培养计划输出字段
+PLAN_FIELDS = ["课程序号", "课程名称", "课程学时", "学分数", "周学时", "考试或考查课", "课程类型", "课群", "成绩记载方式"]
+
+# 成绩页面中需要转换为数值的列
+GRADE_NUMERIC_FIELDS = frozenset(["学分", "绩点", "平时成绩", "期中成绩", "期末成绩", "总评成绩", "最终"])
+
+_GPA_VALUE_RE = re.compile(r'总平均绩点[：:]\s*([\d.]+)')
+
+
+def _to_number(value: str):
+    """数字字符串转为浮点数，其余保持原样"""
+    if value and value.replace('.', '').isdigit():
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return value
+
+
+def build_grades_result(headers: List[str], rows: List[List[str]], gpa_text: Optional[str]) -> Dict[str, Any]:
+    """
+    由表头、数据行文本和总平均绩点文本构造成绩结果
+
+    Args:
+        headers: 表头文本
+        rows: 每行单元格文本（不含表头行）
+        gpa_text: 包含"总平均绩点"的文本
+
+    Returns:
+        成绩结果字典
+    """
+    total_gpa = 0.0
+    if gpa_text:
+        gpa_match = _GPA_VALUE_RE.search(gpa_text)
+        if gpa_match:
+            try:
+                total_gpa = float(gpa_match.group(1))
+            except ValueError:
+                pass
+
+    width = len(headers)
+    # 表头重复时与字典记录一致：保留第一次出现的位置，取最后一列的值
+    last_positions = {header: i for i, header in enumerate(headers)}
+    columns = list(last_positions)
+    take = None if len(columns) == width else [last_positions[header] for header in columns]
+
+    courses = CourseTable(columns)
+    # 学分、绩点和成绩等数值列的位置
+    numeric_positions = [i for i, header in enumerate(columns) if header in GRADE_NUMERIC_FIELDS]
+    for cells in rows:
+        if len(cells) >= width:
+            values = cells[:width] if take is None else [cells[i] for i in take]
+            for i in numeric_positions:
+                values[i] = _to_number(values[i])
+            courses.append_values(values)
+
+    return {
+        "success": True,
+        "total_gpa": total_gpa,
+        "course_count": len(courses),
+        "courses": courses,
+        "headers": headers
+    }
+
+
+def build_plan_result(rows: List[List[str]]) -> Dict[str, Any]:
+    """
+    由过滤后的培养计划数据行文本构造结果
+
+    Args:
+        rows: 每行单元格文本（已移除含rowspan的行）
+
+    Returns:
+        培养计划结果字典
+    """
+    courses = CourseTable(PLAN_FIELDS)
+    for cells in rows:
+        if len(cells) >= 12:  # 确保有足够的列
+            # 移除第1列"序号"，移除5列"学时种类"（第5-9列）
+            courses.append_values([
+                cells[1],
+                cells[2],
+                _to_number(cells[3]),
+                _to_number(cells[9]),
+                _to_number(cells[10]),
+                cells[11],
+                cells[12] if len(cells) > 12 else "",
+                cells[13] if len(cells) > 13 else "",
+                cells[14] if len(cells) > 14 else ""
+            ])
+
+    return {
+        "success": True,
+        "course_count": len(courses),
+        "courses": courses,
+        "headers": list(PLAN_FIELDS)
+    }
+
+
+class PageParser(ABC):
+    """页面解析引擎基类
+
+    子类只负责从HTML中提取表格文本，结果构造逻辑共用，
+    保证不同引擎的输出完全一致。
+    """
+
+    name = ""
+
+    def parse_grades(self, html_content: str) -> Dict[str, Any]:
+        """解析成绩页面"""
+        headers, rows, gpa_text = self.extract_grade_table(html_content)
+        return build_grades_result(headers, rows, gpa_text)
+
+    def parse_plan(self, html_content: str) -> Dict[str, Any]:
+        """解析培养计划页面"""
+        return build_plan_result(self.extract_plan_rows(html_content))
+
+    @abstractmethod
+    def extract_grade_table(self, html_content: str) -> Tuple[List[str], List[List[str]], Optional[str]]:
+        """提取成绩表头、数据行和总平均绩点文本"""
+
+    @abstractmethod
+    def extract_plan_rows(self, html_content: str) -> List[List[str]]:
+        """提取培养计划数据行"""
+
+
+class SoupParser(PageParser):
+    """基于BeautifulSoup(html.parser)的解析引擎"""
+
+    name = "soup"
+
+    def extract_grade_table(self, html_content: str) -> Tuple[List[str], List[List[str]], Optional[str]]:
+        soup = BeautifulSoup(html_content, "html.parser")
+
+        # 查找成绩表格
+        table = soup.find("table", {"class": "gridtable"})
+        if not table:
+            raise BackendError("未找到成绩表格")
+
+        # 解析表头
+        header_row = table.find("tr")
+        if not header_row:
+            raise BackendError("未找到表头")
+
+        headers = [th.get_text(strip=True) for th in header_row.find_all(["th", "td"])]
+
+        # 解析数据行
+        rows = []
+        for row in table.find_all("tr")[1:]:  # 跳过表头
+            rows.append([cell.get_text(strip=True) for cell in row.find_all(["td", "th"])])
+
+        # 查找总平均绩点
+        gpa_text = soup.find(string=lambda text: text and "总平均绩点" in text)
+
+        return headers, rows, str(gpa_text) if gpa_text else None
+
+    def extract_plan_rows(self, html_content: str) -> List[List[str]]:
+        soup = BeautifulSoup(html_content, "html.parser")
+
+        # 查找所有class="planTable"的表格
+        plan_tables = soup.find_all("table", {"class": "planTable"})
+        if not plan_tables:
+            raise BackendError("未找到培养计划表格")
+
+        # 筛选包含"学时种类"的表格
+        target_table = None
+        for table in plan_tables:
+            if "学时种类" in table.get_text():
+                target_table = table
+                break
+
+        if not target_table:
+            raise BackendError("未找到包含'学时种类'的表格")
+
+        tbody = target_table.find("tbody")
+        if not tbody:
+            raise BackendError("未找到表格tbody")
+
+        # 移除包含rowspan参数的td的tr
+        rows = []
+        for row in tbody.find_all("tr"):
+            cells = row.find_all("td")
+            if any(td.get("rowspan") for td in cells):
+                continue
+            rows.append([td.get_text(strip=True) for td in cells])
+
+        return rows
+
+
+def _class_xpath(tag: str, class_name: str) -> str:
+    """构造按class匹配的XPath，语义同BeautifulSoup的class匹配"""
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+def _element_text(element) -> str:
+    """等价于BeautifulSoup的get_text(strip=True)"""
+    if len(element) == 0:
+        return (element.text or "").strip()
+    return "".join(text.strip() for text in element.itertext())
+
+
+class LxmlParser(PageParser):
+    """基于lxml和XPath的解析引擎，直接定位表格行"""
+
+    name = "lxml"
+
+    _GRADE_TABLE = _class_xpath("table", "gridtable")
+    _PLAN_TABLE = _class_xpath("table", "planTable")
+
+    def __init__(self):
+        if lxml is None:
+            raise ImportError("lxml解析引擎需要安装lxml")
+        self._html_parser = lxml.html.HTMLParser(encoding="utf-8")
+
+    def _parse_document(self, html_content: str):
+        """解析HTML文档，空文档返回None"""
+        if not html_content or not html_content.strip():
+            return None
+        # 以字节输入兼容带有编码声明的页面；成绩接口返回的是HTML片段，
+        # 统一按完整文档解析，保证根节点为html
+        return lxml.html.document_fromstring(html_content.encode("utf-8"), parser=self._html_parser)
+
+    def extract_grade_table(self, html_content: str) -> Tuple[List[str], List[List[str]], Optional[str]]:
+        document = self._parse_document(html_content)
+        tables = document.xpath(self._GRADE_TABLE) if document is not None else []
+        if not tables:
+            raise BackendError("未找到成绩表格")
+
+        all_rows = tables[0].xpath(".//tr")
+        if not all_rows:
+            raise BackendError("未找到表头")
+
+        headers = [_element_text(cell) for cell in all_rows[0].xpath(".//th|.//td")]
+        rows = [[_element_text(cell) for cell in row.xpath(".//td|.//th")] for row in all_rows[1:]]
+
+        gpa_texts = document.xpath("//text()[contains(., '总平均绩点')]")
+
+        return headers, rows, str(gpa_texts[0]) if gpa_texts else None
+
+    def extract_plan_rows(self, html_content: str) -> List[List[str]]:
+        document = self._parse_document(html_content)
+        plan_tables = document.xpath(self._PLAN_TABLE) if document is not None else []
+        if not plan_tables:
+            raise BackendError("未找到培养计划表格")
+
+        target_table = None
+        for table in plan_tables:
+            if "学时种类" in "".join(table.itertext()):
+                target_table = table
+                break
+
+        if target_table is None:
+            raise BackendError("未找到包含'学时种类'的表格")
+
+        tbodies = target_table.xpath(".//tbody")
+        if not tbodies:
+            raise BackendError("未找到表格tbody")
+
+        rows = []
+        for row in tbodies[0].xpath(".//tr"):
+            cells = row.xpath(".//td")
+            if any(td.get("rowspan") for td in cells):
+                continue
+            rows.append([_element_text(td) for td in cells])
+
+        return rows
+
+
+PARSERS = {
+    SoupParser.name: SoupParser,
+    LxmlParser.name: LxmlParser
+}
+
+
+def get_parser(name: Optional[str] = None) -> PageParser:
+    """
+    获取解析引擎
+
+    Args:
+        name: 引擎名称（"lxml" 或 "soup"），为None时优先使用lxml
+
+    Returns:
+        解析引擎实例
+    """
+    if name is None:
+        name = LxmlParser.name if lxml is not None else SoupParser.name
+
+    if name not in PARSERS:
+        raise ValueError(f"未知的解析引擎: {name}")
+
+    return PARSERS[name]()
+
+
+def compare_parsers(html_content: str, kind: str = "grades") -> bool:
+    """
+    检查lxml引擎与BeautifulSoup引擎对同一页面的输出是否一致
+
+    Args:
+        html_content: 页面HTML
+        kind: 页面类型，"grades" 或 "plan"
+
+    Returns:
+        两种引擎输出（或抛出的错误）是否一致
+    """
+    outputs = []
+    for parser in (SoupParser(), LxmlParser()):
+        method = parser.parse_grades if kind == "grades" else parser.parse_plan
+        try:
+            outputs.append(method(html_content))
+        except BackendError as e:
+            outputs.append(("error", e.page_content))
+    return outputs[0] == outputs[1]
+
+
+def main():
+    """校验已保存页面上两种解析引擎的输出是否一致
+
+    用法: python -m core.neu_parser grades page1.html [page2.html ...]
+    """
+    if len(sys.argv) < 3 or sys.argv[1] not in ("grades", "plan"):
+        print("用法: python -m core.neu_parser grades|plan 页面文件...")
+        sys.exit(2)
+
+    kind = sys.argv[1]
+    mismatches = 0
+    for path in sys.argv[2:]:
+        with open(path, 'r', encoding='utf-8') as f:
+            same = compare_parsers(f.read(), kind)
+        if not same:
+            mismatches += 1
+        print(f"{'一致' if same else '不一致'}: {path}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import random
+from typing import Optional
+
+
+class RetryPolicy:
+    """重试策略：指数退避 + 随机抖动 + 总时限"""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, factor: float = 2.0,
+                 max_delay: float = 30.0, jitter: float = 0.0, deadline: Optional[float] = None):
+        """
+        初始化重试策略
+
+        Args:
+            max_attempts: 最大尝试次数（含第一次）
+            base_delay: 第一次重试前的等待时间（秒）
+            factor: 每次重试等待时间的增长倍数，1表示固定间隔
+            max_delay: 单次等待时间上限（秒）
+            jitter: 抖动比例，0.3表示在计算值的±30%内随机
+            deadline: 从第一次尝试开始计算的总时限（秒），None表示不限制
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts必须大于0")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.deadline = deadline
+
+    def compute_delay(self, attempt: int) -> float:
+        """
+        计算第attempt次尝试失败后的等待时间
+
+        Args:
+            attempt: 已完成的尝试次数，从1开始
+
+        Returns:
+            等待时间（秒）
+        """
+        delay = min(self.max_delay, self.base_delay * (self.factor ** (attempt - 1)))
+        if self.jitter:
+            delay *= 1 + self.jitter * (2 * random.random() - 1)
+        return max(0.0, delay)
+
+    def next_delay(self, attempt: int, elapsed: float) -> Optional[float]:
+        """
+        判断是否继续重试并给出等待时间
+
+        Args:
+            attempt: 已完成的尝试次数，从1开始
+            elapsed: 从第一次尝试开始已经过的时间（秒）
+
+        Returns:
+            下一次尝试前的等待时间；次数或总时限用尽时返回None
+        """
+        if attempt >= self.max_attempts:
+            return None
+
+        delay = self.compute_delay(attempt)
+        if self.deadline is not None:
+            remaining = self.deadline - elapsed
+            if remaining <= 0:
+                return None
+            delay = min(delay, remaining)
+        return delay
+
+    @classmethod
+    def fixed(cls, max_attempts: int, wait_time: float) -> "RetryPolicy":
+        """固定间隔的重试策略"""
+        return cls(max_attempts=max_attempts, base_delay=wait_time, factor=1.0, max_delay=wait_time)
@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import logging
+from typing import Dict, Any, Optional
+
+
+class SessionStore:
+    """已认证会话的本地持久化存储
+
+    以用户名为键，将登录后的cookies与ticket序列化到磁盘，
+    供 Grade.py、Plan.py、AutoGrade.py 共享，避免重复登录。
+    """
+
+    def __init__(self, cache_dir: str = "cache"):
+        """
+        初始化会话存储
+
+        Args:
+            cache_dir: 会话缓存目录
+        """
+        self.cache_dir = cache_dir
+
+    def _path_for(self, username: str) -> str:
+        """获取指定用户的缓存文件路径"""
+        safe_name = "".join(c for c in username if c.isalnum() or c in "-_") or "default"
+        return os.path.join(self.cache_dir, f"session_{safe_name}.json")
+
+    def load(self, username: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的会话状态
+
+        Args:
+            username: 用户名
+
+        Returns:
+            会话状态字典，不存在或损坏时返回None
+        """
+        path = self._path_for(username)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if not isinstance(state, dict) or not state.get('cookies'):
+                return None
+            return state
+        except (OSError, ValueError) as e:
+            logging.warning(f"读取会话缓存失败: {e}")
+            return None
+
+    def save(self, username: str, state: Dict[str, Any]) -> None:
+        """
+        保存会话状态
+
+        Args:
+            username: 用户名
+            state: 会话状态字典
+        """
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        path = self._path_for(username)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        state = dict(state, saved_at=time.time())
+
+        try:
+            # 缓存中包含登录凭证，仅允许当前用户读写
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"保存会话缓存失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def clear(self, username: str) -> None:
+        """删除指定用户的会话缓存"""
+        path = self._path_for(username)
+        if os.path.exists(path):
+            os.remove(path)
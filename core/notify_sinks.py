@@ -0,0 +1,399 @@
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from .neu_retry import RetryPolicy
+
+
+# 队列满时的处理方式：丢弃新事件 / 阻塞等待（超时后丢弃）
+POLICY_DROP = "drop"
+POLICY_BLOCK = "block"
+SINK_POLICIES = (POLICY_DROP, POLICY_BLOCK)
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BLOCK_TIMEOUT = 5.0
+
+# 每个渠道保留的最近延迟样本数
+LATENCY_SAMPLES = 1000
+
+_STOP = object()
+
+
+def build_change_event(account: str, differences: list, old_gpa: float, new_gpa: float,
+                       recipient: Optional[str] = None, tag: str = "") -> Dict[str, Any]:
+    """
+    构造成绩变化事件（可直接序列化为JSON）
+
+    Args:
+        account: 学号
+        differences: find_grade_differences 的结果
+        old_gpa: 变化前的平均绩点
+        new_gpa: 变化后的平均绩点
+        recipient: 该账号的通知邮箱
+        tag: 日志前缀，邮件合并时用于区分账号
+
+    Returns:
+        事件字典
+    """
+    return {
+        "type": "grade_change",
+        "account": account,
+        "time": datetime.now().isoformat(timespec='seconds'),
+        "old_gpa": old_gpa,
+        "new_gpa": new_gpa,
+        "change_count": len(differences),
+        "differences": differences,
+        "recipient": recipient,
+        "tag": tag
+    }
+
+
+class NotificationSink:
+    """通知渠道基类，子类实现 send()"""
+
+    name = "sink"
+
+    def send(self, event: Dict[str, Any]) -> None:
+        """发送一个事件，失败时抛出异常"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """释放资源"""
+
+
+class StdoutSink(NotificationSink):
+    """以NDJSON格式输出到标准输出"""
+
+    name = "stdout"
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, event: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+class NDJSONFileSink(NotificationSink):
+    """追加写入NDJSON文件，每行一个事件"""
+
+    name = "ndjson"
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 输出文件路径
+        """
+        self.path = path
+        self._file = None
+
+    def send(self, event: Dict[str, Any]) -> None:
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        # 整行一次写入并刷新，读取方不会看到半行
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class WebhookSink(NotificationSink):
+    """以JSON POST到HTTP地址"""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 10, headers: Optional[Dict[str, str]] = None,
+                 trust_env: bool = True):
+        """
+        Args:
+            url: 接收地址
+            timeout: 请求超时（秒）
+            headers: 额外的请求头
+            trust_env: 是否使用环境变量中的代理设置，接收端在本机时可设为False
+        """
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.trust_env = trust_env
+        if headers:
+            self._session.headers.update(headers)
+
+    def send(self, event: Dict[str, Any]) -> None:
+        response = self._session.post(self.url, json=event, timeout=self.timeout)
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class EmailSink(NotificationSink):
+    """交给 EmailNotifier 合并发送邮件"""
+
+    name = "email"
+
+    def __init__(self, notifier, default_recipient: Optional[str] = None):
+        """
+        Args:
+            notifier: EmailNotifier
+            default_recipient: 事件未指定收件人时使用的邮箱
+        """
+        self.notifier = notifier
+        self.default_recipient = default_recipient
+
+    def send(self, event: Dict[str, Any]) -> None:
+        recipient = event.get("recipient") or self.default_recipient
+        if not recipient:
+            raise ValueError("未配置收件人邮箱")
+        if not self.notifier.notify(recipient, event["differences"], event["old_gpa"], event["new_gpa"],
+                                    tag=event.get("tag", "")):
+            raise RuntimeError("邮件通知队列已满或已关闭")
+
+
+class _LatencyStats:
+    """最近若干次的延迟统计"""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self._samples = deque(maxlen=samples)
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        values = sorted(self._samples)
+        if not values:
+            return {}
+        return {
+            "avg": round(sum(values) / len(values), 4),
+            "p50": round(values[len(values) // 2], 4),
+            "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+            "max": round(values[-1], 4)
+        }
+
+
+class SinkWorker:
+    """单个通知渠道的有界队列和发送线程
+
+    每个渠道独立排队、独立发送，慢的渠道只会让自己的队列变长，不影响检测和其他渠道。
+    """
+
+    def __init__(self, sink: NotificationSink, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 policy: str = POLICY_DROP, block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+                 retry_policy: Optional[RetryPolicy] = None, name: Optional[str] = None):
+        """
+        初始化渠道
+
+        Args:
+            sink: 通知渠道
+            queue_size: 队列容量
+            policy: 队列满时的处理方式，drop 丢弃新事件，block 阻塞等待至多 block_timeout 秒后丢弃
+            block_timeout: block 策略的最长等待时间（秒）
+            retry_policy: 发送失败的重试策略，None表示不重试
+            name: 渠道名称，默认为渠道类型
+        """
+        if policy not in SINK_POLICIES:
+            raise ValueError(f"未知的队列策略: {policy}")
+        self.sink = sink
+        self.name = name or sink.name
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.retry_policy = retry_policy
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._counts = {"enqueued": 0, "dropped": 0, "sent": 0, "failed": 0, "retries": 0}
+        # 入队到发送完成的延迟，以及发送本身的耗时
+        self._latency = _LatencyStats()
+        self._service = _LatencyStats()
+        self._thread = threading.Thread(target=self._run, name=f"NotifySink-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def put(self, event: Dict[str, Any]) -> bool:
+        """
+        事件入队
+
+        Returns:
+            是否入队；队列已满被丢弃时返回False
+        """
+        try:
+            if self.policy == POLICY_BLOCK:
+                self._queue.put((time.monotonic(), event), timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait((time.monotonic(), event))
+        except queue.Full:
+            self._count("dropped")
+            logging.warning(f"通知渠道 {self.name} 队列已满，丢弃事件")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _send(self, event: Dict[str, Any]) -> None:
+        attempt = 0
+        first_attempt = time.monotonic()
+        while True:
+            attempt += 1
+            try:
+                self.sink.send(event)
+                return
+            except Exception as e:
+                delay = None
+                if self.retry_policy is not None:
+                    delay = self.retry_policy.next_delay(attempt, time.monotonic() - first_attempt)
+                if delay is None:
+                    raise
+                self._count("retries")
+                logging.warning(f"通知渠道 {self.name} 发送失败，{delay:.1f}秒后重试: {e}")
+                time.sleep(delay)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            enqueued_at, event = item
+            started = time.monotonic()
+            try:
+                self._send(event)
+                self._count("sent")
+            except Exception as e:
+                self._count("failed")
+                logging.error(f"通知渠道 {self.name} 发送失败: {e}")
+            finished = time.monotonic()
+            with self._lock:
+                self._latency.add(finished - enqueued_at)
+                self._service.add(finished - started)
+        # 线程退出时释放渠道资源，close() 等待超时也不会遗漏
+        self.sink.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """计数、队列长度和延迟统计（秒）"""
+        with self._lock:
+            result = dict(self._counts)
+            result["queued"] = self._queue.qsize()
+            result["latency"] = self._latency.summary()
+            result["service_time"] = self._service.summary()
+        return result
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        发送完已入队的事件后停止
+
+        Args:
+            timeout: 等待的最长时间（秒）
+        """
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logging.warning(f"通知渠道 {self.name} 关闭超时，剩余 {self._queue.qsize()} 个事件未发送")
+            return
+        self._thread.join(timeout)
+
+
+class NotificationDispatcher:
+    """把成绩变化事件分发到多个通知渠道"""
+
+    def __init__(self, workers: Optional[List[SinkWorker]] = None):
+        """
+        Args:
+            workers: 渠道列表
+        """
+        self.workers: List[SinkWorker] = list(workers or [])
+
+    @classmethod
+    def from_config(cls, config, email_notifier=None) -> "NotificationDispatcher":
+        """
+        由 notify.sinks 配置创建分发器
+
+        未配置时只使用邮件渠道（邮件配置不完整时为空）。每项配置如
+        {"type": "webhook", "url": "...", "queue_size": 100, "policy": "drop"}，
+        type 可选 webhook / ndjson / stdout / email。
+
+        Args:
+            config: 配置对象
+            email_notifier: email 渠道使用的 EmailNotifier，为None时跳过 email 渠道
+        """
+        sink_configs = config.get('notify.sinks')
+        if sink_configs is None:
+            sink_configs = [{"type": "email"}]
+
+        # 同类型渠道有多个时按序号区分名称
+        type_counts = Counter(options.get('type') for options in sink_configs)
+        workers = []
+        try:
+            for index, options in enumerate(sink_configs):
+                sink_type = options.get('type')
+                if sink_type == 'webhook':
+                    sink = WebhookSink(options['url'], timeout=options.get('timeout', 10), headers=options.get('headers'),
+                                       trust_env=options.get('trust_env', True))
+                elif sink_type == 'ndjson':
+                    sink = NDJSONFileSink(options.get('path', 'output/notifications.ndjson'))
+                elif sink_type == 'stdout':
+                    sink = StdoutSink()
+                elif sink_type == 'email':
+                    if email_notifier is None:
+                        logging.info("邮件配置不完整，跳过邮件通知渠道")
+                        continue
+                    sink = EmailSink(email_notifier, config.get('email.recipient_email'))
+                else:
+                    raise ValueError(f"第 {index + 1} 个通知渠道类型未知: {sink_type}")
+
+                retry = options.get('retry')
+                workers.append(SinkWorker(
+                    sink,
+                    queue_size=options.get('queue_size', DEFAULT_QUEUE_SIZE),
+                    policy=options.get('policy', POLICY_DROP),
+                    block_timeout=options.get('block_timeout', DEFAULT_BLOCK_TIMEOUT),
+                    retry_policy=RetryPolicy(**retry) if retry else None,
+                    name=options.get('name') or (sink_type if type_counts[sink_type] == 1 else f"{sink_type}{index + 1}")
+                ))
+        except Exception:
+            for worker in workers:
+                worker.close(timeout=0)
+            raise
+        return cls(workers)
+
+    def add_sink(self, sink: NotificationSink, **kwargs) -> SinkWorker:
+        """添加渠道，参数同 SinkWorker"""
+        worker = SinkWorker(sink, **kwargs)
+        self.workers.append(worker)
+        return worker
+
+    def dispatch(self, event: Dict[str, Any]) -> int:
+        """
+        分发事件到所有渠道（drop 策略不等待，block 策略在队列满时至多等待 block_timeout）
+
+        Returns:
+            成功入队的渠道数
+        """
+        return sum(worker.put(event) for worker in self.workers)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """各渠道的计数和延迟统计"""
+        return {worker.name: worker.metrics() for worker in self.workers}
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        发送完已入队的事件后停止所有渠道
+
+        Args:
+            timeout: 每个渠道等待的最长时间（秒）
+        """
+        for worker in self.workers:
+            worker.close(timeout)
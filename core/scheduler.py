@@ -0,0 +1,339 @@
+import heapq
+import random
+import itertools
+import threading
+from datetime import datetime, time as dt_time, timedelta
+from typing import Dict, List, Hashable, Iterable, Optional, Tuple
+
+
+# 未落在任何时段内时使用的检查间隔
+DEFAULT_INTERVAL = 1800
+DEFAULT_PERIOD_NAME = "默认时段"
+
+_ONE_DAY = timedelta(days=1)
+
+
+def parse_clock(text: str) -> dt_time:
+    """解析 HH:MM 格式的时刻"""
+    return datetime.strptime(text, '%H:%M').time()
+
+
+class Period:
+    """每天重复的检查时段
+
+    时段为左闭右开区间 [start, end)；end 早于 start 时表示跨越午夜（如 21:00-08:00），
+    两者相等时表示全天。
+    """
+
+    def __init__(self, name: str, start: dt_time, end: dt_time, interval: float):
+        """
+        初始化时段
+
+        Args:
+            name: 时段名称
+            start: 开始时刻
+            end: 结束时刻
+            interval: 时段内的检查间隔（秒）
+        """
+        if interval <= 0:
+            raise ValueError(f"{name}的检查间隔必须大于0")
+        self.name = name
+        self.start = start
+        self.end = end
+        self.interval = interval
+
+    def __repr__(self) -> str:
+        return f"Period({self.name!r}, {self.start:%H:%M}-{self.end:%H:%M}, {self.interval}s)"
+
+    @property
+    def crosses_midnight(self) -> bool:
+        """是否跨越午夜"""
+        return self.end < self.start
+
+    def contains(self, moment: dt_time) -> bool:
+        """判断时刻是否在时段内"""
+        if self.start == self.end:
+            return True
+        if self.crosses_midnight:
+            return moment >= self.start or moment < self.end
+        return self.start <= moment < self.end
+
+
+class PeriodSchedule:
+    """按时段计算检查间隔和下次唤醒时间
+
+    时段按给定顺序匹配，靠前的优先；唤醒时间不会越过时段边界，
+    在边界处唤醒后按新时段的间隔继续。
+    """
+
+    def __init__(self, periods: Iterable[Period], default_interval: float = DEFAULT_INTERVAL,
+                 default_name: str = DEFAULT_PERIOD_NAME):
+        """
+        初始化时段表
+
+        Args:
+            periods: 时段列表，按优先级排列
+            default_interval: 不在任何时段内时的检查间隔（秒）
+            default_name: 不在任何时段内时的名称
+        """
+        self.periods = list(periods)
+        self.default_interval = default_interval
+        self.default_name = default_name
+        # 所有时段的边界时刻（全天时段没有边界）
+        self._boundaries = sorted({clock for period in self.periods if period.start != period.end
+                                   for clock in (period.start, period.end)})
+
+    @classmethod
+    def from_config(cls, config) -> "PeriodSchedule":
+        """
+        由 auto.frequent_period / auto.cold_period 配置构造时段表
+
+        频繁查询时段优先；冷查询时段未配置起止时刻时取频繁时段之外的时间。
+        """
+        frequent_start = parse_clock(config.get('auto.frequent_period.start_time', '08:00'))
+        frequent_end = parse_clock(config.get('auto.frequent_period.end_time', '22:00'))
+        frequent_interval = config.get('auto.frequent_period.interval', 1800)
+        cold_start = parse_clock(config.get('auto.cold_period.start_time') or frequent_end.strftime('%H:%M'))
+        cold_end = parse_clock(config.get('auto.cold_period.end_time') or frequent_start.strftime('%H:%M'))
+        cold_interval = config.get('auto.cold_period.interval', 7200)
+
+        return cls([
+            Period("频繁查询时段", frequent_start, frequent_end, frequent_interval),
+            Period("冷查询时段", cold_start, cold_end, cold_interval)
+        ])
+
+    def signature(self) -> Tuple:
+        """时段表的内容摘要，用于判断重新加载配置后时段表是否变化"""
+        return (tuple((period.name, period.start, period.end, period.interval) for period in self.periods),
+                self.default_interval, self.default_name)
+
+    def period_at(self, moment: datetime) -> Optional[Period]:
+        """时刻所在的时段，不在任何时段内时返回None"""
+        clock = moment.time()
+        for period in self.periods:
+            if period.contains(clock):
+                return period
+        return None
+
+    def interval_at(self, moment: datetime) -> Tuple[float, str]:
+        """
+        时刻所在时段的检查间隔
+
+        Returns:
+            (检查间隔秒数, 时段名称)
+        """
+        period = self.period_at(moment)
+        if period is None:
+            return self.default_interval, self.default_name
+        return period.interval, period.name
+
+    def next_boundary(self, moment: datetime) -> Optional[datetime]:
+        """
+        严格晚于给定时刻的下一个时段边界
+
+        Returns:
+            边界时间；没有边界（全天时段或没有时段）时返回None
+        """
+        if not self._boundaries:
+            return None
+        clock = moment.time()
+        for boundary in self._boundaries:
+            if boundary > clock:
+                return datetime.combine(moment.date(), boundary)
+        return datetime.combine(moment.date() + _ONE_DAY, self._boundaries[0])
+
+    def next_wake(self, moment: datetime) -> Tuple[datetime, str]:
+        """
+        计算下次唤醒时间
+
+        按当前时段的间隔推算；若会越过时段边界，则在边界处唤醒，
+        避免冷时段的长间隔跨过频繁时段的开始。
+
+        Returns:
+            (唤醒时间, 当前时段名称)
+        """
+        interval, name = self.interval_at(moment)
+        wake = moment + timedelta(seconds=interval)
+        boundary = self.next_boundary(moment)
+        if boundary is not None and boundary < wake:
+            wake = boundary
+        return wake, name
+
+
+class AccountScheduler:
+    """多账号检查调度
+
+    用最小堆按到期时间保存每个账号的下次检查，主循环只在最早的到期时间唤醒；
+    重新安排或新增账号时提前唤醒。每个账号的唤醒时间附加随机抖动，
+    避免大量账号在同一时刻（尤其是时段边界）集中请求。
+    """
+
+    def __init__(self, schedule: PeriodSchedule, jitter: float = 0.0, seed: Optional[int] = None):
+        """
+        初始化调度器
+
+        Args:
+            schedule: 时段表
+            jitter: 每次唤醒附加的随机延迟上限（秒）
+            seed: 随机种子
+        """
+        self.schedule = schedule
+        self.jitter = max(0.0, float(jitter or 0))
+        self._rng = random.Random(seed)
+        self._heap = []
+        # 账号 -> 当前有效的堆条目序号，重新安排后旧条目作废
+        self._entries: Dict[Hashable, int] = {}
+        self._due_times: Dict[Hashable, datetime] = {}
+        # schedule_next 安排时的基准时间（上次检查完成的时间），时段表变化时据此重新计算
+        self._bases: Dict[Hashable, datetime] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._condition:
+            return key in self._entries
+
+    def keys(self) -> List[Hashable]:
+        """已安排的账号"""
+        with self._condition:
+            return list(self._entries)
+
+    def set_schedule(self, schedule: PeriodSchedule, jitter: Optional[float] = None) -> bool:
+        """
+        更新时段表（配置重新加载后）
+
+        时段表内容变化时，按新时段表从各账号上次检查完成的时间重新计算下次检查时间，
+        已过的时间立即检查；未变化时保留已安排的时间。
+
+        Returns:
+            时段表是否变化
+        """
+        with self._condition:
+            changed = schedule.signature() != self.schedule.signature()
+            self.schedule = schedule
+            if jitter is not None:
+                self.jitter = max(0.0, float(jitter))
+            if changed:
+                now = datetime.now()
+                for key, base in list(self._bases.items()):
+                    if key in self._entries:
+                        self._schedule_from(key, base, now)
+            return changed
+
+    def _schedule_from(self, key: Hashable, base: datetime, now: datetime) -> Tuple[datetime, str]:
+        wake, name = self.schedule.next_wake(base)
+        if self.jitter:
+            wake += timedelta(seconds=self._rng.uniform(0, self.jitter))
+        wake = max(wake, now)
+        self.schedule_at(key, wake)
+        self._bases[key] = base
+        return wake, name
+
+    def schedule_at(self, key: Hashable, when: datetime) -> None:
+        """安排账号在指定时间检查（替换已有安排）"""
+        with self._condition:
+            sequence = next(self._counter)
+            self._entries[key] = sequence
+            self._due_times[key] = when
+            self._bases.pop(key, None)
+            heapq.heappush(self._heap, (when, sequence, key))
+            self._condition.notify_all()
+
+    def schedule_next(self, key: Hashable, now: Optional[datetime] = None) -> Tuple[datetime, str]:
+        """
+        按时段表安排账号的下次检查
+
+        Args:
+            key: 账号
+            now: 当前时间，默认为 datetime.now()
+
+        Returns:
+            (下次检查时间, 当前时段名称)
+        """
+        now = now or datetime.now()
+        with self._condition:
+            return self._schedule_from(key, now, now)
+
+    def remove(self, key: Hashable) -> bool:
+        """取消账号的安排"""
+        with self._condition:
+            self._due_times.pop(key, None)
+            self._bases.pop(key, None)
+            return self._entries.pop(key, None) is not None
+
+    def due_time(self, key: Hashable) -> Optional[datetime]:
+        """账号的下次检查时间"""
+        with self._condition:
+            return self._due_times.get(key)
+
+    def _discard_stale(self) -> None:
+        while self._heap and self._entries.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def next_due(self) -> Optional[datetime]:
+        """最早的到期时间"""
+        with self._condition:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[Hashable]:
+        """
+        取出所有已到期的账号（取出后不再安排，需检查完成后重新 schedule_next）
+
+        Args:
+            now: 当前时间，默认为 datetime.now()
+
+        Returns:
+            到期的账号列表
+        """
+        now = now or datetime.now()
+        due = []
+        with self._condition:
+            self._discard_stale()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, key = heapq.heappop(self._heap)
+                del self._entries[key]
+                del self._due_times[key]
+                self._bases.pop(key, None)
+                due.append(key)
+                self._discard_stale()
+        return due
+
+    def wait_due(self, stop_event: Optional[threading.Event] = None, max_wait: float = 60.0) -> List[Hashable]:
+        """
+        等待到有账号到期或超过 max_wait 秒，返回到期的账号
+
+        等待期间有新的安排会提前唤醒重新计算；超时返回空列表，
+        调用方可借此定期重新加载配置、响应停止信号。
+
+        Args:
+            stop_event: 停止信号，置位后返回空列表
+            max_wait: 最长等待时间（秒）
+
+        Returns:
+            到期的账号列表，超时或停止时为空
+        """
+        deadline = datetime.now() + timedelta(seconds=max_wait)
+        while stop_event is None or not stop_event.is_set():
+            due = self.pop_due()
+            if due:
+                return due
+            with self._condition:
+                now = datetime.now()
+                if now >= deadline:
+                    return []
+                wait_until = deadline
+                next_due = self.next_due()
+                if next_due is not None:
+                    wait_until = min(wait_until, next_due)
+                self._condition.wait(max(0.0, (wait_until - now).total_seconds()))
+        return []
+
+    def wake(self) -> None:
+        """唤醒等待中的 wait_due"""
+        with self._condition:
+            self._condition.notify_all()
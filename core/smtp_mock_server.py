@@ -0,0 +1,286 @@
+import time
+import json
+import base64
+import random
+import logging
+import argparse
+import threading
+import socketserver
+from email import message_from_bytes
+from email.message import Message
+from typing import Dict, Any, List, Optional
+
+
+class _QuietTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        # 客户端断开等错误不打印堆栈
+        logging.debug(f"模拟SMTP服务器处理 {client_address} 时出错", exc_info=True)
+
+
+class MockSMTPServer:
+    """本地模拟SMTP服务器
+
+    支持 EHLO/HELO、AUTH PLAIN/LOGIN、MAIL/RCPT/DATA、RSET、NOOP、QUIT，
+    收到的邮件保存在内存中，可模拟响应延迟、投递失败和服务器主动断开连接，
+    用于测试邮件通知而不连接真实邮箱服务器。不支持STARTTLS，客户端需关闭 use_tls。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 latency: float = 0.0, fail_rate: float = 0.0,
+                 max_messages_per_connection: int = 0, seed: Any = None):
+        """
+        初始化模拟服务器
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            username: 登录用户名，为None时接受任意凭据
+            password: 登录密码
+            latency: 每条命令的响应延迟（秒）
+            fail_rate: DATA 返回临时错误（451）的概率
+            max_messages_per_connection: 每个连接投递多少封后服务器断开，0表示不限制
+            seed: 随机种子
+        """
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.max_messages_per_connection = max_messages_per_connection
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.messages: List[Dict[str, Any]] = []
+        self.stats = {"connections": 0, "logins": 0, "login_failed": 0, "messages": 0, "failed": 0}
+
+        handler = type("BoundSMTPHandler", (_SMTPHandler,), {"mock": self})
+        self._server = _QuietTCPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def config_overrides(self) -> Dict[str, Any]:
+        """指向本服务器的 email 配置"""
+        return {
+            "email": {
+                "smtp_server": self.host,
+                "smtp_port": self.port,
+                "use_tls": False,
+                "sender_email": "monitor@localhost",
+                "sender_password": self.password or "password",
+                "recipient_email": "student@localhost"
+            }
+        }
+
+    def start(self) -> "MockSMTPServer":
+        """在后台线程启动服务器"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """在当前线程运行服务器"""
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        """停止服务器"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockSMTPServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def messages_to(self, recipient: str) -> List[Message]:
+        """发给指定收件人的邮件（已解析）"""
+        with self._lock:
+            return [message_from_bytes(item["data"]) for item in self.messages if recipient in item["recipients"]]
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _check_credentials(self, username: str, password: str) -> bool:
+        if self.username is None:
+            return True
+        return username == self.username and password == self.password
+
+    def _deliver(self, sender: str, recipients: List[str], data: bytes) -> bool:
+        with self._lock:
+            if self.fail_rate and self._rng.random() < self.fail_rate:
+                self.stats["failed"] += 1
+                return False
+            self.messages.append({"sender": sender, "recipients": list(recipients), "data": data,
+                                  "received_at": time.time()})
+            self.stats["messages"] += 1
+            return True
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """单个SMTP连接的会话"""
+
+    mock: MockSMTPServer = None
+
+    def _reply(self, line: str) -> None:
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        self.wfile.write(line.encode('utf-8') + b"\r\n")
+        self.wfile.flush()
+
+    def _readline(self) -> Optional[str]:
+        line = self.rfile.readline(65536)
+        if not line:
+            return None
+        return line.decode('utf-8', errors='replace').rstrip("\r\n")
+
+    def _read_data(self) -> Optional[bytes]:
+        lines = []
+        while True:
+            line = self.rfile.readline(1 << 20)
+            if not line:
+                return None
+            if line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            # 去掉透明化处理时加上的点
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+    def _auth(self, argument: str) -> None:
+        parts = argument.split()
+        mechanism = parts[0].upper() if parts else ""
+        try:
+            if mechanism == "PLAIN":
+                token = parts[1] if len(parts) > 1 else None
+                if token is None:
+                    self._reply("334 ")
+                    token = self._readline() or ""
+                _, username, password = base64.b64decode(token).decode('utf-8').split("\0")
+            elif mechanism == "LOGIN":
+                if len(parts) > 1:
+                    username = base64.b64decode(parts[1]).decode('utf-8')
+                else:
+                    self._reply("334 " + base64.b64encode(b"Username:").decode())
+                    username = base64.b64decode(self._readline() or "").decode('utf-8')
+                self._reply("334 " + base64.b64encode(b"Password:").decode())
+                password = base64.b64decode(self._readline() or "").decode('utf-8')
+            else:
+                self._reply("504 Unrecognized authentication type")
+                return
+        except (ValueError, UnicodeDecodeError):
+            self._reply("501 Malformed authentication data")
+            return
+
+        if self.mock._check_credentials(username, password):
+            self.authenticated = True
+            self.mock._count("logins")
+            self._reply("235 Authentication successful")
+        else:
+            self.mock._count("login_failed")
+            self._reply("535 Authentication credentials invalid")
+
+    def handle(self) -> None:
+        self.mock._count("connections")
+        self.authenticated = False
+        sender, recipients, delivered = None, [], 0
+        self._reply("220 localhost Mock SMTP ready")
+
+        while True:
+            line = self._readline()
+            if line is None:
+                return
+            command, _, argument = line.partition(" ")
+            command = command.upper()
+
+            if command == "EHLO":
+                self._reply("250-localhost")
+                self._reply("250-AUTH PLAIN LOGIN")
+                self._reply("250 8BITMIME")
+            elif command == "HELO":
+                self._reply("250 localhost")
+            elif command == "AUTH":
+                self._auth(argument)
+            elif command == "NOOP":
+                self._reply("250 OK")
+            elif command == "RSET":
+                sender, recipients = None, []
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            elif command == "MAIL":
+                if self.mock.username is not None and not self.authenticated:
+                    self._reply("530 Authentication required")
+                    continue
+                sender, recipients = argument.partition(":")[2].strip().strip("<>").split(">")[0], []
+                self._reply("250 OK")
+            elif command == "RCPT":
+                if sender is None:
+                    self._reply("503 Need MAIL command")
+                    continue
+                recipients.append(argument.partition(":")[2].strip().strip("<>").split(">")[0])
+                self._reply("250 OK")
+            elif command == "DATA":
+                if not recipients:
+                    self._reply("503 Need RCPT command")
+                    continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data()
+                if data is None:
+                    return
+                if self.mock._deliver(sender, recipients, data):
+                    self._reply("250 OK queued")
+                    delivered += 1
+                else:
+                    self._reply("451 Temporary failure, try again later")
+                sender, recipients = None, []
+                if self.mock.max_messages_per_connection and delivered >= self.mock.max_messages_per_connection:
+                    # 模拟服务器主动关闭空闲或超量的连接
+                    return
+            else:
+                self._reply("502 Command not implemented")
+
+
+def main():
+    """命令行启动模拟SMTP服务器
+
+    用法: python -m core.smtp_mock_server --port 2525 --latency 0.2 --fail-rate 0.1
+    """
+    parser = argparse.ArgumentParser(description="本地模拟SMTP服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--username", default=None, help="登录用户名，不指定时接受任意凭据")
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--latency", type=float, default=0.0, help="每条命令的响应延迟（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="投递返回临时错误的概率")
+    parser.add_argument("--max-messages-per-connection", type=int, default=0,
+                        help="每个连接投递多少封后断开，0表示不限制")
+    args = parser.parse_args()
+
+    server = MockSMTPServer(
+        host=args.host, port=args.port, username=args.username, password=args.password,
+        latency=args.latency, fail_rate=args.fail_rate,
+        max_messages_per_connection=args.max_messages_per_connection
+    )
+
+    print(f"模拟SMTP服务器已启动: {server.host}:{server.port}")
+    print("在 config.json 中加入以下配置即可指向本服务器：")
+    print(json.dumps(server.config_overrides(), ensure_ascii=False, indent=4))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n模拟SMTP服务器已停止")
+        print(json.dumps(server.stats, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    main()